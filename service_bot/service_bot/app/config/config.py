@@ -12,6 +12,99 @@ API_URL = os.getenv("API_URL")
 API_USERNAME = os.getenv("API_USERNAME")
 API_PASSWORD = os.getenv("API_PASSWORD")
 
+API_POOL_LIMIT = int(os.getenv("API_POOL_LIMIT", "100"))
+API_POOL_LIMIT_PER_HOST = int(os.getenv("API_POOL_LIMIT_PER_HOST", "20"))
+API_KEEPALIVE_TIMEOUT = float(os.getenv("API_KEEPALIVE_TIMEOUT", "30"))
+API_DNS_CACHE_TTL = int(os.getenv("API_DNS_CACHE_TTL", "300"))
+# Сжатие ответов 1С; br используется, только если установлен пакет brotli. Пустое значение - без сжатия
+API_COMPRESSION = os.getenv("API_COMPRESSION", "gzip,deflate,br")
+
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "15"))
+API_READ_TIMEOUTS = {
+    "products": float(os.getenv("API_READ_TIMEOUT_PRODUCTS", "30")),
+    "category_products": float(os.getenv("API_READ_TIMEOUT_CATEGORY_PRODUCTS", "20")),
+    "services": float(os.getenv("API_READ_TIMEOUT_SERVICES", "20")),
+}
+API_RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", "3"))
+API_RETRY_BASE_DELAY = float(os.getenv("API_RETRY_BASE_DELAY", "0.2"))
+API_RETRY_MAX_DELAY = float(os.getenv("API_RETRY_MAX_DELAY", "2"))
+API_BREAKER_FAILURE_THRESHOLD = int(os.getenv("API_BREAKER_FAILURE_THRESHOLD", "5"))
+API_BREAKER_RESET_TIMEOUT = float(os.getenv("API_BREAKER_RESET_TIMEOUT", "30"))
+
+# Сколько запросов одновременно отправлять в 1С (0 - без ограничения) и сколько секунд запрос
+# может ждать в очереди: изменения от сотрудников (0 - без ограничения), заказы, каталог.
+# Каталог, не дождавшийся очереди, отдается из кэша
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "6"))
+API_QUEUE_MAX_WAIT = {
+    "writes": float(os.getenv("API_QUEUE_WAIT_WRITES", "0")),
+    "orders": float(os.getenv("API_QUEUE_WAIT_ORDERS", "10")),
+    "catalog": float(os.getenv("API_QUEUE_WAIT_CATALOG", "2")),
+}
+
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "256"))
+CACHE_STALE_TTL = float(os.getenv("CACHE_STALE_TTL", "3600"))
+CACHE_TTL = {
+    "categories": float(os.getenv("CACHE_TTL_CATEGORIES", "1800")),
+    "category": float(os.getenv("CACHE_TTL_CATEGORY", "600")),
+    "products": float(os.getenv("CACHE_TTL_PRODUCTS", "600")),
+    "products_by_category": float(os.getenv("CACHE_TTL_PRODUCTS_BY_CATEGORY", "600")),
+    "services": float(os.getenv("CACHE_TTL_SERVICES", "1800")),
+    "order_statuses": float(os.getenv("CACHE_TTL_ORDER_STATUSES", "1800")),
+}
+
+# Как часто перестраивать индекс полного каталога (0 - не загружать индекс)
+CATALOG_INDEX_REFRESH_INTERVAL = float(os.getenv("CATALOG_INDEX_REFRESH_INTERVAL", "600"))
+# Пока индекс пуст (1С не ответила), поиск запускает его загрузку вне расписания - не чаще раза в столько секунд
+CATALOG_INDEX_RETRY_INTERVAL = float(os.getenv("CATALOG_INDEX_RETRY_INTERVAL", "30"))
+# Снимок каталога на диске для быстрого старта и работы без 1С (пустое значение - не сохранять)
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "data/catalog_snapshot.bin")
+
+# Inline-режим (@бот запрос): пауза в наборе, после которой отвечаем, размер кэша ответов
+# и сколько секунд Telegram может кэшировать ответ у себя
+INLINE_DEBOUNCE_DELAY = float(os.getenv("INLINE_DEBOUNCE_DELAY", "0.3"))
+INLINE_CACHE_SIZE = int(os.getenv("INLINE_CACHE_SIZE", "1024"))
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "60"))
+
+# Частые нажатия inline-кнопок: сколько нажатий в секунду пропускать одному пользователю
+# (0 - без ограничения) и с каким запасом; повтор только что обработанной кнопки
+# в течение THROTTLE_REPEAT_INTERVAL секунд отбрасывается
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "3"))
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", "6"))
+THROTTLE_REPEAT_INTERVAL = float(os.getenv("THROTTLE_REPEAT_INTERVAL", "1"))
+
+# Исходящие сообщения в Telegram (общая очередь всех ботов): не больше SEND_GLOBAL_RATE сообщений
+# в секунду на бота (0 - без очереди), SEND_CHAT_RATE в секунду на личный чат с запасом SEND_CHAT_BURST,
+# SEND_GROUP_RATE в секунду на группу; после ответа 429 сообщение повторяется до SEND_MAX_RETRIES раз
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "25"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = int(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_GROUP_RATE = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+# Перезапуск упавших ботов в start_all_bots.py: пауза base * 2^n секунд, не больше max;
+# после SUPERVISOR_STABLE_UPTIME секунд работы счетчик падений сбрасывается.
+# Отчет о состоянии ботов - http://HEALTH_HOST:HEALTH_PORT/health (порт 0 - не запускать)
+SUPERVISOR_BACKOFF_BASE = float(os.getenv("SUPERVISOR_BACKOFF_BASE", "1"))
+SUPERVISOR_BACKOFF_MAX = float(os.getenv("SUPERVISOR_BACKOFF_MAX", "60"))
+SUPERVISOR_STABLE_UPTIME = float(os.getenv("SUPERVISOR_STABLE_UPTIME", "300"))
+HEALTH_HOST = os.getenv("HEALTH_HOST", "127.0.0.1")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8090"))
+
+# Режим webhook для start_all_bots.py: задайте публичный HTTPS-адрес, по которому Telegram
+# достучится до сервера (например, https://bot.example.com); пустое значение - polling.
+# Один сервер принимает обновления всех ботов по путям WEBHOOK_PATH/<бот>
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# Секретный токен для проверки запросов от Telegram; пустое значение - случайный при каждом запуске
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# Сколько соединений одновременно открывает Telegram (1-100) и сколько обновлений обрабатывается параллельно
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
 BASE_URL = API_URL
 if BASE_URL and "/test" in BASE_URL:
 
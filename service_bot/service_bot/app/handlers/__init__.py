@@ -1,9 +1,24 @@
+"""Роутеры ботов. Модули обработчиков клиентского бота импортируются только при первом
+обращении к main_router: боты сотрудников и механиков импортируют лишь свои модули."""
 from aiogram import Router
-from . import main_handlers, history_handlers, auth_handlers, catalog_handlers
 
-main_router = Router()
+def create_main_router():
 
-main_router.include_router(catalog_handlers.router)
-main_router.include_router(auth_handlers.router)
-main_router.include_router(history_handlers.router)
-main_router.include_router(main_handlers.router)
\ No newline at end of file
+    from . import main_handlers, history_handlers, auth_handlers, catalog_handlers, search_handlers, inline_handlers
+
+    main_router = Router()
+
+    main_router.include_router(catalog_handlers.router)
+    main_router.include_router(auth_handlers.router)
+    main_router.include_router(history_handlers.router)
+    main_router.include_router(search_handlers.router)
+    main_router.include_router(inline_handlers.router)
+    main_router.include_router(main_handlers.router)
+    return main_router
+
+def __getattr__(name):
+    # Роутер подключается к диспетчеру только один раз - создается однажды и запоминается
+    if name == "main_router":
+        globals()["main_router"] = router = create_main_router()
+        return router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
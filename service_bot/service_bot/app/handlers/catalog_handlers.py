@@ -11,12 +11,83 @@ from app.keyboards.keyboards import (
     get_categories_keyboard
 )
 from app.services.api_service import api_service
-from app.utils.formatting import format_message, format_product_info, format_service_info
+from app.services.catalog_store import catalog_store
+from app.services.models import Category, Product, Service
+from app.utils.formatting import format_message, format_product_info, format_service_info, format_stale_notice
 
 router = Router()
 
 ITEMS_PER_PAGE = 10  
 
+def catalog_items(data, record_type):
+    """Записи нужного типа из ответа ApiService (он уже разобрал их из формата 1С)"""
+    if not isinstance(data, list):
+        return []
+    return [item for item in data if isinstance(item, record_type)]
+
+async def load_page(fetch, page, record_type, *args):
+    """Загружает с сервера только нужную страницу, следующую запрашивает в фоне.
+
+    Returns:
+        (ответ API, записи страницы, общее число записей)
+    """
+    offset = (page - 1) * ITEMS_PER_PAGE
+    response = await fetch(*args, offset=offset, limit=ITEMS_PER_PAGE)
+
+    if response.get("status") != 200:
+        return response, [], 0
+
+    items = catalog_items(response.get("data"), record_type)
+    total = response.get("total", offset + len(items))
+
+    if offset + ITEMS_PER_PAGE < total:
+        api_service.prefetch(fetch(*args, offset=offset + ITEMS_PER_PAGE, limit=ITEMS_PER_PAGE))
+
+    return response, items, total
+
+async def fetch_category_products(category_code, offset=0, limit=None):
+    """Товары категории: сначала из карточки категории, если там пусто - отдельным запросом"""
+    response = await api_service.get_category_by_id(category_code, offset=offset, limit=limit)
+    logger.debug(f"Получен ответ от API (category by ID): статус {response.get('status')}")
+
+    data = response.get("data")
+    if response.get("status") == 200 and isinstance(data, dict) and catalog_items(data.get("products"), Product):
+        result = {"status": 200, "data": data["products"], "total": response.get("total", 0)}
+        if "stale_age" in response:
+            result["stale_age"] = response["stale_age"]
+        return result
+
+    response = await api_service.get_products_by_category(category_code, offset=offset, limit=limit)
+    logger.debug(f"Получен ответ от API (products by category): статус {response.get('status')}")
+    return response
+
+def clamp_page(state_data, list_kind, page):
+    """Ограничивает номер страницы числом страниц, известным для этого списка"""
+    if state_data.get("list_kind") != list_kind:
+        return max(1, page)
+    return max(1, min(page, max(state_data.get("total_pages", page), 1)))
+
+async def remember_page(state: FSMContext, list_kind, records, page, total_pages, **extra):
+    """Записи уходят в общее хранилище, в FSM - только версия снимка, вид списка и страница"""
+    catalog_store.remember(records)
+    await state.update_data(
+        catalog_version=catalog_store.version,
+        list_kind=list_kind,
+        page=page,
+        total_pages=total_pages,
+        **extra
+    )
+
+async def find_record(state: FSMContext, record_type, record_id):
+    """Запись из индекса каталога по id; id записей 1С не меняются между снимками,
+    поэтому кнопки из списка, показанного до обновления индекса, остаются рабочими"""
+    record = catalog_store.get(record_type, record_id)
+    if record is None:
+        state_data = await state.get_data()
+        logger.debug(f"Запись {record_type.__name__} {record_id} не найдена "
+                     f"(снимок пользователя {state_data.get('catalog_version')}, текущий {catalog_store.version})")
+    return record
+
 @router.callback_query(F.data == "catalog_products")
 async def process_catalog_products(callback: CallbackQuery, state: FSMContext):
 
@@ -27,80 +98,18 @@ async def process_catalog_products(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML"
     )
 
-    response = await api_service.get_products()
-    logger.debug(f"Получен ответ от API (products): {response}")
+    await show_products_page(callback, state, 1)
+    await callback.answer()
 
-    if response.get("status") == 200 and "data" in response:
+async def show_products_page(callback: CallbackQuery, state: FSMContext, page: int):
 
-        products_data = response.get("data", [])
+    page = clamp_page(await state.get_data(), "products", page)
 
-        logger.debug(f"Данные продуктов: {products_data}")
+    response, products, total = await load_page(api_service.get_products, page, Product)
+    logger.debug(f"Получен ответ от API (products): статус {response.get('status')}, "
+                 f"страница {page}, товаров {len(products)} из {total}")
 
-        if isinstance(products_data, dict) and 'products' in products_data:
-            products = products_data.get('products', [])
-        else:
-            products = products_data
-
-        formatted_products = []
-
-        if isinstance(products, list):
-            for product in products:
-                if isinstance(product, dict):
-
-                    if 'Наименование' in product:
-                        product_id = product.get("Идентификатор", "")
-                        if isinstance(product_id, dict) and "id" in product_id:
-                            product_id = product_id.get("id", "")
-                            
-                        category = product.get("Категория", "")
-                        if isinstance(category, dict) and "id" in category:
-                            category = category.get("id", "")
-                            
-                        formatted_products.append({
-                            "id": product_id,
-                            "code": product.get("Код", ""), 
-                            "name": product.get("Наименование", "Товар"),
-                            "price": product.get("Цена", "По запросу"),
-                            "description": product.get("Описание", ""),
-                            "stock": product.get("КоличествоНаСкладе", 0),
-                            "category": category,
-                            "category_name": product.get("КатегорияНаименование", "")
-                        })
-                    else:
-
-                        if "code" not in product and "id" in product:
-                            product["code"] = product["id"]  
-                        formatted_products.append(product)
-                elif isinstance(product, str):
-
-                    formatted_products.append({
-                        "id": product, 
-                        "name": product, 
-                        "price": "По запросу",
-                        "code": product  
-                    })
-                else:
-
-                    logger.warning(f"Неизвестный тип данных продукта: {type(product)}, значение: {product}")
-
-        if formatted_products:
-
-            await state.update_data(
-                products=formatted_products,
-                current_page=1,
-                total_pages=math.ceil(len(formatted_products) / ITEMS_PER_PAGE)
-            )
-
-            await show_products_page(callback, state, 1)
-        else:
-            await callback.message.edit_text(
-                "<b>😔 Каталог товаров пуст</b>\n\n"
-                "К сожалению, в данный момент в каталоге нет доступных товаров.\n"
-                "Пожалуйста, загляните позже или свяжитесь с нами для получения дополнительной информации.",
-                reply_markup=get_main_menu(),
-                parse_mode="HTML"
-            )
-    else:
+    if response.get("status") != 200:
         error_message = response.get("data", {}).get("message", "Не удалось загрузить каталог товаров")
         await callback.message.edit_text(
             f"<b>❌ Ошибка</b>\n\n{error_message}\n\n"
@@ -108,26 +117,20 @@ async def process_catalog_products(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_main_menu(),
             parse_mode="HTML"
         )
+        return
 
-    await callback.answer()
-
-async def show_products_page(callback: CallbackQuery, state: FSMContext, page: int):
-
-    state_data = await state.get_data()
-    products = state_data.get("products", [])
-    total_pages = state_data.get("total_pages", 1)
-
-    if page < 1:
-        page = 1
-    elif page > total_pages:
-        page = total_pages
-
-    await state.update_data(current_page=page)
-
-    start_idx = (page - 1) * ITEMS_PER_PAGE
-    end_idx = min(start_idx + ITEMS_PER_PAGE, len(products))
+    if not products:
+        await callback.message.edit_text(
+            "<b>😔 Каталог товаров пуст</b>\n\n"
+            "К сожалению, в данный момент в каталоге нет доступных товаров.\n"
+            "Пожалуйста, загляните позже или свяжитесь с нами для получения дополнительной информации.",
+            reply_markup=get_main_menu(),
+            parse_mode="HTML"
+        )
+        return
 
-    current_page_items = products[start_idx:end_idx]
+    total_pages = math.ceil(total / ITEMS_PER_PAGE)
+    await remember_page(state, "products", products, page, total_pages)
 
     text = (
         "<b>🛒 Каталог автозапчастей и аксессуаров</b>\n\n"
@@ -137,10 +140,11 @@ async def show_products_page(callback: CallbackQuery, state: FSMContext, page: i
 
     if total_pages > 1:
         text += f"\n\nСтраница {page} из {total_pages}"
+    text += format_stale_notice(response)
 
     await callback.message.edit_text(
         text,
-        reply_markup=get_products_keyboard(current_page_items, page, total_pages),
+        reply_markup=get_products_keyboard(products, page, total_pages),
         parse_mode="HTML"
     )
 
@@ -162,74 +166,18 @@ async def process_catalog_services(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML"
     )
 
-    response = await api_service.get_services()
-    logger.debug(f"Получен ответ от API (services): {response}")
-
-    if response.get("status") == 200 and "data" in response:
+    await show_services_page(callback, state, 1)
+    await callback.answer()
 
-        services_data = response.get("data", [])
+async def show_services_page(callback: CallbackQuery, state: FSMContext, page: int):
 
-        logger.debug(f"Данные услуг: {services_data}")
+    page = clamp_page(await state.get_data(), "services", page)
 
-        if isinstance(services_data, dict) and 'services' in services_data:
-            services = services_data.get('services', [])
-        else:
-            services = services_data
-
-        formatted_services = []
-
-        if isinstance(services, list):
-            for service in services:
-                if isinstance(service, dict):
-
-                    if 'Наименование' in service:                        
-                        service_id = service.get("Идентификатор", "")
-                        if isinstance(service_id, dict) and "id" in service_id:
-                            service_id = service_id.get("id", "")
-                            
-                        formatted_services.append({
-                            "id": service_id,
-                            "code": service.get("Код", ""), 
-                            "name": service.get("Наименование", "Услуга"),
-                            "price": service.get("Цена", "По запросу"),
-                            "description": service.get("Описание", ""),
-                            "duration": service.get("Длительность", 0)
-                        })
-                    else:
-
-                        if "code" not in service and "id" in service:
-                            service["code"] = service["id"]  
-                        formatted_services.append(service)
-                elif isinstance(service, str):
-
-                    formatted_services.append({
-                        "id": service, 
-                        "name": service, 
-                        "price": "По запросу",
-                        "code": service  
-                    })
-                else:
-
-                    logger.warning(f"Неизвестный тип данных услуги: {type(service)}, значение: {service}")
-
-        if formatted_services:
-
-            await state.update_data(
-                services=formatted_services,
-                current_services_page=1,
-                total_services_pages=math.ceil(len(formatted_services) / ITEMS_PER_PAGE)
-            )
+    response, services, total = await load_page(api_service.get_services, page, Service)
+    logger.debug(f"Получен ответ от API (services): статус {response.get('status')}, "
+                 f"страница {page}, услуг {len(services)} из {total}")
 
-            await show_services_page(callback, state, 1)
-        else:
-            await callback.message.edit_text(
-                "<b>😔 Каталог услуг пуст</b>\n\n"
-                "К сожалению, в данный момент в каталоге нет доступных услуг.\n"
-                "Пожалуйста, загляните позже или свяжитесь с нами для получения дополнительной информации.",
-                reply_markup=get_main_menu(),
-                parse_mode="HTML"
-            )
-    else:
+    if response.get("status") != 200:
         error_message = response.get("data", {}).get("message", "Не удалось загрузить каталог услуг")
         await callback.message.edit_text(
             f"<b>❌ Ошибка</b>\n\n{error_message}\n\n"
@@ -237,26 +185,20 @@ async def process_catalog_services(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_main_menu(),
             parse_mode="HTML"
         )
+        return
 
-    await callback.answer()
-
-async def show_services_page(callback: CallbackQuery, state: FSMContext, page: int):
-
-    state_data = await state.get_data()
-    services = state_data.get("services", [])
-    total_pages = state_data.get("total_services_pages", 1)
-
-    if page < 1:
-        page = 1
-    elif page > total_pages:
-        page = total_pages
-
-    await state.update_data(current_services_page=page)
-
-    start_idx = (page - 1) * ITEMS_PER_PAGE
-    end_idx = min(start_idx + ITEMS_PER_PAGE, len(services))
+    if not services:
+        await callback.message.edit_text(
+            "<b>😔 Каталог услуг пуст</b>\n\n"
+            "К сожалению, в данный момент в каталоге нет доступных услуг.\n"
+            "Пожалуйста, загляните позже или свяжитесь с нами для получения дополнительной информации.",
+            reply_markup=get_main_menu(),
+            parse_mode="HTML"
+        )
+        return
 
-    current_page_items = services[start_idx:end_idx]
+    total_pages = math.ceil(total / ITEMS_PER_PAGE)
+    await remember_page(state, "services", services, page, total_pages)
 
     text = (
         "<b>🔧 Услуги автосервиса</b>\n\n"
@@ -267,10 +209,11 @@ async def show_services_page(callback: CallbackQuery, state: FSMContext, page: i
 
     if total_pages > 1:
         text += f"\n\nСтраница {page} из {total_pages}"
+    text += format_stale_notice(response)
 
     await callback.message.edit_text(
         text,
-        reply_markup=get_services_keyboard(current_page_items, page, total_pages),
+        reply_markup=get_services_keyboard(services, page, total_pages),
         parse_mode="HTML"
     )
 
@@ -286,19 +229,11 @@ async def process_services_pagination(callback: CallbackQuery, state: FSMContext
 async def process_product_detail(callback: CallbackQuery, state: FSMContext):
     product_id = callback.data.split("_")[1]
 
-    state_data = await state.get_data()
-    all_products = state_data.get("products", []) + state_data.get("category_products", [])
-
-    selected_product = next((p for p in all_products if p.get("id") == product_id), None)
+    selected_product = await find_record(state, Product, product_id)
 
     product_code = ""
     if selected_product:
-        product_code = selected_product.get("code", selected_product.get("Код", ""))
-        
-        if not product_code:
-            product_code = selected_product.get("id", selected_product.get("Идентификатор", ""))
-            if isinstance(product_code, dict) and "id" in product_code:
-                product_code = product_code.get("id", "")
+        product_code = selected_product.code or selected_product.id
 
     if not product_code:
         await callback.message.edit_text(
@@ -327,7 +262,7 @@ async def process_product_detail(callback: CallbackQuery, state: FSMContext):
 
         if product:
 
-            product_info = format_product_info(product)
+            product_info = format_product_info(product) + format_stale_notice(response)
 
             await callback.message.edit_text(
                 product_info,
@@ -361,18 +296,11 @@ async def process_back_to_products(callback: CallbackQuery, state: FSMContext):
 async def process_service_detail(callback: CallbackQuery, state: FSMContext):
     service_id = callback.data.split("_")[1]
 
-    state_data = await state.get_data()
-    all_services = state_data.get("services", [])
-    selected_service = next((s for s in all_services if s.get("id") == service_id), None)
+    selected_service = await find_record(state, Service, service_id)
 
     service_code = ""
     if selected_service:
-        service_code = selected_service.get("code", selected_service.get("Код", ""))
-        
-        if not service_code:
-            service_code = selected_service.get("id", selected_service.get("Идентификатор", ""))
-            if isinstance(service_code, dict) and "id" in service_code:
-                service_code = service_code.get("id", "")
+        service_code = selected_service.code or selected_service.id
 
     if not service_code:
         await callback.message.edit_text(
@@ -393,13 +321,13 @@ async def process_service_detail(callback: CallbackQuery, state: FSMContext):
     if response.get("status") == 200 and "data" in response:
 
         data = response.get("data", {})
-        service = data.get("service", data)  
+        service = data.get("service", data) if isinstance(data, dict) else data
 
         if service:
 
             logger.debug(f"Данные услуги для форматирования: {service}")
 
-            service_info = format_service_info(service)
+            service_info = format_service_info(service) + format_stale_notice(response)
 
             await callback.message.edit_text(
                 service_info,
@@ -438,79 +366,24 @@ async def process_catalog_categories(callback: CallbackQuery, state: FSMContext)
         parse_mode="HTML"
     )
 
+    await show_categories_page(callback, state, 1)
+    await callback.answer()
+
+async def load_categories():
+    """Все категории (их немного, список берется из кэша ApiService целиком)"""
     response = await api_service.get_categories()
-    logger.debug(f"Получен ответ от API (categories): {response}")
+    logger.debug(f"Получен ответ от API (categories): статус {response.get('status')}")
 
-    if response.get("status") == 200 and "data" in response:
+    if response.get("status") != 200:
+        return response, []
+    return response, catalog_store.remember(catalog_items(response.get("data"), Category))
 
-        categories_data = response.get("data", [])
-
-        logger.debug(f"Данные категорий: {categories_data}")
-
-        formatted_categories = []
-        
-        if isinstance(categories_data, dict) and 'categories' in categories_data:
-            categories_list = categories_data.get('categories', [])
-
-            for category in categories_list:
-                if isinstance(category, dict):
-                    category_id = category.get("Идентификатор", category.get("Код", ""))
-                    
-                    if isinstance(category_id, dict) and "id" in category_id:
-                        category_id = category_id.get("id", "")
-                        
-                    formatted_categories.append({
-                        "id": category_id,
-                        "name": category.get("Наименование", "Категория"),
-                        "description": category.get("Описание", ""),
-                        "code": category.get("Код", "")
-                    })
-                elif isinstance(category, str):
-                    formatted_categories.append({"id": category, "name": category})        
-        elif isinstance(categories_data, list):
-            for category in categories_data:
-                if isinstance(category, dict):
-                    if "Наименование" in category:
-                        category_id = category.get("Идентификатор", category.get("Код", ""))
-                        
-                        if isinstance(category_id, dict) and "id" in category_id:
-                            category_id = category_id.get("id", "")
-                            
-                        formatted_categories.append({
-                            "id": category_id,
-                            "name": category.get("Наименование", "Категория"),
-                            "description": category.get("Описание", ""),
-                            "code": category.get("Код", "")
-                        })
-                    else:
-                        formatted_categories.append(category)
-                elif isinstance(category, str):
-
-                    formatted_categories.append({"id": category, "name": category})
-                else:
-
-                    logger.warning(f"Неизвестный тип данных категории: {type(category)}, значение: {category}")
-
-        logger.debug(f"Форматированные категории: {formatted_categories}")
-
-        if formatted_categories:
-
-            await state.update_data(
-                categories=formatted_categories,
-                current_categories_page=1,
-                total_categories_pages=math.ceil(len(formatted_categories) / ITEMS_PER_PAGE)
-            )
+async def show_categories_page(callback: CallbackQuery, state: FSMContext, page: int):
 
-            await show_categories_page(callback, state, 1)
-        else:
-            await callback.message.edit_text(
-                "<b>😔 Каталог категорий пуст</b>\n\n"
-                "К сожалению, в данный момент в каталоге нет доступных категорий.\n"
-                "Пожалуйста, загляните позже или свяжитесь с нами для получения дополнительной информации.",
-                reply_markup=get_main_menu(),
-                parse_mode="HTML"
-            )
-    else:
+    response, categories = await load_categories()
+    logger.debug(f"Получено категорий: {len(categories)}")
+
+    if response.get("status") != 200:
         error_message = response.get("data", {}).get("message", "Не удалось загрузить каталог категорий")
         await callback.message.edit_text(
             f"<b>❌ Ошибка</b>\n\n{error_message}\n\n"
@@ -518,26 +391,25 @@ async def process_catalog_categories(callback: CallbackQuery, state: FSMContext)
             reply_markup=get_main_menu(),
             parse_mode="HTML"
         )
+        return
 
-    await callback.answer()
-
-async def show_categories_page(callback: CallbackQuery, state: FSMContext, page: int):
-
-    state_data = await state.get_data()
-    categories = state_data.get("categories", [])
-    total_pages = state_data.get("total_categories_pages", 1)
+    if not categories:
+        await callback.message.edit_text(
+            "<b>😔 Каталог категорий пуст</b>\n\n"
+            "К сожалению, в данный момент в каталоге нет доступных категорий.\n"
+            "Пожалуйста, загляните позже или свяжитесь с нами для получения дополнительной информации.",
+            reply_markup=get_main_menu(),
+            parse_mode="HTML"
+        )
+        return
 
-    if page < 1:
-        page = 1
-    elif page > total_pages:
-        page = total_pages
+    total_pages = math.ceil(len(categories) / ITEMS_PER_PAGE)
+    page = max(1, min(page, total_pages))
 
-    await state.update_data(current_categories_page=page)
+    await remember_page(state, "categories", (), page, total_pages, categories_page=page)
 
     start_idx = (page - 1) * ITEMS_PER_PAGE
-    end_idx = min(start_idx + ITEMS_PER_PAGE, len(categories))
-
-    current_page_items = categories[start_idx:end_idx]
+    current_page_items = categories[start_idx:start_idx + ITEMS_PER_PAGE]
 
     text = (
         "<b>📂 Категории товаров</b>\n\n"
@@ -546,6 +418,7 @@ async def show_categories_page(callback: CallbackQuery, state: FSMContext, page:
 
     if total_pages > 1:
         text += f"\n\nСтраница {page} из {total_pages}"
+    text += format_stale_notice(response)
 
     await callback.message.edit_text(
         text,
@@ -561,20 +434,16 @@ async def process_categories_pagination(callback: CallbackQuery, state: FSMConte
     await show_categories_page(callback, state, page)
     await callback.answer()
 
-@router.callback_query(F.data.startswith("category_"))
+@router.callback_query(F.data.startswith("category_") & ~F.data.startswith("category_products_"))
 async def process_category_products(callback: CallbackQuery, state: FSMContext):
 
     category_id = callback.data.split("_")[1]
     logger.debug(f"Выбрана категория с ID: {category_id}")
 
-    state_data = await state.get_data()
-    all_categories = state_data.get("categories", [])
-    logger.debug(f"Все категории: {all_categories}")
-    
-    selected_category = next((cat for cat in all_categories if cat.get("id") == category_id), {"name": "Категория"})
+    selected_category = await find_record(state, Category, category_id) or Category()
     logger.debug(f"Выбранная категория: {selected_category}")
-    
-    category_name = selected_category.get("name", "Категория")
+
+    category_name = selected_category.name
 
     await callback.message.edit_text(
         f"<b>🔄 Загружаем товары категории \"{category_name}\"...</b>\n"
@@ -582,18 +451,9 @@ async def process_category_products(callback: CallbackQuery, state: FSMContext):
         reply_markup=None,
         parse_mode="HTML"
     )
-    await state.update_data(selected_category=selected_category)
-    
-    category_code = ""
-    
-    if selected_category:
-        category_code = selected_category.get("code", "")
-        if not category_code:
-            category_code = selected_category.get("Код", "")
-        
-        if not category_code:
-            category_code = category_id
-    
+
+    category_code = selected_category.code or category_id
+
     logger.debug(f"Финальный код категории для API запроса: {category_code}")
 
     if not category_code:
@@ -606,99 +466,38 @@ async def process_category_products(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
         return
 
-    response = await api_service.get_category_by_id(category_code)
-    logger.debug(f"Получен ответ от API (category by ID): {response}")
-
-    products_data = []
-
-    if response.get("status") == 200 and "data" in response and isinstance(response["data"], dict):
-        category_data = response["data"]
+    await state.update_data(category_id=category_id, category_code=category_code, list_kind=None)
 
-        if "products" in category_data and isinstance(category_data["products"], list):
-            products_data = category_data["products"]
-
-    if not products_data:
-        response = await api_service.get_products_by_category(category_code)
-        logger.debug(f"Получен ответ от API (products by category): {response}")
-
-        if response.get("status") == 200 and "data" in response:
-
-            products_data = response.get("data", [])
-
-    logger.debug(f"Данные товаров по категории: {products_data}")
-
-    if isinstance(products_data, dict) and 'products' in products_data:
-        products = products_data.get('products', [])
-    else:
-        products = products_data
-
-    formatted_products = []    
-    if isinstance(products, list):
-        for product in products:
-            if isinstance(product, dict):
-                if 'Наименование' in product:
-                    product_id = product.get("Идентификатор", "")
-                    if isinstance(product_id, dict) and "id" in product_id:
-                        product_id = product_id.get("id", "")
-                        
-                    category = product.get("Категория", "")
-                    if isinstance(category, dict) and "id" in category:
-                        category = category.get("id", "")
-
-                    formatted_products.append({
-                        "id": product_id,
-                        "code": product.get("Код", ""),
-                        "name": product.get("Наименование", "Товар"),
-                        "price": product.get("Цена", "По запросу"),
-                        "description": product.get("Описание", ""),
-                        "stock": product.get("КоличествоНаСкладе", 0),
-                        "category": category,
-                        "category_name": product.get("КатегорияНаименование", "")
-                    })
-                else:
-                    formatted_products.append(product)
-            elif isinstance(product, str):
-                formatted_products.append({"id": product, "name": product, "price": "По запросу"})
-
-    if formatted_products:
-
-        await state.update_data(
-            category_products=formatted_products,
-            current_category_page=1,
-            total_category_pages=math.ceil(len(formatted_products) / ITEMS_PER_PAGE)
-        )
-
-        await show_category_products_page(callback, state, 1)
-    else:
+    if not await show_category_products_page(callback, state, 1):
+        _, categories = await load_categories()
         await callback.message.edit_text(
             f"<b>😔 В категории \"{category_name}\" нет товаров</b>\n\n"
             f"К сожалению, в данный момент в этой категории нет доступных товаров.\n"
             f"Пожалуйста, выберите другую категорию или загляните позже.",
-            reply_markup=get_categories_keyboard(all_categories, 1, math.ceil(len(all_categories) / ITEMS_PER_PAGE)),
+            reply_markup=get_categories_keyboard(
+                categories[:ITEMS_PER_PAGE], 1, math.ceil(len(categories) / ITEMS_PER_PAGE)
+            ),
             parse_mode="HTML"
         )
 
     await callback.answer()
 
 async def show_category_products_page(callback: CallbackQuery, state: FSMContext, page: int):
-
+    """Показывает страницу товаров категории; False, если товаров нет"""
     state_data = await state.get_data()
-    products = state_data.get("category_products", [])
-    total_pages = state_data.get("total_category_pages", 1)
-    selected_category = state_data.get("selected_category", {"name": "Категория"})
-    category_name = selected_category.get("name", "Категория")
+    category_code = state_data.get("category_code", "")
+    selected_category = catalog_store.get(Category, state_data.get("category_id", "")) or Category()
+    category_name = selected_category.name
+    page = clamp_page(state_data, "category_products", page)
 
-    if page < 1:
-        page = 1
-    elif page > total_pages:
-        page = total_pages
+    response, current_page_items, total = await load_page(fetch_category_products, page, Product, category_code)
+    logger.debug(f"Товаров в категории {category_code}: страница {page}, {len(current_page_items)} из {total}")
 
-    await state.update_data(current_category_page=page)
-
-    start_idx = (page - 1) * ITEMS_PER_PAGE
-    end_idx = min(start_idx + ITEMS_PER_PAGE, len(products))
+    if not current_page_items:
+        return False
 
-    current_page_items = products[start_idx:end_idx]
+    total_pages = math.ceil(total / ITEMS_PER_PAGE)
+    await remember_page(state, "category_products", current_page_items, page, total_pages)
 
     text = (
         f"<b>🛒 Товары категории \"{category_name}\"</b>\n\n"
@@ -707,20 +506,18 @@ async def show_category_products_page(callback: CallbackQuery, state: FSMContext
 
     if total_pages > 1:
         text += f"\n\nСтраница {page} из {total_pages}"
+    text += format_stale_notice(response)
 
     builder = InlineKeyboardBuilder()
 
     for product in current_page_items:
-        name = product.get('name', 'Товар')
-        price = product.get('price', 'По запросу')
-        product_id = product.get('id', '')
-
+        price = product.price
         price_text = f"{price}₽" if isinstance(price, (int, float)) else price
 
         builder.row(
             InlineKeyboardButton(
-                text=f"{name} - {price_text}",
-                callback_data=f"product_{product_id}"
+                text=f"{product.name} - {price_text}",
+                callback_data=f"product_{product.id}"
             )
         )
 
@@ -767,6 +564,7 @@ async def show_category_products_page(callback: CallbackQuery, state: FSMContext
         reply_markup=builder.as_markup(),
         parse_mode="HTML"
     )
+    return True
 
 @router.callback_query(F.data.startswith("category_products_page_"))
 async def process_category_products_pagination(callback: CallbackQuery, state: FSMContext):
@@ -780,32 +578,6 @@ async def process_category_products_pagination(callback: CallbackQuery, state: F
 async def process_back_to_categories(callback: CallbackQuery, state: FSMContext):
 
     state_data = await state.get_data()
-    categories = state_data.get("categories", [])
-    current_page = state_data.get("current_categories_page", 1)
-    total_pages = state_data.get("total_categories_pages", 1)
-
-    if current_page < 1:
-        current_page = 1
-    elif current_page > total_pages:
-        current_page = total_pages
-
-    start_idx = (current_page - 1) * ITEMS_PER_PAGE
-    end_idx = min(start_idx + ITEMS_PER_PAGE, len(categories))
 
-    current_page_items = categories[start_idx:end_idx]
-
-    text = (
-        "<b>📂 Категории товаров</b>\n\n"
-        "Выберите интересующую вас категорию товаров из списка ниже:"
-    )
-
-    if total_pages > 1:
-        text += f"\n\nСтраница {current_page} из {total_pages}"
-
-    await callback.message.edit_text(
-        text,
-        reply_markup=get_categories_keyboard(current_page_items, current_page, total_pages),
-        parse_mode="HTML"
-    )
-
-    await callback.answer()
+    await show_categories_page(callback, state, state_data.get("categories_page", 1))
+    await callback.answer()
\ No newline at end of file
@@ -0,0 +1,24 @@
+from aiogram import Router
+from aiogram.types import InlineQuery
+from loguru import logger
+
+from app.config.config import INLINE_CACHE_TIME
+from app.services.inline_search import inline_search
+
+router = Router()
+
+@router.inline_query()
+async def process_inline_query(inline_query: InlineQuery):
+    """Inline-поиск по каталогу (@бот запрос). 1С не запрашивается: пока индекс
+    не загружен при запуске, ответ пустой"""
+    query = inline_query.query.strip()
+
+    # Запросы, на которые ответ уже готов, не ждут паузы в наборе
+    if query and not inline_search.is_cached(query):
+        if not await inline_search.debounce(inline_query.from_user.id):
+            return
+
+    results = inline_search.results(query) if query else []
+    logger.info(f"Inline-запрос пользователя {inline_query.from_user.id}: \"{query}\", найдено {len(results)}")
+
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=False)
@@ -2,6 +2,7 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, CommandStart
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.fsm.context import FSMContext
 from loguru import logger
 from app.utils.formatting import format_support_info
 from app.keyboards.keyboards import get_back_button
@@ -9,6 +10,7 @@ from aiogram.utils.markdown import bold, code
 
 from app.keyboards.keyboards import get_main_menu
 from app.utils.formatting import get_main_menu_text
+from app.handlers.search_handlers import send_search_results
 
 router = Router()
 
@@ -29,6 +31,7 @@ async def cmd_help(message: Message):
 - <b>Категории:</b> Просмотр каталога товаров.
 - <b>Все товары:</b> Показать весь ассортимент.
 - <b>Услуги:</b> Записаться на диагностику или ремонт.
+- <b>Поиск:</b> Найти товар или услугу по названию или коду (/search или просто напишите запрос).
 - <b>Личный кабинет:</b> Управление заказами и профилем.
 - <b>О сервисе:</b> Информация о компании.
 
@@ -238,7 +241,12 @@ async def process_other_callbacks(callback: CallbackQuery):
 
 
 @router.message()
-async def process_other_messages(message: Message):
+async def process_other_messages(message: Message, state: FSMContext):
+
+    # Обычный текст вне сценариев считаем поисковым запросом
+    if message.text and not message.text.startswith("/") and await state.get_state() is None:
+        await send_search_results(message, state, message.text)
+        return
 
     user_name = message.from_user.first_name
 
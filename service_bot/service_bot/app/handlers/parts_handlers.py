@@ -0,0 +1,79 @@
+from html import escape
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from loguru import logger
+
+from app.services.api_service import api_service
+from app.services.fuzzy import fuzzy_index
+
+PART_RESULTS_LIMIT = 10
+
+class PartSearchStates(StatesGroup):
+    waiting_for_query = State()
+
+def format_part_results(query, results):
+    """Список найденных товаров: код, название, цена и остаток"""
+    lines = [f"🔎 <b>Найдено по запросу «{escape(query)}»:</b>\n"]
+
+    for number, (product, distance) in enumerate(results, 1):
+        price = product.price
+        price_text = f"{price} ₽" if isinstance(price, (int, float)) else price
+        mark = "" if distance == 0 else " ≈"
+        lines.append(
+            f"{number}. <code>{escape(product.code or product.id)}</code>{mark} {escape(product.name)}\n"
+            f"    💰 {price_text} | 📦 на складе: {product.stock}"
+        )
+
+    return "\n".join(lines)
+
+async def answer_part_search(message: Message, state: FSMContext, query, user_id=None):
+    """Нечеткий поиск по кодам и названиям товаров с ответом в чат"""
+    user_id = user_id or message.from_user.id
+    await state.clear()
+    query = (query or "").strip()
+
+    if not query:
+        await message.answer("Введите код или название запчасти (можно с опечатками, пробелами и дефисами):")
+        await state.set_state(PartSearchStates.waiting_for_query)
+        return
+
+    # Индекс еще не загружен (запуск или недоступность 1С): загрузка идет в фоне, ответ ее не ждет
+    if not len(fuzzy_index):
+        api_service.request_index_refresh()
+        await message.answer("⏳ Каталог загружается, попробуйте повторить поиск через минуту: /part")
+        return
+
+    results = fuzzy_index.search(query, limit=PART_RESULTS_LIMIT)
+    logger.info(f"Поиск запчасти пользователем {user_id}: \"{query}\", найдено {len(results)}")
+
+    if not results:
+        await message.answer(f"😔 По запросу «{escape(query)}» ничего не найдено. Проверьте код и попробуйте снова: /part")
+        return
+
+    await message.answer(format_part_results(query, results))
+
+def create_part_search_router():
+    """Роутер поиска запчастей; создается отдельно для каждого бота (бот сотрудников и бот СТО)"""
+    router = Router()
+
+    @router.message(Command("part"))
+    async def cmd_part(message: Message, command: CommandObject, state: FSMContext):
+        """Обработчик команды /part <код или название>"""
+        await answer_part_search(message, state, command.args)
+
+    @router.callback_query(F.data == "part_search")
+    async def part_search(callback: CallbackQuery, state: FSMContext):
+        """Обработчик нажатия на кнопку поиска запчасти"""
+        await callback.answer()
+        await answer_part_search(callback.message, state, None, user_id=callback.from_user.id)
+
+    @router.message(PartSearchStates.waiting_for_query, F.text)
+    async def process_part_query(message: Message, state: FSMContext):
+        """Обработчик ввода кода или названия запчасти"""
+        await answer_part_search(message, state, message.text)
+
+    return router
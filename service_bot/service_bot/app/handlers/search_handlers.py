@@ -0,0 +1,90 @@
+from html import escape
+
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import InlineKeyboardButton
+from loguru import logger
+
+from app.keyboards.keyboards import get_main_menu, get_search_results_keyboard
+from app.services.api_service import api_service
+from app.services.search import search_index
+
+router = Router()
+
+MIN_QUERY_LENGTH = 2
+SEARCH_RESULTS_LIMIT = 10
+
+class SearchStates(StatesGroup):
+
+    waiting_for_query = State()
+
+def get_search_prompt_keyboard():
+
+    builder = InlineKeyboardBuilder()
+    builder.row(InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main"))
+    return builder.as_markup()
+
+CATALOG_LOADING_TEXT = "<b>⏳ Каталог загружается</b>\n\nПопробуйте повторить поиск через минуту."
+
+SEARCH_PROMPT = (
+    "<b>🔍 Поиск по каталогу</b>\n\n"
+    "Введите название, артикул или код товара либо название услуги.\n"
+    "<i>Например: тормозные колодки brembo</i>"
+)
+
+async def send_search_results(message: Message, state: FSMContext, query: str):
+    """Ищет по локальному индексу каталога и отвечает списком найденного"""
+    query = (query or "").strip()
+    await state.set_state(None)
+
+    if len(query) < MIN_QUERY_LENGTH:
+        await state.set_state(SearchStates.waiting_for_query)
+        await message.answer(SEARCH_PROMPT, reply_markup=get_search_prompt_keyboard(), parse_mode="HTML")
+        return
+
+    # Сразу после запуска (или пока 1С недоступна) индекс может быть еще не загружен:
+    # загрузка идет в фоне, сообщение ее не ждет
+    if not len(search_index):
+        api_service.request_index_refresh()
+        await message.answer(CATALOG_LOADING_TEXT, reply_markup=get_main_menu(), parse_mode="HTML")
+        return
+
+    results = search_index.search(query, limit=SEARCH_RESULTS_LIMIT)
+    logger.info(f"Поиск пользователя {message.from_user.id}: \"{query}\", найдено {len(results)}")
+
+    if not results:
+        await message.answer(
+            f"<b>😔 По запросу «{escape(query)}» ничего не найдено</b>\n\n"
+            "Попробуйте изменить запрос или посмотрите каталог.",
+            reply_markup=get_main_menu(),
+            parse_mode="HTML"
+        )
+        return
+
+    await message.answer(
+        f"<b>🔍 Результаты поиска «{escape(query)}»</b>\n\n"
+        "<i>Выберите товар или услугу из списка ниже:</i>",
+        reply_markup=get_search_results_keyboard(results),
+        parse_mode="HTML"
+    )
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, command: CommandObject, state: FSMContext):
+
+    await send_search_results(message, state, command.args)
+
+@router.callback_query(F.data == "catalog_search")
+async def process_catalog_search(callback: CallbackQuery, state: FSMContext):
+
+    await state.set_state(SearchStates.waiting_for_query)
+    await callback.message.edit_text(SEARCH_PROMPT, reply_markup=get_search_prompt_keyboard(), parse_mode="HTML")
+    await callback.answer()
+
+@router.message(SearchStates.waiting_for_query, F.text)
+async def process_search_query(message: Message, state: FSMContext):
+
+    await send_search_results(message, state, message.text)
@@ -6,6 +6,7 @@ from aiogram.fsm.state import State, StatesGroup
 from loguru import logger
 
 from app.services.api_service import api_service
+from app.handlers.parts_handlers import create_part_search_router
 from app.keyboards.staff_keyboards import (
     get_staff_main_menu, 
     get_orders_list_keyboard, 
@@ -88,7 +89,8 @@ async def cmd_help(message: Message):
     help_text = (
         "🔍 <b>Справка по использованию бота для сотрудников:</b>\n\n"
         "/start - Начать работу с ботом или вернуться в главное меню\n"
-        "/help - Показать эту справку\n\n"
+        "/help - Показать эту справку\n"
+        "/part &lt;код или название&gt; - Найти запчасть (опечатки, пробелы и дефисы допускаются)\n\n"
         "Используйте кнопки меню для навигации по функциям бота."
     )
     await message.answer(help_text)
@@ -219,4 +221,6 @@ async def back_to_menu(callback: CallbackQuery):
         reply_markup=get_staff_main_menu()
     )
 
+router.include_router(create_part_search_router())
+
 staff_router = router
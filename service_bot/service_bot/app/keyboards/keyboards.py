@@ -1,6 +1,9 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton, ReplyKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
+from app.services.models import Service
+from app.services.transformers import as_category, as_product, as_service
+
 def get_main_menu() -> InlineKeyboardMarkup:
 
     builder = InlineKeyboardBuilder()
@@ -13,6 +16,7 @@ def get_main_menu() -> InlineKeyboardMarkup:
 
     builder.row(
         InlineKeyboardButton(text="🔧 Услуги", callback_data="catalog_services"),
+        InlineKeyboardButton(text="🔍 Поиск", callback_data="catalog_search"),
         InlineKeyboardButton(text="👤 Личный кабинет", callback_data="profile"),
         width=1
     )
@@ -47,10 +51,13 @@ def get_catalog_menu(categories=None) -> InlineKeyboardMarkup:
 
     if categories:
         for cat in categories:
+            cat = as_category(cat)
+            if cat is None:
+                continue
             builder.row(
                 InlineKeyboardButton(
-                    text=cat.get("name", "Категория"),
-                    callback_data=f"category_{cat.get('id')}"
+                    text=cat.name,
+                    callback_data=f"category_{cat.id}"
                 )
             )
 
@@ -68,31 +75,18 @@ def get_products_keyboard(products=None, current_page=1, total_pages=1) -> Inlin
     if products:
         for product in products:
 
-            if not isinstance(product, dict):
-
-                continue
-
-            name = product.get('name', 'Товар')
-            if not name and 'Наименование' in product:
-                name = product.get('Наименование', 'Товар')
-
-            price = product.get('price', 'По запросу')
-            if not price and 'Цена' in product:
-                price = product.get('Цена', 'По запросу')
+            product = as_product(product)
 
-            product_id = product.get('id', '')
-            if not product_id and 'Идентификатор' in product:
-                product_id = product.get('Идентификатор', '')
-
-            if not product_id:
+            if product is None or not product.id:
                 continue
 
+            price = product.price
             price_text = f"{price}₽" if isinstance(price, (int, float)) else price
 
             builder.row(
                 InlineKeyboardButton(
-                    text=f"{name} - {price_text}",
-                    callback_data=f"product_{product_id}"
+                    text=f"{product.name} - {price_text}",
+                    callback_data=f"product_{product.id}"
                 )
             )
 
@@ -143,31 +137,18 @@ def get_services_keyboard(services=None, current_page=1, total_pages=1) -> Inlin
     if services:
         for service in services:
 
-            if not isinstance(service, dict):
+            service = as_service(service)
 
+            if service is None or not service.id:
                 continue
 
-            name = service.get('name', 'Услуга')
-            if not name and 'Наименование' in service:
-                name = service.get('Наименование', 'Услуга')
-
-            price = service.get('price', 'По запросу')
-            if not price and 'Цена' in service:
-                price = service.get('Цена', 'По запросу')
-
-            service_id = service.get('id', '')
-            if not service_id and 'Идентификатор' in service:
-                service_id = service.get('Идентификатор', '')
-
-            if not service_id:
-                continue
-
+            price = service.price
             price_text = f"{price}₽" if isinstance(price, (int, float)) else price
 
             builder.row(
                 InlineKeyboardButton(
-                    text=f"{name} - {price_text}",
-                    callback_data=f"service_{service_id}"
+                    text=f"{service.name} - {price_text}",
+                    callback_data=f"service_{service.id}"
                 )
             )
 
@@ -213,25 +194,15 @@ def get_categories_keyboard(categories=None, current_page=1, total_pages=1) -> I
     if categories:
         for category in categories:
 
-            if not isinstance(category, dict):
+            category = as_category(category)
 
-                continue
-
-            name = category.get('name', 'Категория')
-            if not name and 'Наименование' in category:
-                name = category.get('Наименование', 'Категория')
-
-            category_id = category.get('id', '')
-            if not category_id and 'Идентификатор' in category:
-                category_id = category.get('Идентификатор', '')
-
-            if not category_id:
+            if category is None or not category.id:
                 continue
 
             builder.row(
                 InlineKeyboardButton(
-                    text=f"📁 {name}",
-                    callback_data=f"category_{category_id}"
+                    text=f"📁 {category.name}",
+                    callback_data=f"category_{category.id}"
                 )
             )
 
@@ -275,6 +246,29 @@ def get_categories_keyboard(categories=None, current_page=1, total_pages=1) -> I
 
     return builder.as_markup()
 
+def get_search_results_keyboard(results=None) -> InlineKeyboardMarkup:
+
+    builder = InlineKeyboardBuilder()
+
+    for record in results or ():
+        price = record.price
+        price_text = f"{price}₽" if isinstance(price, (int, float)) else price
+
+        if isinstance(record, Service):
+            text, callback_data = f"🔧 {record.name} - {price_text}", f"service_{record.id}"
+        else:
+            text, callback_data = f"🛒 {record.name} - {price_text}", f"product_{record.id}"
+
+        builder.row(InlineKeyboardButton(text=text, callback_data=callback_data))
+
+    builder.row(
+        InlineKeyboardButton(text="🔍 Новый поиск", callback_data="catalog_search"),
+        InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main"),
+        width=1
+    )
+
+    return builder.as_markup()
+
 def get_product_detail_keyboard(product_id) -> InlineKeyboardMarkup:
 
     builder = InlineKeyboardBuilder()
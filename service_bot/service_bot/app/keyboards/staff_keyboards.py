@@ -13,6 +13,9 @@ def get_staff_main_menu() -> InlineKeyboardMarkup:
     builder.row(
         InlineKeyboardButton(text="📋 Показать все заказы", callback_data="show_orders")
     )
+    builder.row(
+        InlineKeyboardButton(text="🔍 Поиск запчасти", callback_data="part_search")
+    )
     builder.row(
         InlineKeyboardButton(text="ℹ️ Помощь", callback_data="help")
     )
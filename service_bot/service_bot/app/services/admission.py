@@ -0,0 +1,138 @@
+"""Ограничение числа одновременных запросов к 1С с приоритетами.
+
+HTTP-сервис 1С обслуживает параллельно лишь несколько сеансов, поэтому запросы сверх
+лимита ждут в очереди: первыми получают слот изменения от сотрудников и механиков,
+затем запросы заказов, истории и авторизации, последними - просмотр каталога.
+Запрос, прождавший в очереди дольше допустимого для своего класса, отклоняется -
+каталог в этом случае отдается из кэша.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from app.config.config import API_MAX_CONCURRENCY, API_QUEUE_MAX_WAIT
+
+WRITES = 0
+ORDERS = 1
+CATALOG = 2
+PRIORITY_NAMES = {WRITES: "writes", ORDERS: "orders", CATALOG: "catalog"}
+
+# Запросы, которые меняют данные в 1С; POST в этом API используется и для чтения (статус заказа, вход)
+WRITE_METHODS = frozenset(("PUT", "PATCH", "DELETE"))
+
+
+def request_priority(method, endpoint):
+    """Класс приоритета запроса по методу и эндпоинту"""
+    if method.upper() in WRITE_METHODS:
+        return WRITES
+    if endpoint == "/test" or endpoint.startswith("/api/catalog"):
+        return CATALOG
+    return ORDERS
+
+
+class AdmissionRejected(Exception):
+    """Запрос не дождался слота за допустимое время"""
+
+    def __init__(self, priority, waited):
+        super().__init__(f"очередь к 1С: {PRIORITY_NAMES[priority]} ждал {waited:.1f} с")
+        self.priority = priority
+        self.waited = waited
+
+
+class AdmissionController:
+    """Не больше limit одновременных запросов; ожидающие выходят из очереди по приоритету,
+    внутри класса - по порядку прихода. limit <= 0 - без ограничения.
+    max_wait - {имя класса: секунд в очереди}, 0 - ждать без ограничения"""
+
+    def __init__(self, limit=API_MAX_CONCURRENCY, max_wait=API_QUEUE_MAX_WAIT):
+        self.limit = limit
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.stats = {
+            priority: {"admitted": 0, "queued": 0, "rejected": 0, "wait_ms": 0.0, "max_wait_ms": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+    @property
+    def enabled(self):
+        return self.limit > 0
+
+    @asynccontextmanager
+    async def slot(self, priority):
+        """Занимает слот на время запроса; AdmissionRejected, если ожидание превысило max_wait"""
+        if not self.enabled:
+            yield
+            return
+
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority):
+
+        stats = self.stats[priority]
+        # Сверху очереди могут остаться записи запросов, которые уже ушли по таймауту
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            stats["admitted"] += 1
+            return
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait.get(PRIORITY_NAMES[priority]) or None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Слот уже передан этому запросу - возвращаем его следующему
+                self._release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            waited = time.monotonic() - started
+            stats["rejected"] += 1
+            raise AdmissionRejected(priority, waited) from None
+
+        waited_ms = (time.monotonic() - started) * 1000
+        stats["admitted"] += 1
+        stats["wait_ms"] += waited_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], waited_ms)
+
+    def _release(self):
+        """Передает слот первому ожидающему по приоритету, иначе освобождает"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def get_stats(self):
+
+        waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[PRIORITY_NAMES[priority]] += 1
+
+        classes = {}
+        for priority, stats in self.stats.items():
+            queued = stats["queued"] - stats["rejected"]
+            classes[PRIORITY_NAMES[priority]] = {
+                "admitted": stats["admitted"],
+                "queued": stats["queued"],
+                "rejected": stats["rejected"],
+                "avg_wait_ms": round(stats["wait_ms"] / queued, 1) if queued > 0 else 0.0,
+                "max_wait_ms": round(stats["max_wait_ms"], 1),
+                "waiting": waiting[PRIORITY_NAMES[priority]],
+            }
+        return {"limit": self.limit, "active": self.active, "classes": classes}
@@ -1,17 +1,194 @@
+import asyncio
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
 import aiohttp
 from aiohttp import BasicAuth
 from loguru import logger
-from app.config.config import API_USERNAME, API_PASSWORD, BASE_URL
+from app.config.config import (
+    API_USERNAME, API_PASSWORD, BASE_URL,
+    API_POOL_LIMIT, API_POOL_LIMIT_PER_HOST, API_KEEPALIVE_TIMEOUT, API_DNS_CACHE_TTL, API_COMPRESSION,
+    API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_READ_TIMEOUTS,
+    API_RETRY_ATTEMPTS, API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY,
+    API_BREAKER_FAILURE_THRESHOLD, API_BREAKER_RESET_TIMEOUT,
+    CACHE_MAX_SIZE, CACHE_STALE_TTL, CACHE_TTL, CATALOG_INDEX_REFRESH_INTERVAL, CATALOG_INDEX_RETRY_INTERVAL
+)
+from app.services.admission import AdmissionController, AdmissionRejected, request_priority
+from app.services.cache import ResponseCache
+from app.services.catalog_index import CatalogIndex
+from app.services.catalog_store import catalog_store
+from app.services.models import Category, Product, Service
+from app.services.decoders import accept_encoding, decode_body
+from app.services.fuzzy import fuzzy_index
+from app.services.resilience import CircuitBreaker, RETRYABLE_STATUSES, backoff_delay
+from app.services.search import search_index
+from app.services.snapshot import catalog_snapshot
+from app.services.transformers import resolve_route, transform_response
+
+# Маршруты каталога, для которых 1С присылает ETag/Last-Modified и отвечает 304 на условный запрос
+CONDITIONAL_ROUTES = frozenset((
+    "categories", "category_detail", "category_products", "products", "product_detail",
+    "services", "service_detail",
+))
 
 class ApiService:
 
     def __init__(self):
         self.base_url = BASE_URL
         self.auth = BasicAuth(login=API_USERNAME, password=API_PASSWORD)
+        self.accept_encoding = accept_encoding(API_COMPRESSION)
 
         self.use_mock_data = False
 
-    async def _make_request(self, method, endpoint, **kwargs):
+        self._session = None
+        self._session_lock = asyncio.Lock()
+        self.pool_stats = {
+            "requests": 0,
+            "sessions_created": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "compressed_responses": 0,
+            "bytes_received": 0,
+            "bytes_decoded": 0,
+        }
+
+        self.cache = ResponseCache(max_size=CACHE_MAX_SIZE, stale_ttl=CACHE_STALE_TTL)
+        self._refresh_tasks = {}
+        self._prefetch_tasks = set()
+        # 1С не ответила на последний запрос данных каталога (ошибка соединения, таймаут или 5xx):
+        # ответы из памяти помечаются как устаревшие. 4xx - ответ по конкретному запросу (например,
+        # нет такой категории), а не признак недоступности 1С, и флаг не меняет
+        self._last_fetch_failed = False
+        self._index_task = None
+        # Идущее обновление индекса каталога (общее для фонового цикла и обработчиков) и время его запуска
+        self._index_refresh = None
+        self._index_refresh_at = float("-inf")
+        # Сборка триграммного индекса по снимку каталога (идет в отдельном потоке)
+        self._fuzzy_build = None
+
+        # Синхронизация товаров по изменениям: версия каталога 1С, от которой запрашивать изменения,
+        # и объем/время последней полной загрузки (для подсчета экономии)
+        self._products_version = None
+        self._delta_supported = True
+        self._full_sync_cost = (0, 0.0)
+        self.sync_stats = {
+            "full": 0,
+            "delta": 0,
+            "fallbacks": 0,
+            "changed": 0,
+            "deleted": 0,
+            "bytes_saved": 0,
+            "ms_saved": 0.0,
+        }
+
+        # URL с параметрами -> (условные заголовки, разобранный ответ): при 304 ответ берется отсюда
+        self._validators = OrderedDict()
+        self.conditional_stats = {"conditional": 0, "not_modified": 0, "bytes_saved": 0}
+
+        self._inflight = {}
+        self.coalesce_stats = {"upstream": 0, "coalesced": 0}
+
+        self.breaker = CircuitBreaker(
+            "1С", failure_threshold=API_BREAKER_FAILURE_THRESHOLD, reset_timeout=API_BREAKER_RESET_TIMEOUT
+        )
+        self.retry_stats = {"retries": 0, "exhausted": 0, "timeouts": 0, "served_stale_on_error": 0}
+        self.admission = AdmissionController()
+
+    def _create_trace_config(self):
+        """Трассировка соединений для подсчета переиспользования пула"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            self.pool_stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.pool_stats["connections_reused"] += 1
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def _get_session(self):
+        """Возвращает общую сессию, создавая ее при первом обращении"""
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=API_POOL_LIMIT,
+                    limit_per_host=API_POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=API_DNS_CACHE_TTL,
+                )
+                # Ответы в gzip/deflate/br aiohttp распаковывает при чтении тела
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    headers={"Accept-Encoding": self.accept_encoding},
+                    trace_configs=[self._create_trace_config()]
+                )
+                self.pool_stats["sessions_created"] += 1
+                logger.info(
+                    f"Создан пул соединений с API: limit={API_POOL_LIMIT}, "
+                    f"limit_per_host={API_POOL_LIMIT_PER_HOST}, keepalive={API_KEEPALIVE_TIMEOUT}с, "
+                    f"dns_ttl={API_DNS_CACHE_TTL}с, сжатие: {self.accept_encoding}"
+                )
+        return self._session
+
+    async def startup(self):
+        """Открывает пул соединений при запуске бота, поднимает каталог из снимка на диске
+        и запускает фоновую загрузку индекса каталога"""
+        await self._get_session()
+        self.restore_snapshot()
+
+        if CATALOG_INDEX_REFRESH_INTERVAL > 0 and self._index_task is None:
+            self._index_task = asyncio.create_task(self._index_refresh_loop())
+
+    async def close(self):
+        """Закрывает пул соединений при остановке бота"""
+        if self._index_task is not None:
+            self._index_task.cancel()
+            self._index_task = None
+
+        for task in [*self._refresh_tasks.values(), *self._prefetch_tasks]:
+            task.cancel()
+        self._refresh_tasks.clear()
+        self._prefetch_tasks.clear()
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info(f"Пул соединений с API закрыт. Статистика: {self.get_pool_stats()}")
+            if self.admission.enabled:
+                logger.info(f"Очередь запросов к 1С: {self.get_admission_stats()}")
+        self._session = None
+
+    def get_admission_stats(self):
+        """Очередь к 1С: лимит, занятые слоты и по классам приоритета - сколько ждали и сколько отклонено"""
+        return self.admission.get_stats()
+
+    def get_resilience_stats(self):
+        """Состояние размыкателя и счетчики повторов/таймаутов"""
+        return {"breaker": self.breaker.get_stats(), **self.retry_stats}
+
+    def get_coalesce_stats(self):
+        """Сколько GET-запросов ушло в 1С и сколько было объединено с уже выполняющимися"""
+        stats = dict(self.coalesce_stats)
+        stats["in_flight"] = len(self._inflight)
+        return stats
+
+    def get_pool_stats(self):
+        """Статистика пула соединений"""
+        stats = dict(self.pool_stats)
+        opened = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_rate"] = round(stats["connections_reused"] / opened, 3) if opened else 0.0
+        decoded = stats["bytes_decoded"]
+        stats["compression_ratio"] = round(stats["bytes_received"] / decoded, 3) if decoded else 1.0
+        stats["limit"] = API_POOL_LIMIT
+        stats["limit_per_host"] = API_POOL_LIMIT_PER_HOST
+        return stats
+
+    def _build_url(self, endpoint):
 
         if endpoint == "/test":
 
@@ -28,263 +205,652 @@ class ApiService:
             else:
                 url = f"{self.base_url}/api{endpoint}"
 
-        logger.debug(f"Making {method} request to: {url}")
-
-        kwargs['auth'] = self.auth
-
-        try:
-
-            if not self.use_mock_data:
-                async with aiohttp.ClientSession() as session:
-                    async with session.request(method, url, **kwargs) as response:
-                        logger.debug(f"API response status: {response.status}")
+        return url
+
+    @staticmethod
+    def _request_key(method, url, kwargs):
+        """Ключ для объединения одинаковых запросов: метод, URL, параметры и заголовки"""
+        params = kwargs.get("params") or {}
+        headers = kwargs.get("headers") or {}
+        return (
+            method.upper(),
+            url,
+            tuple(sorted((str(k), str(v)) for k, v in dict(params).items())),
+            tuple(sorted((str(k), str(v)) for k, v in dict(headers).items())),
+        )
 
-                        try:
-                            data = await response.json()
-                        except:
-                            data = await response.text()
-                            return {
-                                "status": response.status,
-                                "data": {"error": "Ошибка формата данных", "message": data}
-                            }
+    async def _make_request(self, method, endpoint, **kwargs):
 
-                        api_response = self._transform_api_response(data, endpoint)
+        if method.upper() != "GET":
+            return await self._send_request(method, endpoint, **kwargs)
 
-                        api_response["status"] = response.status
-                        return api_response
+        key = self._request_key(method, self._build_url(endpoint), kwargs)
+        future = self._inflight.get(key)
 
-            else:
-                return 0
-        except Exception as e:
-            logger.error(f"Error while making API request to {url}: {e}")
-            return {"status": 500, "data": {"error": "Ошибка соединения с сервером", "message": str(e)}}
+        if future is None:
+            future = asyncio.ensure_future(self._send_request(method, endpoint, **kwargs))
+            self._inflight[key] = future
+            self.coalesce_stats["upstream"] += 1
 
-    def _transform_api_response(self, data, endpoint):
+            def release(done, key=key):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
 
-        if isinstance(data, dict) and "status" in data:
-            return data
+            future.add_done_callback(release)
+        else:
+            self.coalesce_stats["coalesced"] += 1
+            logger.debug(f"Запрос {method} {endpoint} присоединен к уже выполняющемуся")
+
+        # shield: отмена одного ожидающего не должна отменять общий запрос
+        result = await asyncio.shield(future)
+        return dict(result) if isinstance(result, dict) else result
+
+    def _request_timeout(self, endpoint):
+        """Таймауты подключения и чтения для эндпоинта (по маршруту из таблицы трансформации)"""
+        route_name, _ = resolve_route(endpoint)
+        return aiohttp.ClientTimeout(
+            total=None,
+            connect=API_CONNECT_TIMEOUT,
+            sock_read=API_READ_TIMEOUTS.get(route_name, API_READ_TIMEOUT)
+        )
 
-        result = {"status": 200, "data": data}
+    async def _send_request(self, method, endpoint, **kwargs):
 
-        if "/auth/register" in endpoint or "/auth/login" in endpoint:
+        url = self._build_url(endpoint)
 
-            if isinstance(data, dict) and "message" in data:
+        logger.debug(f"Making {method} request to: {url}")
 
-                if "status" in data:
-                    result["status"] = data["status"]
+        kwargs['auth'] = self.auth
+        kwargs.setdefault('timeout', self._request_timeout(endpoint))
+
+        if self.use_mock_data:
+            return 0
+
+        if not self.breaker.allow_request():
+            logger.warning(f"Запрос {method} {url} отклонен: 1С недоступна, размыкатель открыт")
+            return {
+                "status": 503,
+                "data": {"error": "Сервер 1С недоступен", "message": "Сервер временно недоступен, попробуйте позже"}
+            }
+
+        # Повторяем только идемпотентные GET: повтор PUT/POST может продублировать изменение в 1С
+        attempts = max(1, API_RETRY_ATTEMPTS) if method.upper() == "GET" else 1
+        error = None
+        priority = request_priority(method, endpoint)
+
+        for attempt in range(attempts):
+            if attempt:
+                self.retry_stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt - 1, API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY))
+                logger.info(f"Повтор {attempt}/{attempts - 1} запроса {method} {url}")
+
+            try:
+                async with self.admission.slot(priority):
+                    api_response = await self._perform_request(method, url, endpoint, kwargs)
+            except AdmissionRejected as e:
+                # 1С перегружена нашими же запросами - это не ее отказ: ошибку размыкателю не засчитываем,
+                # но если это был пробный запрос, освобождаем место для следующего
+                self.breaker.release_probe()
+                logger.warning(f"Запрос {method} {url} не отправлен: {e}")
+                return {
+                    "status": 503,
+                    "data": {"error": "Сервер 1С перегружен", "message": "Сервер временно перегружен, попробуйте позже"}
+                }
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.retry_stats["timeouts"] += 1
+                error = e
+                logger.warning(f"Ошибка запроса к {url} (попытка {attempt + 1}/{attempts}): {e!r}")
+                continue
+            except Exception as e:
+                self.breaker.record_failure()
+                logger.error(f"Error while making API request to {url}: {e}")
+                return {"status": 500, "data": {"error": "Ошибка соединения с сервером", "message": str(e)}}
+
+            status = api_response.get("status")
+            if status in RETRYABLE_STATUSES and attempt < attempts - 1:
+                error = f"HTTP {status}"
+                continue
+
+            if isinstance(status, int) and status >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return api_response
+
+        self.retry_stats["exhausted"] += 1
+        self.breaker.record_failure()
+        logger.error(f"Error while making API request to {url}: {error!r}")
+        return {"status": 500, "data": {"error": "Ошибка соединения с сервером", "message": str(error)}}
+
+    async def _perform_request(self, method, url, endpoint, kwargs):
+
+        validator_key = stored = None
+        if method.upper() == "GET" and resolve_route(endpoint)[0] in CONDITIONAL_ROUTES:
+            params = kwargs.get("params") or {}
+            validator_key = (url, tuple(sorted((str(k), str(v)) for k, v in dict(params).items())))
+            stored = self._validators.get(validator_key)
+            if stored is not None:
+                kwargs = {**kwargs, "headers": {**(kwargs.get("headers") or {}), **stored[0]}}
+                self.conditional_stats["conditional"] += 1
+
+        session = await self._get_session()
+        self.pool_stats["requests"] += 1
+        async with session.request(method, url, **kwargs) as response:
+            logger.debug(f"API response status: {response.status}")
+
+            if response.status == 304 and stored is not None:
+                # Данные не изменились: тело не передавалось, разбирать нечего
+                self._validators.move_to_end(validator_key)
+                self.conditional_stats["not_modified"] += 1
+                self.conditional_stats["bytes_saved"] += stored[1].get("content_length", 0)
+                return {**stored[1], "not_modified": True}
+
+            body = await response.read()
+            # Content-Length - размер на линии (сжатый), body - уже распакованное тело
+            self.pool_stats["bytes_received"] += response.content_length or len(body)
+            self.pool_stats["bytes_decoded"] += len(body)
+            if response.headers.get("Content-Encoding", "identity") != "identity":
+                self.pool_stats["compressed_responses"] += 1
+            data, is_json = decode_body(body, response.content_type, response.charset)
+
+            if not is_json:
+                return {
+                    "status": response.status,
+                    "data": {"error": "Ошибка формата данных", "message": data}
+                }
 
-                result["data"] = data
-                return result
+            api_response = self._transform_api_response(data, endpoint)
+
+            api_response["status"] = response.status
+            api_response["content_length"] = len(body)
+
+            if validator_key is not None and response.status == 200:
+                self._store_validators(validator_key, response.headers, api_response)
+            return api_response
+
+    def _store_validators(self, key, headers, api_response):
+        """Запоминает ETag/Last-Modified ответа для следующего условного запроса"""
+        conditional = {}
+        if headers.get("ETag"):
+            conditional["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            conditional["If-Modified-Since"] = headers["Last-Modified"]
+
+        if not conditional:
+            self._validators.pop(key, None)
+            return
+
+        self._validators[key] = (conditional, api_response)
+        self._validators.move_to_end(key)
+        while len(self._validators) > CACHE_MAX_SIZE:
+            self._validators.popitem(last=False)
+
+    @staticmethod
+    def _cache_key(endpoint, params=None):
+        """Ключ кэша: эндпоинт и отсортированные параметры (префикс эндпоинта сохраняется для сброса)"""
+        if not params:
+            return endpoint
+        return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+    async def _cached_get(self, endpoint, ttl_name, params=None, allow_local=True):
+        """GET-запрос через кэш: свежие данные отдаются сразу, устаревшие - сразу
+        с фоновым обновлением, при отсутствии записи - из каталога в памяти с фоновым
+        запросом, а если и там нет - обычный запрос"""
+        key = self._cache_key(endpoint, params)
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            if entry.is_fresh:
+                self.cache.stats["hits"] += 1
+            else:
+                self.cache.stats["stale_hits"] += 1
+                self._schedule_refresh(endpoint, ttl_name, params)
+            return dict(entry.value)
 
-        if "/api/catalog/categories" in endpoint:
+        self.cache.stats["misses"] += 1
 
-            if "/api/catalog/categories/" in endpoint and isinstance(data, dict) and "category" in data:
+        local = self._local_response(endpoint) if allow_local else None
+        if local is not None:
+            # Каталог уже есть в памяти (в том числе из снимка на диске) - отвечаем сразу, 1С запрашиваем в фоне
+            self.cache.stats["local_hits"] += 1
+            self._schedule_refresh(endpoint, ttl_name, params)
+            return local
 
-                category_data = data.get("category", {})
-                category_products = data.get("products", [])
+        return await self._fetch_and_cache(endpoint, ttl_name, params)
 
-                transformed_category = {
-                    "id": category_data.get("id", ""),
-                    "code": category_data.get("id", ""),  
-                    "name": category_data.get("name", "Категория"),
-                    "description": category_data.get("description", "")
-                }
+    async def _fetch_and_cache(self, endpoint, ttl_name, params=None, fallback_to_cache=True):
 
-                transformed_products = []
-                for product in category_products:
-                    if isinstance(product, dict):
-                        transformed_products.append({
-                            "id": product.get("Идентификатор", ""),
-                            "code": product.get("Код", ""),
-                            "name": product.get("Наименование", "Товар"),
-                            "price": product.get("Цена", "По запросу"),
-                            "description": product.get("Описание", ""),
-                            "stock": product.get("КоличествоНаСкладе", 0),
-                            "category": product.get("Категория", ""),
-                            "category_name": product.get("КатегорияНаименование", "")
-                        })
-
-                result["data"] = {
-                    "category": transformed_category,
-                    "products": transformed_products
-                }
-                return result
-
-            logger.debug(f"Оригинальный ответ API для категорий: {data}")
-
-            if isinstance(data, dict) and "categories" in data:
-                categories = data.get("categories", [])
-                if isinstance(categories, list):
-                    transformed_categories = []
-                    for category in categories:
-                        if isinstance(category, dict):
-
-                            transformed_categories.append({
-                                "id": category.get("Идентификатор", ""),
-                                "code": category.get("Код", ""),  
-                                "name": category.get("Наименование", "Категория"),
-                                "description": category.get("Описание", "")
-                            })
-                        elif isinstance(category, str):
-                            transformed_categories.append({"id": category, "name": category, "code": category})
-                    result["data"] = transformed_categories
-
-            return result
-
-        elif "/api/catalog/products/category/" in endpoint:
-
-            if isinstance(data, dict) and "products" in data:
-                products = data.get("products", [])
-                if isinstance(products, list):
-                    transformed_products = []
-                    for product in products:
-                        if isinstance(product, dict):
-
-                            transformed_products.append({
-                                "id": product.get("Идентификатор", product.get("Код", "")),
-                                "name": product.get("Наименование", "Товар"),
-                                "price": product.get("Цена", "По запросу"),
-                                "description": product.get("Описание", ""),
-                                "stock": product.get("КоличествоНаСкладе", 0),
-                                "category": product.get("Категория", ""),
-                                "category_name": product.get("КатегорияНаименование", "")
-                            })
-                        elif isinstance(product, str):
-                            transformed_products.append({"id": product, "name": product})
-                    result["data"] = transformed_products
-
-        elif "/api/catalog/products" in endpoint and not endpoint.startswith("/api/catalog/products/"):
-
-            if isinstance(data, dict) and "products" in data:
-                products = data.get("products", [])
-                if isinstance(products, list):
-                    transformed_products = []
-                    for product in products:
-                        if isinstance(product, dict):
-
-                            transformed_products.append({
-                                "id": product.get("Идентификатор", ""),
-                                "code": product.get("Код", ""),  
-                                "name": product.get("Наименование", "Товар"),
-                                "price": product.get("Цена", "По запросу"),
-                                "description": product.get("Описание", ""),
-                                "stock": product.get("КоличествоНаСкладе", 0),
-                                "category": product.get("Категория", ""),
-                                "category_name": product.get("КатегорияНаименование", "")
-                            })
-                        elif isinstance(product, str):
-                            transformed_products.append({"id": product, "name": product, "code": product})
-                    result["data"] = transformed_products
-
-        elif endpoint.startswith("/api/catalog/products/"):
-
-            if isinstance(data, dict) and "product" in data:
-                product = data.get("product", {})
-                if isinstance(product, dict):
-
-                    transformed_product = {
-                        "id": product.get("Идентификатор", ""),
-                        "code": product.get("Код", ""),
-                        "name": product.get("Наименование", "Без названия"),
-                        "price": product.get("Цена", 0),
-                        "description": product.get("Описание", "Описание отсутствует"),
-                        "stock": product.get("КоличествоНаСкладе", 0),
-                        "category": product.get("Категория", ""),
-                        "category_name": product.get("КатегорияНаименование", ""),
-                        "in_stock": product.get("ВНаличии", False),
-                        "min_stock": product.get("МинимальныйЗапас", 0),
-                        "supplier": product.get("ПоставщикНаименование", "")
-                    }
-                    result["data"] = transformed_product
-                    return result
+        key = self._cache_key(endpoint, params)
+        if params:
+            response = await self._make_request("GET", endpoint, params=params)
+        else:
+            response = await self._make_request("GET", endpoint)
+
+        status = response.get("status") if isinstance(response, dict) else None
+        if not isinstance(status, int) or status >= 500:
+            self._last_fetch_failed = True
+        if status == 200:
+            self._last_fetch_failed = False
+            if response.pop("not_modified", False):
+                # 304 от 1С - тот же ответ, что уже был разобран; считаем попаданием в кэш
+                self.cache.stats["not_modified"] += 1
+            self.cache.set(key, response, CACHE_TTL[ttl_name])
+            return dict(response)
+
+        # 1С недоступна - лучше показать последние известные данные, чем ошибку
+        last_known = self.cache.peek(key) if fallback_to_cache else None
+        if last_known is not None:
+            self.retry_stats["served_stale_on_error"] += 1
+            logger.warning(f"1С вернула {response.get('status') if isinstance(response, dict) else response} "
+                           f"для {key}, отдаем данные из кэша возрастом {last_known.age:.0f}с")
+            return {**last_known.value, "stale_age": last_known.age}
+
+        return response
+
+    def _schedule_refresh(self, endpoint, ttl_name, params=None):
+
+        key = self._cache_key(endpoint, params)
+        if key in self._refresh_tasks:
+            return
+
+        async def refresh():
+            try:
+                response = await self._fetch_and_cache(endpoint, ttl_name, params, fallback_to_cache=False)
+                if isinstance(response, dict) and response.get("status") == 200:
+                    self.cache.stats["refreshes"] += 1
                 else:
-                    logger.error(f"Получен некорректный формат продукта: {product}")
-            else:
-                logger.error(f"В ответе API отсутствует объект product: {data}")
-
-        elif "/api/catalog/services" in endpoint:
-
-            if isinstance(data, dict) and "services" in data:
-                services = data.get("services", [])
-                if isinstance(services, list):
-                    transformed_services = []
-                    for service in services:
-                        if isinstance(service, dict):
-
-                            transformed_services.append({
-                                "id": service.get("Идентификатор", service.get("Код", "")),
-                                "name": service.get("Наименование", "Услуга"),
-                                "price": service.get("Цена", "По запросу"),
-                                "description": service.get("Описание", ""),
-                                "category": service.get("Категория", ""),
-                                "category_name": service.get("КатегорияНаименование", "")
-                            })
-                        elif isinstance(service, str):                            
-                            transformed_services.append({"id": service, "name": service})
-                    result["data"] = transformed_services
-
-        elif endpoint.startswith("/api/catalog/services/"):
-
-            if isinstance(data, dict):
-
-                if "service" in data:
-                    service = data.get("service", {})
-                    if isinstance(service, dict):
-                        transformed_service = {
-                            "id": service.get("id", service.get("Идентификатор", service.get("Код", ""))),
-                            "name": service.get("name", service.get("Наименование", "Услуга")),
-                            "price": service.get("price", service.get("Цена", "По запросу")),
-                            "description": service.get("description", service.get("Описание", "")),
-                            "execution_time": service.get("execution_time", 0),
-                            "category_id": service.get("category_id", service.get("Категория", "")),
-                            "category_name": service.get("category_name", service.get("КатегорияНаименование", ""))
-                        }
-
-                        result["data"] = {"service": transformed_service}
+                    self.cache.stats["refresh_errors"] += 1
+                    logger.warning(f"Фоновое обновление кэша {key} не удалось: {response}")
+            finally:
+                self._refresh_tasks.pop(key, None)
+
+        self._refresh_tasks[key] = asyncio.create_task(refresh())
+
+    async def _get_page(self, endpoint, ttl_name, offset=0, limit=None):
+        """Страница списка каталога. Без limit запрашивается весь список, как раньше"""
+        if limit is None:
+            return await self._cached_get(endpoint, ttl_name)
+
+        response = await self._cached_get(endpoint, ttl_name, {"offset": offset, "limit": limit})
+        return self._slice_page(response, offset, limit)
+
+    @staticmethod
+    def _slice_page(response, offset, limit):
+        """Если публикация 1С не поддерживает offset/limit и вернула весь список, режем его на месте.
+        В ответе всегда есть "total" - общее число записей (или нижняя оценка, если 1С его не сообщила)"""
+        if not isinstance(response, dict) or response.get("status") != 200:
+            return response
+
+        data = response.get("data")
+        nested = isinstance(data, dict) and isinstance(data.get("products"), list)
+        items = data["products"] if nested else data
+        if not isinstance(items, list):
+            return response
+
+        if len(items) > limit:
+            page = items[offset:offset + limit]
+            response["total"] = len(items)
+            # Записи кэша общие - список не меняем, а подменяем копией
+            response["data"] = {**data, "products": page} if nested else page
+        elif "total" not in response:
+            # Полная страница - возможно, дальше есть еще записи
+            response["total"] = offset + len(items) + (1 if len(items) == limit else 0)
+
+        return response
+
+    def prefetch(self, coroutine):
+        """Выполняет запрос в фоне (например, следующую страницу каталога), чтобы к моменту
+        обращения пользователя ответ уже лежал в кэше"""
+        task = asyncio.create_task(coroutine)
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+        return task
+
+    def restore_snapshot(self):
+        """Загружает каталог из снимка на диске, если индекс еще пуст: пользователи сразу видят
+        каталог, а свежие данные подгружаются из 1С в фоне"""
+        if len(catalog_store.index):
+            return False
+
+        index = catalog_snapshot.load()
+        if index is None:
+            return False
+
+        catalog_store.swap_index(index)
+        search_index.update(index.products + index.services)
+        self._fuzzy_build = self.prefetch(asyncio.to_thread(fuzzy_index.build, index.products))
+        # Изменения товаров можно запрашивать от версии, на которой сохранен снимок
+        self._products_version = catalog_snapshot.products_version
+        return True
+
+    async def refresh_catalog_index(self):
+        """Обновляет каталог и подменяет индекс; при ошибке остается прежний индекс.
+        После обновления каталог сохраняется в снимок на диске"""
+        # Сам индекс строится только из ответов 1С (или кэша), а не из собственных данных
+        categories, services, synced, statuses = await asyncio.gather(
+            self._cached_get("/api/catalog/categories", "categories", allow_local=False),
+            self._cached_get("/api/catalog/services", "services", allow_local=False),
+            self._sync_products(),
+            self.get_order_statuses(),
+        )
 
-                else:
+        failed = [r.get("status") for r in (categories, services) if r.get("status") != 200]
+        if failed or synced is None:
+            logger.warning(f"Индекс каталога не обновлен: 1С вернула {failed or 'ошибку для товаров'}")
+            return None
+        products, changes = synced
+
+        def records(response, record_type):
+            data = response.get("data")
+            return [item for item in data if isinstance(item, record_type)] if isinstance(data, list) else []
+
+        categories, services = records(categories, Category), records(services, Service)
+        previous = catalog_store.index
+        same_lists = categories == list(previous.categories) and services == list(previous.services)
+        if self._fuzzy_build is not None:
+            # Триграммный индекс по снимку еще строится - обновлять его можно только после сборки
+            await asyncio.wait([self._fuzzy_build])
+            self._fuzzy_build = None
+
+        if products is previous.products and same_lists:
+            logger.debug("Каталог не изменился, индекс оставлен прежним")
+            # Данные подтверждены 1С только что - возраст отсчитывается заново
+            index = previous
+            index.built_at = time.time()
+        elif changes is not None and same_lists:
+            # Изменились отдельные товары - индексы правятся только по ним
+            removed, added = changes
+            index = previous.with_product_changes(products, removed, added)
+            catalog_store.swap_index(index)
+            search_index.apply_changes(removed, added)
+            if fuzzy_index.is_built_for(previous.products):
+                fuzzy_index.apply_changes(index.products, removed, added)
+            if not fuzzy_index.is_built_for(index.products) or fuzzy_index.needs_rebuild():
+                await asyncio.to_thread(fuzzy_index.build, index.products, True)
+        else:
+            index = CatalogIndex(categories, products, services)
+            catalog_store.swap_index(index)
+            search_index.update(index.products + index.services)
+            # Триграммный индекс собирается дольше и подменяется целиком - строим его в отдельном потоке
+            await asyncio.to_thread(fuzzy_index.build, index.products)
+
+        # Каталог не изменился - многомегабайтный снимок не переписывается, обновляется только его время
+        if index is previous and catalog_snapshot.touch(index):
+            return index
+        await self._save_snapshot(index, statuses)
+        return index
+
+    async def _save_snapshot(self, index, statuses):
+
+        if not catalog_snapshot.enabled:
+            return
+        fresh_statuses = statuses.get("data") if statuses.get("status") == 200 and "stale_age" not in statuses else None
+        try:
+            await asyncio.to_thread(catalog_snapshot.save, index, fresh_statuses, self._products_version)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось сохранить снимок каталога: {e}")
+
+    def _local_response(self, endpoint):
+        """Ответ на запрос списка из индекса каталога в памяти (загруженного из 1С или из снимка);
+        в "stale_age" - возраст данных в секундах, только если 1С сейчас не отвечает (пока она
+        работает, свежие данные подгружаются в фоне). None, если данных для эндпоинта нет"""
+        index = catalog_store.index
+        if not len(index):
+            return None
+
+        route, _ = resolve_route(endpoint)
+        if route == "categories":
+            data = items = list(index.categories)
+        elif route == "products":
+            data = items = list(index.products)
+        elif route == "services":
+            data = items = list(index.services)
+        elif route in ("category_detail", "category_products"):
+            category = index.get(Category, endpoint.rsplit("/", 1)[-1])
+            if category is None:
+                return None
+            items = list(index.category_products(category.id))
+            data = {"category": category, "products": items} if route == "category_detail" else items
+        else:
+            return None
+
+        response = {"status": 200, "data": data, "total": len(items)}
+        if self._last_fetch_failed or self.breaker.state != CircuitBreaker.CLOSED:
+            response["stale_age"] = time.time() - index.built_at
+        return response
+
+    def _local_record(self, response, record_type, code):
+        """Если 1С недоступна, карточка товара или услуги берется из индекса каталога"""
+        status = response.get("status") if isinstance(response, dict) else None
+        if not (isinstance(status, int) and status >= 500):
+            return response
+
+        index = catalog_store.index
+        record = index.get(record_type, code)
+        if record is None:
+            return response
+
+        self.retry_stats["served_stale_on_error"] += 1
+        logger.warning(f"1С вернула {status} для {record_type.__name__} {code}, отдаем запись из каталога в памяти")
+        return {"status": 200, "data": record, "stale_age": time.time() - index.built_at}
+
+    async def _sync_products(self):
+        """Товары для индекса каталога: изменения с прошлой синхронизации, а если цепочка
+        изменений прервалась или 1С их не отдает - полная загрузка.
+
+        Returns:
+            (товары, изменения): изменения - (прежние записи удаленных и измененных товаров,
+            новые и измененные товары) или None после полной загрузки; None - ошибка 1С
+        """
+        if self._products_version is not None and self._delta_supported and catalog_store.index.products:
+            synced = await self._sync_product_changes()
+            if synced is not None:
+                return synced
+            self.sync_stats["fallbacks"] += 1
+        products = await self._load_all_products()
+        return (products, None) if products is not None else None
+
+    async def _load_all_products(self):
+
+        started = time.perf_counter()
+        response = await self._fetch_and_cache("/api/catalog/products", "products", fallback_to_cache=False)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if response.get("status") != 200 or not isinstance(response.get("data"), list):
+            return None
+
+        products = [item for item in response["data"] if isinstance(item, Product)]
+        size = response.get("content_length", 0)
+        self._products_version = response.get("version")
+        self._full_sync_cost = (size, elapsed)
+        self.sync_stats["full"] += 1
+        logger.info(f"Полная загрузка товаров: {len(products)} шт., {size / 1024:.0f} КБ за {elapsed:.0f} мс, "
+                    f"версия каталога {self._products_version}")
+        return products
+
+    async def _sync_product_changes(self):
+        """Применяет изменения товаров к текущему каталогу. Неизмененные записи остаются
+        теми же объектами - индексы правятся только по изменениям"""
+        started = time.perf_counter()
+        since = self._products_version
+        response = await self._make_request("GET", "/api/catalog/changes", params={"since": since})
+        status = response.get("status")
+
+        if status == 404:
+            self._delta_supported = False
+            logger.info("1С не отдает изменения каталога, дальше товары загружаются целиком")
+            return None
+        data = response.get("data")
+        if status != 200 or not isinstance(data, dict) or not isinstance(response.get("version"), int):
+            logger.warning(f"Цепочка изменений каталога с версии {since} прервана (1С вернула {status}), "
+                           f"выполняется полная загрузка")
+            return None
+        if not isinstance(data.get("products"), list) or not isinstance(data.get("deleted"), list):
+            logger.warning(f"В ответе 1С на изменения каталога с версии {since} нет списков товаров, "
+                           f"выполняется полная загрузка")
+            return None
+
+        deleted = set(data["deleted"])
+        # Код и среди измененных, и среди удаленных - товар удален и в индексы не попадает
+        changed = {product.code: product for product in data["products"]
+                   if isinstance(product, Product) and product.code not in deleted}
+        index = catalog_store.index
+        current = index.products
+        added = list(changed.values())
+        removed = [index.products_by_code[code] for code in deleted | changed.keys() if code in index.products_by_code]
+
+        if not changed and not deleted:
+            products = current
+        else:
+            products = []
+            for product in current:
+                if product.code in deleted:
+                    continue
+                products.append(changed.pop(product.code, product))
+            # Оставшиеся - новые товары
+            products.extend(changed.values())
+            self.sync_stats["changed"] += len(data["products"])
+            self.sync_stats["deleted"] += len(deleted)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        size = response.get("content_length", 0)
+        full_size, full_ms = self._full_sync_cost
+        saved_bytes, saved_ms = max(0, full_size - size), max(0.0, full_ms - elapsed)
+
+        self._products_version = response["version"]
+        self.sync_stats["delta"] += 1
+        self.sync_stats["bytes_saved"] += saved_bytes
+        self.sync_stats["ms_saved"] += saved_ms
+        logger.info(f"Синхронизация товаров с версии {since} до {self._products_version}: "
+                    f"изменено {len(data['products'])}, удалено {len(deleted)}, {size} Б за {elapsed:.1f} мс; "
+                    f"сэкономлено {saved_bytes / 1024:.0f} КБ и {saved_ms:.0f} мс против полной загрузки")
+        return products, (removed, added)
+
+    async def _refresh_catalog_index_logged(self):
 
-                    result["data"] = data
+        try:
+            return await self.refresh_catalog_index()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при построении индекса каталога: {e}")
+
+    def _start_index_refresh(self):
+        """Общая задача обновления индекса: пока идет одно обновление, второе не запускается"""
+        if self._index_refresh is None or self._index_refresh.done():
+            self._index_refresh_at = time.monotonic()
+            self._index_refresh = self.prefetch(self._refresh_catalog_index_logged())
+        return self._index_refresh
+
+    def request_index_refresh(self):
+        """Индекс каталога пуст, а он нужен пользователю: запускает загрузку в фоне, не дожидаясь
+        расписания, но не чаще раза в CATALOG_INDEX_RETRY_INTERVAL секунд - пока 1С недоступна,
+        сообщения пользователей не должны каждый раз загружать весь каталог"""
+        if time.monotonic() - self._index_refresh_at >= CATALOG_INDEX_RETRY_INTERVAL:
+            self._start_index_refresh()
+
+    async def _index_refresh_loop(self):
+
+        while True:
+            await asyncio.shield(self._start_index_refresh())
+            await asyncio.sleep(CATALOG_INDEX_REFRESH_INTERVAL)
+
+    def invalidate_cache(self, endpoint_prefix=None):
+        """Сбрасывает кэш каталога целиком или по префиксу эндпоинта"""
+        removed = self.cache.invalidate(endpoint_prefix)
+        if endpoint_prefix is None:
+            self._validators.clear()
+            catalog_store.clear()
+            # Следующее обновление индекса загрузит товары целиком
+            self._products_version = None
+        else:
+            url_prefix = self._build_url(endpoint_prefix)
+            for key in [key for key in self._validators if key[0].startswith(url_prefix)]:
+                del self._validators[key]
+        logger.info(f"Кэш каталога сброшен ({endpoint_prefix or 'полностью'}): удалено записей {removed}")
+        return removed
+
+    def get_conditional_stats(self):
+        """Условные запросы к 1С: сколько отправлено, сколько вернули 304 и сколько байт не передавалось"""
+        stats = dict(self.conditional_stats)
+        stats["validators"] = len(self._validators)
+        return stats
+
+    def get_sync_stats(self):
+        """Полные загрузки и синхронизации по изменениям, сэкономленные байты и время"""
+        stats = dict(self.sync_stats)
+        stats["ms_saved"] = round(stats["ms_saved"], 1)
+        stats["version"] = self._products_version
+        stats["delta_supported"] = self._delta_supported
+        return stats
+
+    def get_cache_stats(self):
+        """Счетчики попаданий, промахов и фоновых обновлений кэша"""
+        return self.cache.get_stats()
 
-        logger.debug(f"Трансформированный ответ API для {endpoint}: {result}")
+    def _transform_api_response(self, data, endpoint):
 
-        return result
+        return transform_response(data, endpoint)
 
     async def test_connection(self):
 
         return await self._make_request("GET", "/test")
 
+    async def warm_up(self):
+        """Прогрев после запуска: проверка связи с 1С и загрузка в кэш категорий, услуг и статусов
+        заказов - все запросы параллельно, заодно открываются соединения пула.
+        Returns: {проверка: статус ответа или ошибка}"""
+        started = time.perf_counter()
+        checks = {
+            "test": self.test_connection(),
+            "categories": self.get_categories(),
+            "services": self.get_services(),
+            "order_statuses": self.get_order_statuses(),
+        }
+        results = await asyncio.gather(*checks.values(), return_exceptions=True)
+        statuses = {
+            name: result.get("status") if isinstance(result, dict) else repr(result)
+            for name, result in zip(checks, results)
+        }
+        logger.info(f"Прогрев API за {(time.perf_counter() - started) * 1000:.0f} мс: {statuses}")
+        return statuses
+
     async def get_categories(self):
 
-        return await self._make_request("GET", "/api/catalog/categories")
+        return await self._cached_get("/api/catalog/categories", "categories")
 
-    async def get_category_by_id(self, category_id):
+    async def get_category_by_id(self, category_id, offset=0, limit=None):
 
         logger.debug(f"Запрос информации о категории по коду: {category_id}")
-        return await self._make_request("GET", f"/api/catalog/categories/{category_id}")
+        return await self._get_page(f"/api/catalog/categories/{category_id}", "category", offset, limit)
 
-    async def get_products(self):
+    async def get_products(self, offset=0, limit=None):
 
-        return await self._make_request("GET", "/api/catalog/products")
+        return await self._get_page("/api/catalog/products", "products", offset, limit)
 
     async def get_product_by_id(self, product_id):
 
         logger.debug(f"Запрос товара по коду: {product_id}")
-        return await self._make_request("GET", f"/api/catalog/products/{product_id}")
+        response = await self._make_request("GET", f"/api/catalog/products/{product_id}")
+        return self._local_record(response, Product, product_id)
 
-    async def get_products_by_category(self, category_id):
+    async def get_products_by_category(self, category_id, offset=0, limit=None):
 
         logger.debug(f"Запрос товаров по коду категории: {category_id}")
-        return await self._make_request("GET", f"/api/catalog/products/category/{category_id}")
+        return await self._get_page(
+            f"/api/catalog/products/category/{category_id}", "products_by_category", offset, limit
+        )
 
-    async def get_services(self):
+    async def get_services(self, offset=0, limit=None):
 
-        return await self._make_request("GET", "/api/catalog/services")
+        return await self._get_page("/api/catalog/services", "services", offset, limit)
 
     async def get_service_by_id(self, service_id):
 
         logger.debug(f"Запрос услуги по коду: {service_id}")
-        return await self._make_request("GET", f"/api/catalog/services/{service_id}")
+        response = await self._make_request("GET", f"/api/catalog/services/{service_id}")
+        return self._local_record(response, Service, service_id)
 
     async def register_user(self, user_data):
 
@@ -316,8 +882,14 @@ class ApiService:
         )
 
     async def get_order_statuses(self):
-        """Получает список доступных статусов заказов"""
-        return await self._make_request("GET", "/orders/statuses/list")
+        """Получает список доступных статусов заказов (список меняется редко и кэшируется)"""
+        response = await self._cached_get("/orders/statuses/list", "order_statuses", allow_local=False)
+
+        status = response.get("status") if isinstance(response, dict) else None
+        if isinstance(status, int) and status >= 500 and catalog_snapshot.order_statuses:
+            logger.warning(f"1С вернула {status} для статусов заказов, отдаем статусы из снимка каталога")
+            return {"status": 200, "data": catalog_snapshot.order_statuses, "stale_age": catalog_snapshot.age}
+        return response
     
     async def get_order_status(self, order_id, order_type="ЗаказПользователя"):
         """Получает текущий статус заказа с указанным ID
@@ -0,0 +1,97 @@
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ("value", "stored_at", "ttl", "stale_ttl")
+
+    def __init__(self, value, ttl, stale_ttl):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    @property
+    def age(self):
+        return time.monotonic() - self.stored_at
+
+    @property
+    def is_fresh(self):
+        return self.age < self.ttl
+
+    @property
+    def is_usable(self):
+        """Запись еще можно отдать пользователю, пусть и устаревшую"""
+        return self.age < self.ttl + self.stale_ttl
+
+
+class ResponseCache:
+    """LRU-кэш ответов API с TTL и окном stale-while-revalidate"""
+
+    def __init__(self, max_size=256, stale_ttl=3600):
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "local_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "not_modified": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Возвращает запись, пригодную к выдаче, или None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if not entry.is_usable:
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, key):
+        """Возвращает запись любого возраста - на случай недоступности источника"""
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries[key] = CacheEntry(value, ttl, self.stale_ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, prefix=None):
+        """Сбрасывает весь кэш или только ключи, начинающиеся с prefix"""
+        if prefix is None:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            removed = len(keys)
+
+        self.stats["invalidations"] += removed
+        return removed
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["size"] = len(self._entries)
+        stats["max_size"] = self.max_size
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
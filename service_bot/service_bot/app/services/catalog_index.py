@@ -0,0 +1,160 @@
+"""Индекс каталога для поиска записей за O(1) по id, коду и категории"""
+import copy
+import sys
+import time
+
+from app.services.models import Category, Product, Service
+
+
+class CatalogIndex:
+    """Снимок каталога. После построения не изменяется: при обновлении каталога
+    строится новый индекс (или копия с изменениями товаров) и подменяется целиком
+    одной операцией присваивания"""
+
+    def __init__(self, categories=(), products=(), services=(), built_at=None):
+        """built_at - когда данные получены из 1С (для индекса из снимка на диске - время снимка)"""
+        started = time.perf_counter()
+
+        self.categories = tuple(categories)
+        self.products = tuple(products)
+        self.services = tuple(services)
+
+        self.categories_by_id = {c.id: c for c in self.categories if c.id}
+        self.categories_by_code = {c.code: c for c in self.categories if c.code}
+        self.products_by_id = {p.id: p for p in self.products if p.id}
+        self.products_by_code = {p.code: p for p in self.products if p.code}
+        self.services_by_id = {s.id: s for s in self.services if s.id}
+        self.services_by_code = {s.code: s for s in self.services if s.code}
+
+        by_category = {}
+        for product in self.products:
+            by_category.setdefault(product.category, []).append(product)
+        self.products_by_category = {category: tuple(items) for category, items in by_category.items()}
+
+        self._finish(started, built_at)
+
+    def _finish(self, started, built_at=None):
+
+        self._lookup = {
+            Category: (self.categories_by_id, self.categories_by_code),
+            Product: (self.products_by_id, self.products_by_code),
+            Service: (self.services_by_id, self.services_by_code),
+        }
+
+        self.built_at = built_at or time.time()
+        self.build_ms = (time.perf_counter() - started) * 1000
+        self.memory_bytes = self._memory_footprint()
+
+    def with_product_changes(self, products, removed, added):
+        """Новый индекс после синхронизации товаров по изменениям, без полной перестройки.
+
+        Args:
+            products: полный список товаров после изменений
+            removed: прежние записи удаленных и измененных товаров
+            added: новые и измененные товары
+        Категории и услуги остаются теми же объектами, словари товаров копируются
+        и правятся только по изменившимся записям, списки по категориям
+        пересобираются только у затронутых категорий.
+        """
+        started = time.perf_counter()
+        index = copy.copy(self)
+        index.products = tuple(products)
+
+        by_id, by_code = dict(self.products_by_id), dict(self.products_by_code)
+        for product in removed:
+            if product.id and by_id.get(product.id) is product:
+                del by_id[product.id]
+            if product.code and by_code.get(product.code) is product:
+                del by_code[product.code]
+        for product in added:
+            if product.id:
+                by_id[product.id] = product
+            if product.code:
+                by_code[product.code] = product
+        index.products_by_id, index.products_by_code = by_id, by_code
+
+        # Измененный товар в той же категории остается на своем месте в списке категории
+        added_by_code = {product.code: product for product in added}
+        replaced, removed_ids = {}, set()
+        for product in removed:
+            new = added_by_code.get(product.code)
+            if new is not None and new.category == product.category:
+                replaced[id(product)] = new
+            else:
+                removed_ids.add(id(product))
+        kept = {id(product) for product in replaced.values()}
+        appended = {}
+        for product in added:
+            if id(product) not in kept:
+                appended.setdefault(product.category, []).append(product)
+
+        by_category = dict(self.products_by_category)
+        for category in {product.category for product in removed} | appended.keys():
+            items = [replaced.get(id(p), p) for p in by_category.get(category, ()) if id(p) not in removed_ids]
+            items.extend(appended.get(category, ()))
+            if items:
+                by_category[category] = tuple(items)
+            else:
+                by_category.pop(category, None)
+        index.products_by_category = by_category
+
+        index._finish(started)
+        return index
+
+    def get(self, record_type, key):
+        """Запись по id, а если такого id нет - по коду 1С"""
+        by_id, by_code = self._lookup[record_type]
+        record = by_id.get(key)
+        if record is None:
+            record = by_code.get(key)
+        return record
+
+    def code_for(self, record_type, record_id):
+        """Код 1С записи по ее id (для запросов карточки)"""
+        record = self._lookup[record_type][0].get(record_id)
+        return record.code if record is not None else None
+
+    def id_for(self, record_type, code):
+
+        record = self._lookup[record_type][1].get(code)
+        return record.id if record is not None else None
+
+    def category_products(self, category_id):
+
+        return self.products_by_category.get(category_id, ())
+
+    def _memory_footprint(self):
+        """Размер контейнеров индекса и самих записей (без строк, которые записи делят с ответами 1С)"""
+        containers = (
+            self.categories, self.products, self.services,
+            self.categories_by_id, self.categories_by_code,
+            self.products_by_id, self.products_by_code,
+            self.services_by_id, self.services_by_code,
+            self.products_by_category,
+        )
+        size = sum(sys.getsizeof(container) for container in containers)
+        size += sum(sys.getsizeof(items) for items in self.products_by_category.values())
+        if self.products:
+            size += sys.getsizeof(self.products[0]) * len(self.products)
+        if self.services:
+            size += sys.getsizeof(self.services[0]) * len(self.services)
+        if self.categories:
+            size += sys.getsizeof(self.categories[0]) * len(self.categories)
+        return size
+
+    def __len__(self):
+        return len(self.products) + len(self.services) + len(self.categories)
+
+    def get_stats(self):
+
+        return {
+            "categories": len(self.categories),
+            "products": len(self.products),
+            "services": len(self.services),
+            "build_ms": round(self.build_ms, 2),
+            "memory_kb": round(self.memory_bytes / 1024, 1),
+            "age": round(time.time() - self.built_at),
+        }
+
+
+EMPTY_INDEX = CatalogIndex()
@@ -0,0 +1,65 @@
+"""Общее для всех пользователей хранилище записей каталога.
+
+В FSM пользователя хранятся только версия снимка, вид списка и номер страницы,
+а сами товары, услуги и категории лежат здесь в одном экземпляре.
+"""
+from loguru import logger
+
+from app.services.catalog_index import EMPTY_INDEX
+from app.services.models import CATALOG_RECORDS, Category, Product, Service
+
+
+class CatalogStore:
+
+    def __init__(self):
+        self.version = 1
+        self.index = EMPTY_INDEX
+        self._records = {record_type: {} for record_type in CATALOG_RECORDS}
+
+    def remember(self, records):
+        """Запоминает записи, показанные пользователю, чтобы потом найти их по id"""
+        for record in records:
+            if record.id:
+                self._records[type(record)][record.id] = record
+        return records
+
+    def get(self, record_type, record_id):
+        """Запись из индекса полного каталога, а пока он не загружен - из показанных страниц"""
+        record = self.index.get(record_type, record_id)
+        if record is None:
+            record = self._records[record_type].get(record_id)
+        return record
+
+    def code_for(self, record_type, record_id):
+        """Код 1С по id записи; None, если запись неизвестна"""
+        record = self.get(record_type, record_id)
+        return record.code if record is not None else None
+
+    def swap_index(self, index):
+        """Подменяет индекс целиком: обработчики видят либо старый снимок, либо новый"""
+        self.index = index
+        self.version += 1
+        # Показанные ранее страницы теперь есть в индексе
+        for records in self._records.values():
+            records.clear()
+        logger.info(f"Индекс каталога обновлен, версия снимка {self.version}: {index.get_stats()}")
+
+    def clear(self):
+        """Сбрасывает записи и увеличивает версию снимка - старые ссылки из FSM становятся недействительными"""
+        for records in self._records.values():
+            records.clear()
+        self.version += 1
+        logger.info(f"Хранилище каталога сброшено, версия снимка {self.version}")
+
+    def get_stats(self):
+
+        return {
+            "categories": len(self._records[Category]),
+            "products": len(self._records[Product]),
+            "services": len(self._records[Service]),
+            "version": self.version,
+            "index": self.index.get_stats(),
+        }
+
+
+catalog_store = CatalogStore()
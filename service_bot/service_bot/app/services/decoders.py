@@ -0,0 +1,105 @@
+import codecs
+import json
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Ответы в br aiohttp распаковывает сам, если установлен один из этих пакетов
+try:
+    import brotlicffi as brotli
+except ImportError:
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+SUPPORTED_ENCODINGS = ("gzip", "deflate", "br") if brotli is not None else ("gzip", "deflate")
+
+UTF8_BOM = b"\xef\xbb\xbf"
+JSON_START_BYTES = b"{["
+JSON_WHITESPACE = b" \t\r\n"
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+
+def _stdlib_loads(body):
+    return json.loads(body)
+
+
+def _select_default_decoder():
+    """Выбирает самый быстрый из установленных JSON-декодеров"""
+    if orjson is not None:
+        return "orjson", orjson.loads
+    if msgspec is not None:
+        return "msgspec", msgspec.json.Decoder().decode
+    return "json", _stdlib_loads
+
+
+_decoder_name, _decoder = _select_default_decoder()
+
+
+def set_json_decoder(loads, name=None):
+    """Подменяет декодер: loads принимает bytes и возвращает разобранный JSON"""
+    global _decoder_name, _decoder
+    _decoder = loads
+    _decoder_name = name or getattr(loads, "__name__", "custom")
+    logger.info(f"JSON-декодер ответов API: {_decoder_name}")
+
+
+def get_json_decoder_name():
+    return _decoder_name
+
+
+def accept_encoding(encodings):
+    """Заголовок Accept-Encoding из списка кодировок через запятую; неподдерживаемые
+    (br без пакета brotli) отбрасываются, пустой список - ответы без сжатия"""
+    requested = [item.strip().lower() for item in (encodings or "").split(",") if item.strip()]
+    allowed = [item for item in requested if item in SUPPORTED_ENCODINGS]
+    return ", ".join(allowed) if allowed else "identity"
+
+
+def looks_like_json(content_type, body):
+    """Определяет JSON по Content-Type, а если 1С прислала text/plain - по первому байту тела"""
+    if content_type and "json" in content_type:
+        return True
+
+    start = body[:64].lstrip(JSON_WHITESPACE)[:1]
+    return bool(start) and start in JSON_START_BYTES
+
+
+def decode_body(body, content_type=None, charset=None):
+    """Разбирает тело ответа, прочитанное один раз как bytes.
+
+    Returns:
+        (data, is_json): разобранный JSON и True, либо текст тела и False.
+        Тело в неизвестной или не той кодировке не разбирается - это ошибка формата
+        ответа, а не отказ 1С, поэтому исключение наружу не выходит
+    """
+    if body.startswith(UTF8_BOM):
+        body = body[len(UTF8_BOM):]
+
+    if charset:
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            logger.warning(f"Неизвестная кодировка ответа API: {charset}")
+            return f"Неизвестная кодировка ответа: {charset}", False
+
+    if looks_like_json(content_type, body):
+        try:
+            if charset and charset.lower().replace("-", "") not in ("utf8", "ascii"):
+                body = body.decode(charset).encode("utf-8")
+            return _decoder(body), True
+        except UnicodeDecodeError as e:
+            logger.warning(f"Тело ответа API не в кодировке {charset or 'utf-8'}: {e}")
+        except DECODE_ERRORS as e:
+            logger.warning(f"Некорректный JSON в ответе API ({_decoder_name}): {e}")
+
+    return body.decode(charset or "utf-8", errors="replace"), False
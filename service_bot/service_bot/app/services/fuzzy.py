@@ -0,0 +1,347 @@
+"""Нечеткий поиск товаров по коду и названию: триграммный индекс и ранжирование по расстоянию правки"""
+import heapq
+import itertools
+import re
+import time
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+
+from loguru import logger
+
+SEPARATORS_RE = re.compile(r"[\W_]+")
+
+# Триграммы, встречающиеся почти везде (например, "000" в кодах), почти не отсекают кандидатов -
+# если есть более редкие, такие списки не просматриваются
+MAX_POSTING_SHARE = 0.2
+# Доля ключей без товаров (после apply_changes), при которой индекс стоит собрать заново
+MAX_DEAD_KEY_SHARE = 0.1
+CANDIDATES = 40
+
+
+def compact(text):
+    """Регистр, ё -> е, без пробелов, дефисов и точек: "5W-30" и "5w 30" дают "5w30" """
+    return SEPARATORS_RE.sub("", str(text).casefold().replace("ё", "е"))
+
+
+def words(text):
+    """Слова текста в том же виде, что и compact: "Лампа H7 12V" -> ["лампа", "h7", "12v"]"""
+    return [word for word in SEPARATORS_RE.split(str(text).casefold().replace("ё", "е")) if word]
+
+
+def default_max_distance(pattern):
+    """Допустимое число опечаток: в запросе из 1-2 символов опечатку не отличить от другого слова"""
+    return max(1, len(pattern) // 3) if len(pattern) > 2 else 0
+
+
+def product_keys(product):
+    """Ключи товара: код (и код без ведущих нулей), название целиком и каждое слово названия"""
+    code = compact(product.code)
+    keys = [code]
+    if code.startswith("0") and code.strip("0"):
+        keys.append(code.lstrip("0"))
+    name_words = words(product.name)
+    keys.append("".join(name_words))
+    keys.extend(name_words)
+    return keys
+
+
+def trigrams(text):
+
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def substring_distance(pattern, text):
+    """Наименьшее расстояние Левенштейна от pattern до любой подстроки text.
+
+    Битово-параллельный алгоритм Майерса: один проход по text, состояние столбца
+    матрицы расстояний хранится в битах целых чисел.
+    """
+    length = len(pattern)
+    if not length:
+        return 0
+    if pattern in text:
+        return 0
+
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    mask = (1 << length) - 1
+    high = 1 << (length - 1)
+    pv, mv = mask, 0
+    score = best = length
+
+    for char in text:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+            if score < best:
+                best = score
+
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+
+    return best
+
+
+class FuzzyIndex:
+    """Триграммный индекс кодов и названий товаров.
+
+    Ключи товара - код, название целиком (для запросов вроде "5w30") и каждое слово названия:
+    по ключу-слову находятся и короткие запросы ("h7"), и слова из середины названия.
+    Запрос из нескольких слов ищется и целиком, и по словам - в любом порядке.
+    Одинаковые ключи (названия и слова повторяются у разных товаров) хранятся один раз,
+    списки триграмм - компактные массивы номеров ключей. Индекс собирается
+    целиком и подменяется одним присваиванием, поэтому его можно строить
+    в отдельном потоке, не останавливая поиск. Изменения отдельных товаров
+    (apply_changes) вносятся на месте - в потоке событий, между запросами; ключ, у которого
+    не осталось товаров, помечается мертвым и пропускается при поиске, а когда таких ключей
+    становится больше MAX_DEAD_KEY_SHARE, индекс нужно собрать заново (needs_rebuild).
+    """
+
+    def __init__(self):
+        # (ключи, товары каждого ключа, триграмма -> номера ключей, ключ -> номер,
+        #  номера мертвых ключей, триграмма -> сколько мертвых ключей в ее списке)
+        self._data = ([], [], {}, {}, set(), {})
+        self._source = ()
+        self.stats = {"builds": 0, "build_ms": 0.0, "queries": 0, "query_ms_total": 0.0}
+
+    def __len__(self):
+        return len(self._source)
+
+    def is_built_for(self, products):
+        """Индекс собран по этим же объектам товаров - к нему можно применять изменения"""
+        return self._source is products
+
+    def needs_rebuild(self):
+        """Мертвых ключей слишком много: они занимают память и удлиняют списки триграмм"""
+        keys, _, _, _, dead, _ = self._data
+        return len(dead) > len(keys) * MAX_DEAD_KEY_SHARE
+
+    def build(self, products, force=False):
+        """Строит индекс заново; повторная сборка для того же каталога пропускается (если не force)"""
+        products = tuple(products)
+        if products == self._source and not force:
+            return
+
+        started = time.perf_counter()
+        key_ids = {}
+        key_products = []
+        postings = {}
+
+        for product in products:
+            for key in product_keys(product):
+                self._add_key(key, product, key_products, postings, key_ids)
+
+        self._data = (list(key_ids), key_products, postings, key_ids, set(), {})
+        self._source = products
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["builds"] += 1
+        self.stats["build_ms"] = round(elapsed, 1)
+        logger.info(f"Триграммный индекс построен за {elapsed:.0f} мс: товаров {len(products)}, "
+                    f"ключей {len(key_ids)}, триграмм {len(postings)}")
+
+    @staticmethod
+    def _add_key(key, product, key_products, postings, key_ids, keys=None):
+
+        if not key:
+            return
+        key_id = key_ids.get(key)
+        if key_id is None:
+            key_id = key_ids[key] = len(key_products)
+            key_products.append([])
+            if keys is not None:
+                keys.append(key)
+            for gram in trigrams(key):
+                gram_keys = postings.get(gram)
+                if gram_keys is None:
+                    gram_keys = postings[gram] = array("I")
+                gram_keys.append(key_id)
+        key_products[key_id].append(product)
+
+    def apply_changes(self, products, removed, added):
+        """Правит индекс по изменениям товаров вместо полной сборки.
+
+        Args:
+            products: полный список товаров после изменений
+            removed: прежние записи удаленных и измененных товаров
+            added: новые и измененные товары
+        Ключ, у которого не осталось товаров, становится мертвым: из списков триграмм
+        он не удаляется (это линейный проход по длинным спискам), а пропускается при поиске.
+        """
+        started = time.perf_counter()
+        keys, key_products, postings, key_ids, dead, dead_grams = self._data
+        for product in added:
+            for key in product_keys(product):
+                self._add_key(key, product, key_products, postings, key_ids, keys)
+
+        removed_by_key = defaultdict(set)
+        for product in removed:
+            for key in product_keys(product):
+                key_id = key_ids.get(key)
+                if key_id is not None:
+                    removed_by_key[key_id].add(id(product))
+        for key_id, product_ids in removed_by_key.items():
+            remaining = [product for product in key_products[key_id] if id(product) not in product_ids]
+            key_products[key_id] = remaining
+            if not remaining:
+                key = keys[key_id]
+                del key_ids[key]
+                dead.add(key_id)
+                for gram in trigrams(key):
+                    dead_grams[gram] = dead_grams.get(gram, 0) + 1
+
+        self._source = tuple(products)
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"Триграммный индекс обновлен по изменениям за {elapsed:.1f} мс: удалено {len(removed)}, "
+                    f"добавлено {len(added)}, ключей {len(key_ids)}, мертвых {len(dead)}")
+
+    @staticmethod
+    def _candidates(live_keys, postings_by_gram, grams, dead, dead_grams):
+        """Ключи с наибольшим числом общих триграмм. Длины списков и порог частых триграмм
+        считаются только по живым ключам (live_keys - число ключей с товарами)"""
+        lists = []
+        for gram in grams:
+            postings = postings_by_gram.get(gram)
+            if postings is not None:
+                live_length = len(postings) - dead_grams.get(gram, 0)
+                if live_length:
+                    lists.append((live_length, postings))
+        if not lists:
+            return []
+        lists.sort(key=itemgetter(0))
+
+        limit = max(lists[0][0], int(live_keys * MAX_POSTING_SHARE))
+        counts = defaultdict(int)
+        for live_length, postings in lists:
+            if live_length > limit:
+                break
+            for key_id in postings:
+                counts[key_id] += 1
+
+        live = ((key_id, count) for key_id, count in counts.items() if key_id not in dead)
+        return [key_id for key_id, _ in heapq.nlargest(CANDIDATES, live, key=itemgetter(1))]
+
+    def _match(self, data, pattern, max_distance):
+        """Ключи, похожие на pattern: список (расстояние, разница длин, номер ключа) по возрастанию"""
+        keys, _, postings_by_gram, key_ids, dead, dead_grams = data
+        if max_distance is None:
+            max_distance = default_max_distance(pattern)
+        if len(pattern) <= 2 and pattern in key_ids:
+            # Короткий запрос - это слово названия целиком ("h7"): триграммы у него слишком частые
+            return [(0, 0, key_ids[pattern])]
+
+        ranked = []
+        for key_id in self._candidates(len(key_ids), postings_by_gram, trigrams(pattern), dead, dead_grams):
+            key = keys[key_id]
+            distance = substring_distance(pattern, key)
+            if distance <= max_distance:
+                ranked.append((distance, abs(len(key) - len(pattern)), key_id))
+        ranked.sort()
+        return ranked
+
+    def _match_words(self, data, query_words, max_distance, best, limit):
+        """Товары, в ключах которых есть все слова запроса (в любом порядке), - в best
+        с суммой расстояний по словам. Пересекаются множества id товаров по уровням расстояния,
+        от меньшей суммы к большей, пока не набрано limit товаров: у частых слов это десятки
+        тысяч товаров, и перебирать каждый из них было бы дорого"""
+        key_products = data[1]
+        # Для каждого слова: (номера подходящих ключей, [(расстояние, id товаров), ...])
+        matches = []
+        for word in query_words:
+            key_ids, by_distance = [], defaultdict(set)
+            for distance, _, key_id in self._match(data, word, max_distance):
+                key_ids.append(key_id)
+                by_distance[distance].update(map(id, key_products[key_id]))
+            if not key_ids:
+                return
+            matches.append((key_ids, sorted(by_distance.items())))
+
+        # Товары перебираются в порядке ключей самого редкого слова - так выдача не зависит от порядка в множествах
+        rarest_keys = min(matches, key=lambda match: sum(len(ids) for _, ids in match[1]))[0]
+        combinations = sorted(itertools.product(*(levels for _, levels in matches)),
+                              key=lambda combination: sum(distance for distance, _ in combination))
+        taken = 0
+        for combination in combinations:
+            sets = sorted((ids for _, ids in combination), key=len)
+            found = sets[0].intersection(*sets[1:])
+            if not found:
+                continue
+            total = sum(distance for distance, _ in combination)
+            for key_id in rarest_keys:
+                for product in key_products[key_id]:
+                    product_id = id(product)
+                    if product_id not in found:
+                        continue
+                    found.discard(product_id)
+                    if product_id not in best or total < best[product_id][0]:
+                        best[product_id] = (total, 0, product)
+                        taken += 1
+                    if taken >= limit or not found:
+                        break
+                if taken >= limit or not found:
+                    break
+            if taken >= limit:
+                return
+
+    def search(self, query, limit=10, max_distance=None):
+        """Товары, ближайшие к запросу: сначала по расстоянию правки, затем по длине ключа.
+        Для запроса из нескольких слов расстояние товара - сумма расстояний по словам
+        (или расстояние запроса целиком, если оно меньше).
+
+        Returns:
+            список пар (товар, расстояние)
+        """
+        started = time.perf_counter()
+        data = self._data
+        keys, key_products, _, _, _, _ = data
+        pattern = compact(query)
+        if not pattern or not keys:
+            return []
+
+        # id товара -> (расстояние, разница длин, товар); ключи идут по возрастанию расстояния
+        best = {}
+        for distance, length_gap, key_id in self._match(data, pattern, max_distance):
+            for product in key_products[key_id]:
+                best.setdefault(id(product), (distance, length_gap, product))
+            if len(best) >= limit:
+                break
+
+        query_words = list(dict.fromkeys(words(query)))
+        if len(query_words) > 1:
+            self._match_words(data, query_words, max_distance, best, limit)
+
+        ranked = heapq.nsmallest(limit, best.values(), key=itemgetter(0, 1))
+        results = [(product, distance) for distance, _, product in ranked]
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["queries"] += 1
+        self.stats["query_ms_total"] += elapsed
+        logger.debug(f"Нечеткий поиск \"{query}\": {len(results)} товаров за {elapsed:.2f} мс")
+        return results[:limit]
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        stats["products"] = len(self._source)
+        stats["keys"] = len(self._data[3])
+        stats["trigrams"] = len(self._data[2])
+        stats["dead_keys"] = len(self._data[4])
+        total = stats.pop("query_ms_total")
+        stats["avg_query_ms"] = round(total / stats["queries"], 3) if stats["queries"] else 0.0
+        return stats
+
+
+fuzzy_index = FuzzyIndex()
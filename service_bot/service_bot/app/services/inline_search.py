@@ -0,0 +1,127 @@
+"""Ответы на inline-запросы (@бот запрос) из локального поискового индекса каталога"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from loguru import logger
+
+from app.config.config import INLINE_CACHE_SIZE, INLINE_DEBOUNCE_DELAY
+from app.services.models import Product
+from app.services.search import normalize, search_index
+from app.utils.formatting import format_price, format_product_info, format_service_info
+
+# Telegram показывает не больше 50 результатов, в выпадающем списке удобно не больше 20
+INLINE_RESULTS_LIMIT = 20
+
+
+def product_description(product):
+    """Краткая строка под названием товара: цена, категория, наличие"""
+    parts = [format_price(product.price)]
+    if product.category_name:
+        parts.append(product.category_name)
+    parts.append(f"в наличии {product.stock} шт." if product.in_stock else "нет в наличии")
+    return " · ".join(parts)
+
+
+def service_description(service):
+
+    parts = [format_price(service.price)]
+    if service.duration and service.duration != "Нет данных о длительности":
+        parts.append(f"{service.duration} мин.")
+    return " · ".join(parts)
+
+
+def make_article(record):
+    """Результат inline-запроса: в чат отправляется карточка, как в каталоге бота"""
+    if isinstance(record, Product):
+        prefix, text, description = "product", format_product_info(record), product_description(record)
+    else:
+        prefix, text, description = "service", format_service_info(record), service_description(record)
+
+    return InlineQueryResultArticle(
+        id=f"{prefix}_{record.id}"[:64],
+        title=record.name,
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text, parse_mode="HTML"),
+    )
+
+
+class InlineSearch:
+    """Кэш готовых ответов на inline-запросы и подавление промежуточных запросов при наборе.
+
+    Ответы строятся только по локальному индексу и кэшируются по тексту запроса
+    и версии индекса: после обновления каталога старые ответы не используются.
+    """
+
+    def __init__(self, cache_size=INLINE_CACHE_SIZE, debounce_delay=INLINE_DEBOUNCE_DELAY):
+        self.cache_size = cache_size
+        self.debounce_delay = debounce_delay
+        self._cache = OrderedDict()
+        self._tickets = {}
+        self.stats = {
+            "queries": 0,
+            "cache_hits": 0,
+            "debounced": 0,
+            "build_ms_total": 0.0,
+        }
+
+    @staticmethod
+    def _cache_key(query):
+        return search_index.version, " ".join(normalize(query).split())
+
+    def is_cached(self, query):
+
+        return self._cache_key(query) in self._cache
+
+    async def debounce(self, user_id):
+        """Ждет паузу в наборе. False - за это время пользователь отправил более новый запрос"""
+        ticket = self._tickets.get(user_id, 0) + 1
+        self._tickets[user_id] = ticket
+        await asyncio.sleep(self.debounce_delay)
+
+        if self._tickets.get(user_id) != ticket:
+            self.stats["debounced"] += 1
+            return False
+        del self._tickets[user_id]
+        return True
+
+    def results(self, query):
+        """Готовые результаты для ответа на inline-запрос"""
+        self.stats["queries"] += 1
+        key = self._cache_key(query)
+
+        articles = self._cache.get(key)
+        if articles is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return articles
+
+        started = time.perf_counter()
+        articles = [make_article(record) for record in search_index.search(key[1], limit=INLINE_RESULTS_LIMIT)]
+
+        self._cache[key] = articles
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["build_ms_total"] += elapsed
+        logger.debug(f"Inline-запрос \"{query}\": {len(articles)} результатов за {elapsed:.2f} мс")
+        return articles
+
+    def clear(self):
+
+        self._cache.clear()
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        built = stats["queries"] - stats["cache_hits"]
+        total = stats.pop("build_ms_total")
+        stats["cached"] = len(self._cache)
+        stats["avg_build_ms"] = round(total / built, 3) if built else 0.0
+        stats["hit_rate"] = round(stats["cache_hits"] / stats["queries"], 3) if stats["queries"] else 0.0
+        return stats
+
+
+inline_search = InlineSearch()
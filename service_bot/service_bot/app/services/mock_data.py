@@ -0,0 +1,101 @@
+"""Генерация тестового каталога в формате HTTP-сервиса 1С"""
+import random
+import uuid
+
+CATEGORY_NAMES = [
+    "Запчасти", "Электроника", "Аксессуары", "Автокосметика", "Крепеж",
+    "Масла и жидкости", "Фильтры", "Тормозная система", "Подвеска", "Шины и диски",
+]
+
+PART_NAMES = [
+    "Тормозные колодки", "Амортизатор задний", "Амортизатор передний", "Масляный фильтр",
+    "Воздушный фильтр", "Салонный фильтр", "Свеча зажигания", "Ремень ГРМ", "Помпа",
+    "Тормозной диск", "Рычаг подвески", "Шаровая опора", "Стойка стабилизатора",
+    "Автошампунь концентрат", "Полироль кузова", "Анкерный болт", "Щетка стеклоочистителя",
+    "Аккумулятор", "Лампа H7", "Камера заднего вида", "Видеорегистратор", "Моторное масло 5W-30",
+]
+
+BRANDS = ["Toyota", "Kia", "Hyundai", "Lada", "Brembo", "Bosch", "Mann", "NGK", "Castrol", "Sachs"]
+
+SUPPLIERS = ["Запчасти для авто", "Электроника для авто", "Автоаксессуары", "АвтоХимия Опт"]
+
+SERVICE_NAMES = [
+    "Диагностика автомобиля", "Замена масла", "Ремонт тормозной системы", "Покраска кузова",
+    "Шиномонтаж", "Развал-схождение", "Замена ремня ГРМ", "Заправка кондиционера",
+]
+
+ORDER_STATUSES = [
+    {"id": "new", "name": "Новый"},
+    {"id": "in_progress", "name": "В работе"},
+    {"id": "ready", "name": "Готов"},
+    {"id": "done", "name": "Выполнен"},
+    {"id": "cancelled", "name": "Отменен"},
+]
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def make_categories(count=len(CATEGORY_NAMES), seed=1):
+
+    rng = random.Random(seed)
+    return [
+        {
+            "Идентификатор": {"id": _uuid(rng)},
+            "Код": f"{i + 1:09d}",
+            "Наименование": CATEGORY_NAMES[i % len(CATEGORY_NAMES)] + ("" if i < len(CATEGORY_NAMES) else f" {i}"),
+            "Описание": f"Товары раздела {CATEGORY_NAMES[i % len(CATEGORY_NAMES)].lower()}",
+        }
+        for i in range(count)
+    ]
+
+
+def make_products(count, categories=None, seed=2):
+
+    rng = random.Random(seed)
+    categories = categories or make_categories()
+    products = []
+
+    for i in range(count):
+        category = categories[i % len(categories)]
+        name = f"{rng.choice(PART_NAMES)} {rng.choice(BRANDS)}"
+        stock = rng.randint(0, 40)
+        products.append({
+            "Идентификатор": {"id": _uuid(rng)},
+            "Код": f"{i + 1:09d}",
+            "Наименование": name,
+            "Описание": f"{name}, артикул {rng.randint(10000, 99999)}-{rng.choice('ABCDEK')}{rng.randint(1, 99)}",
+            "Категория": {"id": category["Идентификатор"]["id"]},
+            "КатегорияНаименование": category["Наименование"],
+            "Цена": rng.randint(1, 500) * 50,
+            "КоличествоНаСкладе": stock,
+            "Поставщик": {"id": _uuid(rng)},
+            "ПоставщикНаименование": rng.choice(SUPPLIERS),
+            "ВНаличии": stock > 0,
+        })
+
+    return products
+
+
+def make_services(count=len(SERVICE_NAMES), seed=3):
+
+    rng = random.Random(seed)
+    category_id = _uuid(rng)
+    return [
+        {
+            "Идентификатор": {"id": _uuid(rng)},
+            "Код": f"{i + 51:09d}",
+            "Наименование": SERVICE_NAMES[i % len(SERVICE_NAMES)] + ("" if i < len(SERVICE_NAMES) else f" {i}"),
+            "Описание": f"{SERVICE_NAMES[i % len(SERVICE_NAMES)]} в нашем сервисе",
+            "Категория": {"id": category_id},
+            "КатегорияНаименование": "Услуги",
+            "Цена": rng.randint(5, 100) * 100,
+        }
+        for i in range(count)
+    ]
+
+
+def envelope(key, items):
+    """Ответ 1С: {"status": 200, "data": {key: [...], "stats": {...}}}"""
+    return {"status": 200, "data": {key: items, "stats": {"total": len(items)}}}
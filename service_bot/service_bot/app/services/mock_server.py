@@ -0,0 +1,450 @@
+"""Локальный HTTP-сервер, имитирующий HTTP-сервис 1С, для офлайн-проверки ботов.
+
+Запуск из каталога бота:
+    python -m app.services.mock_server --products 5000 --port 8000
+
+и в .env: API_URL=http://localhost:8000/test/hs
+С --churn 30 сервер сам меняет 30 товаров в минуту (для проверки синхронизации изменений),
+с --bandwidth 20 отдает ответы со скоростью 20 Мбит/с, как через медленный канал.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import time
+import zlib
+from collections import OrderedDict
+
+from aiohttp import web
+from loguru import logger
+
+from app.services.decoders import brotli
+from app.services.mock_data import ORDER_STATUSES, envelope, make_categories, make_products, make_services
+
+DEFAULT_PREFIX = "/test/hs"
+
+# Сколько последних изменений товаров помнит сервер; более старую версию догнать нельзя
+CHANGE_LOG_LIMIT = 10_000
+
+# Сжатие ответов: кодировки в порядке предпочтения сервера; маленькие ответы не сжимаются
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, 6), "deflate": lambda body: zlib.compress(body, 6)}
+if brotli is not None:
+    COMPRESSORS = {"br": lambda body: brotli.compress(body, quality=5), **COMPRESSORS}
+COMPRESS_MIN_SIZE = 1024
+TRANSFER_CHUNK = 64 * 1024
+
+
+def _json(payload, status=200):
+    return web.Response(
+        body=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        status=status,
+        content_type="application/json"
+    )
+
+
+def _not_found(message):
+    return _json({"status": 404, "data": {"error": "Не найдено", "message": message}}, status=404)
+
+
+def paginate(request, items):
+    """Срез по параметрам offset/limit; без limit возвращается весь список"""
+    try:
+        offset = max(0, int(request.query.get("offset", 0)))
+        limit = request.query.get("limit")
+        limit = max(0, int(limit)) if limit is not None else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="offset и limit должны быть числами")
+
+    if limit is None:
+        return items[offset:] if offset else items
+    return items[offset:offset + limit]
+
+
+def list_response(request, key, items, version=None):
+
+    payload = envelope(key, paginate(request, items))
+    payload["data"]["stats"]["total"] = len(items)
+    if version is not None:
+        payload["data"]["stats"]["version"] = version
+    return _json(payload)
+
+
+class MockCatalog:
+
+    def __init__(self, products=200, services=8, categories=10):
+        self.categories = make_categories(categories)
+        self.products = make_products(products, self.categories)
+        self.services = make_services(services)
+        self._index()
+
+        # Версия товаров растет с каждым изменением; журнал: код -> версия последнего изменения
+        self.version = 1
+        self.log_start = self.version
+        self.modified_at = time.time()
+        self._changes = {}
+        self._deleted = set()
+        # Номер заказа -> (статус, время изменения)
+        self.orders = {}
+
+    def _index(self):
+
+        self.products_by_code = {p["Код"]: p for p in self.products}
+        self.services_by_code = {s["Код"]: s for s in self.services}
+        self.categories_by_code = {c["Код"]: c for c in self.categories}
+        self.products_by_category = {}
+        for product in self.products:
+            self.products_by_category.setdefault(product["Категория"]["id"], []).append(product)
+
+    def category_products(self, code):
+
+        category = self.categories_by_code.get(code)
+        if category is None:
+            return None, []
+        return category, self.products_by_category.get(category["Идентификатор"]["id"], [])
+
+    def _log_change(self, code):
+
+        self.version += 1
+        self.modified_at = time.time()
+        self._changes.pop(code, None)
+        self._changes[code] = self.version
+        while len(self._changes) > CHANGE_LOG_LIMIT:
+            oldest = next(iter(self._changes))
+            self.log_start = self._changes.pop(oldest)
+            self._deleted.discard(oldest)
+
+    def change_product(self, code, **fields):
+        """Изменяет поля товара (например, Цена=...), как если бы его отредактировали в 1С"""
+        product = self.products_by_code[code]
+        category = product["Категория"]
+        product.update(fields)
+        if product["Категория"] != category:
+            self._index()
+        self._log_change(code)
+        return product
+
+    def add_product(self, product):
+
+        self.products.append(product)
+        self._deleted.discard(product["Код"])
+        self._index()
+        self._log_change(product["Код"])
+
+    def delete_product(self, code):
+
+        product = self.products_by_code[code]
+        self.products.remove(product)
+        self._deleted.add(code)
+        self._index()
+        self._log_change(code)
+
+    def changes_since(self, since):
+        """Товары, измененные после версии since, и коды удаленных.
+        None, если журнал уже не содержит всех изменений с этой версии"""
+        if since < self.log_start or since > self.version:
+            return None
+
+        changed, deleted = [], []
+        for code, version in reversed(self._changes.items()):
+            if version <= since:
+                break
+            if code in self._deleted:
+                deleted.append(code)
+            else:
+                changed.append(self.products_by_code[code])
+        return changed, deleted
+
+
+def conditional_middleware(catalog):
+    """ETag (хэш тела) и Last-Modified (время последнего изменения каталога) для GET-ответов;
+    если у клиента актуальная версия - 304 без тела"""
+
+    @web.middleware
+    async def middleware(request, handler):
+        response = await handler(request)
+        if request.method != "GET" or response.status != 200 or not isinstance(response.body, bytes):
+            return response
+
+        etag = hashlib.sha1(response.body).hexdigest()[:20]
+        response.etag = etag
+        response.last_modified = catalog.modified_at
+
+        if request.if_none_match is not None:
+            not_modified = any(tag.value in (etag, "*") for tag in request.if_none_match)
+        elif request.if_modified_since is not None:
+            not_modified = int(catalog.modified_at) <= request.if_modified_since.timestamp()
+        else:
+            not_modified = False
+
+        if not_modified:
+            cached = web.Response(status=304)
+            cached.etag = etag
+            cached.last_modified = catalog.modified_at
+            return cached
+        return response
+
+    return middleware
+
+
+def choose_encoding(accept_encoding):
+    """Лучшая из кодировок, которые принимает клиент (q=0 - отказ)"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.strip())
+    return next((name for name in COMPRESSORS if name in accepted), None)
+
+
+def sessions_middleware(sessions=None, latency=0.0):
+    """HTTP-сервис 1С обрабатывает параллельно лишь sessions запросов, каждый - не быстрее latency
+    секунд; остальные ждут свободного сеанса. Счетчики - в app["sessions"]"""
+    semaphore = asyncio.Semaphore(sessions) if sessions else None
+    stats = {"requests": 0, "max_queue": 0}
+    waiting = 0
+
+    @web.middleware
+    async def middleware(request, handler):
+        nonlocal waiting
+        stats["requests"] += 1
+        if semaphore is None:
+            await asyncio.sleep(latency)
+            return await handler(request)
+
+        waiting += 1
+        stats["max_queue"] = max(stats["max_queue"], waiting)
+        async with semaphore:
+            waiting -= 1
+            await asyncio.sleep(latency)
+            return await handler(request)
+
+    middleware.stats = stats
+    return middleware
+
+
+def transfer_middleware(bandwidth=None, cache_size=32):
+    """Сжатие ответа по Accept-Encoding и, если задана полоса (байт/с), медленная отдача,
+    как через WAN-канал до публикации 1С. Сжатые тела кэшируются по ETag"""
+    compressed = OrderedDict()
+
+    def compress(response, encoding):
+        key = (response.headers.get("ETag"), encoding)
+        body = compressed.get(key) if key[0] else None
+        if body is None:
+            body = COMPRESSORS[encoding](response.body)
+            compressed[key] = body
+            while len(compressed) > cache_size:
+                compressed.popitem(last=False)
+        return body
+
+    @web.middleware
+    async def middleware(request, handler):
+        response = await handler(request)
+        body = response.body if isinstance(response.body, bytes) else b""
+        headers = {name: value for name, value in response.headers.items() if name.lower() != "content-length"}
+
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is not None and len(body) >= COMPRESS_MIN_SIZE:
+            body = compress(response, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Vary"] = "Accept-Encoding"
+        elif not bandwidth:
+            return response
+
+        stream = web.StreamResponse(status=response.status, headers=headers)
+        stream.content_length = len(body)
+        await stream.prepare(request)
+        for start in range(0, len(body), TRANSFER_CHUNK):
+            chunk = body[start:start + TRANSFER_CHUNK]
+            await stream.write(chunk)
+            if bandwidth:
+                await asyncio.sleep(len(chunk) / bandwidth)
+        await stream.write_eof()
+        return stream
+
+    return middleware
+
+
+def create_app(catalog=None, prefix=DEFAULT_PREFIX, bandwidth=None, sessions=None, latency=0.0):
+    """bandwidth - ограничение скорости отдачи в байтах в секунду (None - без ограничения);
+    sessions и latency - число параллельных сеансов 1С и время обработки запроса в секундах"""
+    catalog = catalog or MockCatalog()
+    middlewares = [transfer_middleware(bandwidth), conditional_middleware(catalog)]
+    if sessions or latency:
+        middlewares.insert(0, sessions_middleware(sessions, latency))
+    app = web.Application(middlewares=middlewares)
+    app["catalog"] = catalog
+    app["sessions"] = middlewares[0].stats if sessions or latency else None
+
+    async def ping(request):
+        return _json({"status": 200, "data": {"message": "Тестовый сервер 1С работает"}})
+
+    async def get_categories(request):
+        return list_response(request, "categories", catalog.categories)
+
+    async def get_category(request):
+        category, products = catalog.category_products(request.match_info["code"])
+        if category is None:
+            return _not_found("Категория не найдена")
+        page = paginate(request, products)
+        return _json({
+            "status": 200,
+            "data": {
+                "category": {
+                    "id": category["Код"],
+                    "name": category["Наименование"],
+                    "description": category["Описание"]
+                },
+                "products": page,
+                "stats": {"total": len(products)}
+            }
+        })
+
+    async def get_products(request):
+        return list_response(request, "products", catalog.products, catalog.version)
+
+    async def get_changes(request):
+        try:
+            since = int(request.query["since"])
+        except (KeyError, ValueError):
+            raise web.HTTPBadRequest(text="Не указана версия since")
+
+        changes = catalog.changes_since(since)
+        if changes is None:
+            return _json({
+                "status": 410,
+                "data": {"error": "Журнал изменений устарел", "message": "Требуется полная загрузка каталога"}
+            }, status=410)
+
+        changed, deleted = changes
+        return _json({
+            "status": 200,
+            "data": {
+                "products": changed,
+                "deleted": deleted,
+                "stats": {"since": since, "version": catalog.version, "total": len(catalog.products)}
+            }
+        })
+
+    async def get_product(request):
+        product = catalog.products_by_code.get(request.match_info["code"])
+        if product is None:
+            return _not_found("Товар не найден")
+        return _json({"status": 200, "data": {"product": dict(product, МинимальныйЗапас=5)}})
+
+    async def get_products_by_category(request):
+        category, products = catalog.category_products(request.match_info["code"])
+        if category is None:
+            return _not_found("Категория не найдена")
+        return list_response(request, "products", products)
+
+    async def get_services(request):
+        return list_response(request, "services", catalog.services)
+
+    async def get_service(request):
+        service = catalog.services_by_code.get(request.match_info["code"])
+        if service is None:
+            return _not_found("Услуга не найдена")
+        return _json({
+            "status": 200,
+            "data": {
+                "service": {
+                    "id": service["Код"],
+                    "name": service["Наименование"],
+                    "description": service["Описание"],
+                    "category_id": service["Категория"]["id"],
+                    "category_name": service["КатегорияНаименование"],
+                    "price": service["Цена"],
+                    "execution_time": 60,
+                    "requires_parts": False
+                }
+            }
+        })
+
+    async def get_order_statuses(request):
+        return _json({"status": 200, "data": {"statuses": ORDER_STATUSES}})
+
+    async def get_order_status(request):
+        order_id = request.match_info["order_id"]
+        status, updated_at = catalog.orders.get(order_id, (ORDER_STATUSES[0]["id"], None))
+        return _json({"status": 200, "data": {"order_id": order_id, "status": status, "updated_at": updated_at}})
+
+    async def update_order_status(request):
+        order_id = request.match_info["order_id"]
+        status = (await request.json()).get("status")
+        if status not in {item["id"] for item in ORDER_STATUSES}:
+            return _json({"status": 400, "data": {"error": "Неизвестный статус", "message": str(status)}}, status=400)
+        updated_at = time.strftime("%d.%m.%Y %H:%M:%S")
+        catalog.orders[order_id] = (status, updated_at)
+        return _json({"status": 200, "data": {"order_id": order_id, "status": status, "updated_at": updated_at}})
+
+    api = f"{prefix}/api"
+    app.router.add_get(prefix or "/", ping)
+    app.router.add_get(f"{prefix}/test", ping)
+    app.router.add_get(f"{api}/catalog/categories", get_categories)
+    app.router.add_get(f"{api}/catalog/categories/{{code}}", get_category)
+    app.router.add_get(f"{api}/catalog/products", get_products)
+    app.router.add_get(f"{api}/catalog/changes", get_changes)
+    app.router.add_get(f"{api}/catalog/products/category/{{code}}", get_products_by_category)
+    app.router.add_get(f"{api}/catalog/products/{{code}}", get_product)
+    app.router.add_get(f"{api}/catalog/services", get_services)
+    app.router.add_get(f"{api}/catalog/services/{{code}}", get_service)
+    app.router.add_get(f"{api}/orders/statuses/list", get_order_statuses)
+    app.router.add_post(f"{api}/orders/{{order_id}}/status", get_order_status)
+    app.router.add_put(f"{api}/orders/{{order_id}}/status", update_order_status)
+    return app
+
+
+async def churn(catalog, per_minute, seed=5):
+    """Фоновые изменения цен и остатков, чтобы бот было что синхронизировать"""
+    rng = random.Random(seed)
+    while True:
+        await asyncio.sleep(60 / per_minute)
+        product = rng.choice(catalog.products)
+        stock = rng.randint(0, 40)
+        catalog.change_product(product["Код"], Цена=rng.randint(1, 500) * 50, КоличествоНаСкладе=stock, ВНаличии=stock > 0)
+
+
+async def start_mock_server(host="127.0.0.1", port=8000, catalog=None, prefix=DEFAULT_PREFIX, bandwidth=None,
+                            sessions=None, latency=0.0):
+    """Запускает сервер в текущем цикле событий; возвращает AppRunner для остановки"""
+    runner = web.AppRunner(create_app(catalog, prefix, bandwidth, sessions, latency))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Тестовый сервер 1С: http://{host}:{port}{prefix}")
+    return runner
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Тестовый HTTP-сервис 1С")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--services", type=int, default=8)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0, help="изменений товаров в минуту")
+    parser.add_argument("--bandwidth", type=float, default=0, help="скорость канала, Мбит/с (0 - без ограничения)")
+    parser.add_argument("--sessions", type=int, default=0, help="параллельных сеансов 1С (0 - без ограничения)")
+    parser.add_argument("--latency", type=float, default=0, help="время обработки запроса в 1С, мс")
+    args = parser.parse_args()
+
+    catalog = MockCatalog(args.products, args.services, args.categories)
+    app = create_app(catalog, args.prefix, args.bandwidth * 125_000 or None, args.sessions or None, args.latency / 1000)
+
+    if args.churn > 0:
+        async def run_churn(app):
+            task = asyncio.create_task(churn(catalog, args.churn))
+            yield
+            task.cancel()
+
+        app.cleanup_ctx.append(run_churn)
+
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
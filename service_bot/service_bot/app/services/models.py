@@ -0,0 +1,40 @@
+"""Компактные записи каталога, в которые сразу разбираются ответы 1С"""
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class Category:
+    id: str = ""
+    code: str = ""
+    name: str = "Категория"
+    description: str = ""
+
+
+@dataclass(slots=True)
+class Product:
+    id: str = ""
+    code: str = ""
+    name: str = "Товар"
+    price: object = "По запросу"
+    description: str = ""
+    stock: int = 0
+    category: str = ""
+    category_name: str = ""
+    in_stock: bool = False
+    min_stock: int = 0
+    supplier: str = ""
+
+
+@dataclass(slots=True)
+class Service:
+    id: str = ""
+    code: str = ""
+    name: str = "Услуга"
+    price: object = "По запросу"
+    description: str = ""
+    duration: object = 0
+    category: str = ""
+    category_name: str = ""
+
+
+CATALOG_RECORDS = (Category, Product, Service)
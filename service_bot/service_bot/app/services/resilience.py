@@ -0,0 +1,99 @@
+import random
+import time
+from loguru import logger
+
+# Ответы, при которых имеет смысл повторить идемпотентный запрос
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Экспоненциальная задержка с полным джиттером: случайное значение в [0, base * 2^attempt]"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для бэкенда 1С.
+
+    closed - запросы идут как обычно; после failure_threshold ошибок подряд
+    переходит в open и отклоняет запросы reset_timeout секунд; затем
+    half_open пропускает один пробный запрос, по результату которого цепь
+    снова замыкается или размыкается.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_started_at = None
+        self.stats = {
+            "opened": 0,
+            "rejected": 0,
+            "failures": 0,
+            "successes": 0,
+        }
+
+    def allow_request(self):
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.stats["rejected"] += 1
+                return False
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            # Пробный запрос уже идет; если он так и не завершился (например, был отменен),
+            # через reset_timeout разрешаем следующий
+            now = time.monotonic()
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+                self.stats["rejected"] += 1
+                return False
+            self._probe_started_at = now
+
+        return True
+
+    def release_probe(self):
+        """Запрос, пропущенный allow_request, так и не был отправлен (например, не дождался очереди):
+        результата нет, поэтому состояние не меняется, но пробный запрос можно пропустить снова"""
+        self._probe_started_at = None
+
+    def record_success(self):
+
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        self._probe_started_at = None
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        self._probe_started_at = None
+
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats["opened"] += 1
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+
+        if state != self.state:
+            logger.warning(f"Размыкатель {self.name}: {self.state} -> {state}")
+        self.state = state
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        stats["state"] = self.state
+        stats["consecutive_failures"] = self.consecutive_failures
+        if self.state == self.OPEN:
+            stats["retry_in"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        return stats
@@ -0,0 +1,291 @@
+"""Полнотекстовый поиск по товарам и услугам: инвертированный индекс с русской нормализацией"""
+import heapq
+import re
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from operator import itemgetter
+
+from loguru import logger
+
+TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+
+# Окончания, отбрасываемые упрощенным стеммером
+ENDINGS = frozenset((
+    "иями", "ями", "ами", "иях", "ией", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ий", "ый", "ой", "ая", "яя", "ое", "ее", "ие", "ые", "ых", "их", "ым", "им",
+    "ую", "юю", "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ей", "ия", "ья",
+    "ье", "ью", "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+))
+ENDING_LENGTHS = sorted({len(ending) for ending in ENDINGS}, reverse=True)
+
+MIN_STEM = 3
+
+# Вес поля: совпадение по коду важнее совпадения в описании
+FIELD_WEIGHTS = (
+    ("code", 5.0),
+    ("name", 3.0),
+    ("category_name", 2.0),
+    ("description", 1.0),
+)
+
+PREFIX_FACTOR = 0.6
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def normalize(text):
+    """Приведение регистра и ё -> е"""
+    return str(text).casefold().replace("ё", "е")
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Отбрасывает одно окончание у русских слов (самое длинное из подходящих);
+    коды, числа и латиница не меняются"""
+    if len(word) <= MIN_STEM + 1 or not ("а" <= word[-1] <= "я"):
+        return word
+    for length in ENDING_LENGTHS:
+        if len(word) - length >= MIN_STEM and word[-length:] in ENDINGS:
+            return word[:-length]
+    return word
+
+
+def tokenize(text):
+
+    tokens = []
+    for word in TOKEN_RE.findall(normalize(text)):
+        tokens.append(stem(word))
+        # Коды 1С дополнены нулями: "000000123" ищется и как "123"
+        if word.isdigit() and word.startswith("0") and word.strip("0"):
+            tokens.append(word.lstrip("0"))
+    return tokens
+
+
+def document_terms(record):
+    """Термины записи с весом лучшего поля, в котором они встретились"""
+    terms = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(record, field, "") or ""):
+            if terms.get(token, 0) < weight:
+                terms[token] = weight
+    return terms
+
+
+class SearchIndex:
+    """Инвертированный индекс товаров и услуг.
+
+    Обновляется по изменениям: при новом снимке каталога переиндексируются
+    только добавленные, измененные и удаленные записи.
+    """
+
+    def __init__(self):
+        self._docs = {}
+        self._doc_terms = {}
+        self._postings = {}
+        self._vocabulary = []
+        # Растет при каждом изменении содержимого; по нему сбрасываются кэши результатов
+        self.version = 0
+        self.stats = {
+            "updates": 0,
+            "indexed": 0,
+            "removed": 0,
+            "last_update_ms": 0.0,
+            "queries": 0,
+            "query_ms_total": 0.0,
+        }
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _key(record):
+        return type(record).__name__, record.id
+
+    def _add(self, key, record):
+
+        terms = document_terms(record)
+        self._docs[key] = record
+        self._doc_terms[key] = terms
+        for term, weight in terms.items():
+            self._postings.setdefault(term, {})[key] = weight
+
+    def _remove(self, key):
+
+        self._docs.pop(key, None)
+        for term in self._doc_terms.pop(key, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def update(self, records):
+        """Приводит индекс к новому набору записей, трогая только изменившиеся"""
+        started = time.perf_counter()
+        vocabulary_size = len(self._postings)
+
+        new_docs = {self._key(record): record for record in records if record.id}
+        removed = [key for key in self._docs if key not in new_docs]
+        for key in removed:
+            self._remove(key)
+
+        indexed = 0
+        for key, record in new_docs.items():
+            current = self._docs.get(key)
+            if current is record or current == record:
+                # Запись не изменилась - оставляем термины, но держим ссылку на актуальный объект
+                self._docs[key] = record
+                continue
+            if current is not None:
+                self._remove(key)
+            self._add(key, record)
+            indexed += 1
+
+        if indexed or removed or len(self._postings) != vocabulary_size:
+            self._vocabulary = sorted(self._postings)
+            self.version += 1
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["updates"] += 1
+        self.stats["indexed"] += indexed
+        self.stats["removed"] += len(removed)
+        self.stats["last_update_ms"] = round(elapsed, 2)
+        logger.info(f"Поисковый индекс обновлен за {elapsed:.1f} мс: переиндексировано {indexed}, "
+                    f"удалено {len(removed)}, всего записей {len(self._docs)}, терминов {len(self._postings)}")
+
+    def apply_changes(self, removed, added):
+        """Вносит изменения отдельных записей (синхронизация каталога по изменениям),
+        не сравнивая весь набор записей, как update"""
+        started = time.perf_counter()
+        touched = set()
+
+        # Измененные записи переиндексируются ниже, удаляются только исчезнувшие
+        added_keys = {self._key(record) for record in added if record.id}
+        removed_count = 0
+        for record in removed:
+            key = self._key(record)
+            if key in self._docs and key not in added_keys:
+                touched.update(self._doc_terms[key])
+                self._remove(key)
+                removed_count += 1
+
+        indexed = 0
+        for record in added:
+            if not record.id:
+                continue
+            key = self._key(record)
+            if key in self._docs:
+                touched.update(self._doc_terms[key])
+                self._remove(key)
+            self._add(key, record)
+            touched.update(self._doc_terms[key])
+            indexed += 1
+
+        # Словарь терминов правится только по терминам измененных записей
+        vocabulary = self._vocabulary
+        for term in touched:
+            position = bisect_left(vocabulary, term)
+            listed = position < len(vocabulary) and vocabulary[position] == term
+            if term in self._postings and not listed:
+                vocabulary.insert(position, term)
+            elif term not in self._postings and listed:
+                del vocabulary[position]
+
+        if indexed or removed_count:
+            self.version += 1
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["updates"] += 1
+        self.stats["indexed"] += indexed
+        self.stats["removed"] += removed_count
+        self.stats["last_update_ms"] = round(elapsed, 2)
+        logger.info(f"Поисковый индекс обновлен по изменениям за {elapsed:.1f} мс: переиндексировано {indexed}, "
+                    f"удалено {removed_count}, всего записей {len(self._docs)}, терминов {len(self._postings)}")
+
+    def _expand(self, token):
+        """Термины, совпадающие с токеном точно или начинающиеся с него (ввод еще не закончен)"""
+        matches = []
+        exact = self._postings.get(token)
+        if exact is not None:
+            matches.append((exact, 1.0))
+
+        position = bisect_left(self._vocabulary, token)
+        expansions = 0
+        while position < len(self._vocabulary) and expansions < MAX_PREFIX_EXPANSIONS:
+            term = self._vocabulary[position]
+            if not term.startswith(token):
+                break
+            if term != token:
+                matches.append((self._postings[term], PREFIX_FACTOR))
+                expansions += 1
+            position += 1
+        return matches
+
+    def search(self, query, limit=10, record_type=None):
+        """Записи, содержащие все слова запроса, по убыванию релевантности.
+
+        Args:
+            query: строка поиска
+            limit: сколько результатов вернуть
+            record_type: Product или Service, чтобы искать только по ним
+        """
+        started = time.perf_counter()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        # Начинаем с самого редкого слова: дальше проверяются только уже найденные записи
+        expansions = sorted(
+            (self._expand(token) for token in tokens),
+            key=lambda matches: sum(len(postings) for postings, _ in matches)
+        )
+
+        if len(expansions[0]) == 1 and expansions[0][0][1] == 1.0:
+            # Частый случай - одно точное совпадение термина: копирование словаря идет на уровне C
+            scores = dict(expansions[0][0][0])
+        else:
+            scores = {}
+            for postings, factor in expansions[0]:
+                for key, weight in postings.items():
+                    score = weight * factor
+                    if scores.get(key, 0) < score:
+                        scores[key] = score
+
+        for matches in expansions[1:]:
+            narrowed = {}
+            for key, score in scores.items():
+                best = 0
+                for postings, factor in matches:
+                    weight = postings.get(key)
+                    if weight is not None and weight * factor > best:
+                        best = weight * factor
+                if best:
+                    narrowed[key] = score + best
+            scores = narrowed
+            if not scores:
+                break
+
+        if record_type is None:
+            matched = scores
+        else:
+            matched = {key: score for key, score in scores.items() if key[0] == record_type.__name__}
+        results = [self._docs[key] for key, _ in heapq.nlargest(limit, matched.items(), key=itemgetter(1))]
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["queries"] += 1
+        self.stats["query_ms_total"] += elapsed
+        logger.debug(f"Поиск \"{query}\": найдено {len(matched)} за {elapsed:.2f} мс")
+        return results
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        stats["documents"] = len(self._docs)
+        stats["terms"] = len(self._postings)
+        stats["version"] = self.version
+        queries = stats.pop("query_ms_total")
+        stats["avg_query_ms"] = round(queries / stats["queries"], 3) if stats["queries"] else 0.0
+        return stats
+
+
+search_index = SearchIndex()
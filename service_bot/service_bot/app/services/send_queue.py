@@ -0,0 +1,283 @@
+"""Очередь исходящих сообщений в Telegram, общая для всех ботов.
+
+Подключается к сессии каждого бота как middleware запросов (bot.session.middleware(send_queue)),
+поэтому обработчики по-прежнему вызывают message.answer / edit_text напрямую. Отправка и
+редактирование сообщений ждут своей очереди с учетом лимитов Telegram:
+    - на бота - SEND_GLOBAL_RATE сообщений в секунду;
+    - на чат - SEND_CHAT_RATE в секунду с запасом SEND_CHAT_BURST (в группах - SEND_GROUP_RATE);
+      редактирование в личном чате (листание каталога, карточка товара) этот лимит не расходует.
+Ответы пользователям уходят раньше массовых рассылок (их отправляют внутри send_queue.bulk()).
+Если Telegram все же ответил 429, чат ставится на паузу на retry_after секунд, а сообщение
+возвращается в очередь (не больше SEND_MAX_RETRIES раз).
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aiogram.exceptions import TelegramRetryAfter
+from loguru import logger
+
+from app.config.config import (
+    SEND_CHAT_BURST, SEND_CHAT_RATE, SEND_GLOBAL_RATE, SEND_GROUP_RATE, SEND_MAX_RETRIES,
+)
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Методы, на которые распространяются лимиты Telegram на сообщения
+LIMITED_PREFIXES = ("send", "edit", "copy", "forward")
+UNLIMITED_METHODS = frozenset(("sendChatAction",))
+# Редактирование сообщений в личном чате - ответ на нажатие кнопки, а не новое сообщение:
+# для него действует только лимит бота (и пауза чата после 429), иначе навигация по каталогу
+# из двух правок на нажатие упирается в 1 сообщение в секунду
+CHAT_EXEMPT_PREFIXES = ("edit",)
+# Сколько последних отправок учитывать в перцентилях задержки
+LATENCY_WINDOW = 1000
+# Раз в сколько секунд забывать чаты, которым давно ничего не отправляли
+PRUNE_INTERVAL = 60
+
+_priority = ContextVar("send_priority", default=INTERACTIVE)
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity про запас; paused_until - пауза после 429"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause_left(self, now):
+        """Сколько секунд еще длится пауза после 429"""
+        return max(0.0, self.paused_until - now)
+
+    def delay(self, now):
+        """Через сколько секунд появится токен (0 - есть сейчас)"""
+        self._refill(now)
+        pause = self.pause_left(now)
+        if self.tokens >= 1:
+            return pause
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def take(self):
+
+        self.tokens -= 1
+
+    def pause(self, seconds, now):
+
+        self.paused_until = max(self.paused_until, now + seconds)
+
+    def idle(self, now):
+        """Полон и не на паузе - можно забыть"""
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class SendQueue:
+    """Middleware запросов aiogram; один экземпляр подключается к сессиям всех ботов.
+    SEND_GLOBAL_RATE <= 0 - без ограничения"""
+
+    def __init__(self, global_rate=SEND_GLOBAL_RATE, chat_rate=SEND_CHAT_RATE, chat_burst=SEND_CHAT_BURST,
+                 group_rate=SEND_GROUP_RATE, max_retries=SEND_MAX_RETRIES):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = {}
+        self._chats = {}
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self._scheduler = None
+        self._pruned_at = time.monotonic()
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self._latencies = {priority: deque(maxlen=LATENCY_WINDOW) for priority in PRIORITY_NAMES}
+        self.stats = {
+            priority: {"sent": 0, "queued": 0, "retry_after": 0, "failed": 0, "max_depth": 0}
+            for priority in PRIORITY_NAMES
+        }
+
+    @property
+    def enabled(self):
+        return self.global_rate > 0
+
+    @contextmanager
+    def bulk(self):
+        """Сообщения, отправленные внутри блока, уступают очередь ответам пользователям"""
+        token = _priority.set(BULK)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    @staticmethod
+    def is_limited(method):
+
+        name = method.__api_method__
+        return (name.startswith(LIMITED_PREFIXES) and name not in UNLIMITED_METHODS
+                and getattr(method, "chat_id", None) is not None)
+
+    @staticmethod
+    def uses_chat_limit(method):
+        """Расходует ли сообщение лимит чата (правки в личных чатах - нет)"""
+        chat_id = method.chat_id
+        is_private = isinstance(chat_id, int) and chat_id > 0
+        return not (is_private and method.__api_method__.startswith(CHAT_EXEMPT_PREFIXES))
+
+    async def __call__(self, make_request, bot, method):
+
+        if not self.enabled or not self.is_limited(method):
+            return await make_request(bot, method)
+
+        priority = _priority.get()
+        stats = self.stats[priority]
+        started = time.monotonic()
+        chat_limit = self.uses_chat_limit(method)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(bot.id, method.chat_id, priority, chat_limit)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                stats["retry_after"] += 1
+                self._chat_bucket(bot.id, method.chat_id).pause(e.retry_after, time.monotonic())
+                logger.warning(f"Telegram: лимит для чата {method.chat_id}, пауза {e.retry_after} с "
+                               f"(попытка {attempt + 1}/{self.max_retries + 1})")
+                if attempt == self.max_retries:
+                    stats["failed"] += 1
+                    raise
+                continue
+            stats["sent"] += 1
+            self._latencies[priority].append((time.monotonic() - started) * 1000)
+            return response
+
+    def _global_bucket(self, bot_id):
+
+        bucket = self._global.get(bot_id)
+        if bucket is None:
+            bucket = self._global[bot_id] = TokenBucket(self.global_rate, self.global_rate)
+        return bucket
+
+    def _chat_bucket(self, bot_id, chat_id):
+
+        key = (bot_id, chat_id)
+        bucket = self._chats.get(key)
+        if bucket is None:
+            # Отрицательный chat_id (или @username) - группа или канал: лимит в минуту, а не в секунду
+            is_group = not isinstance(chat_id, int) or chat_id < 0
+            bucket = self._chats[key] = (TokenBucket(self.group_rate, self.chat_burst) if is_group
+                                         else TokenBucket(self.chat_rate, self.chat_burst))
+        return bucket
+
+    @staticmethod
+    def _wait_time(now, global_bucket, chat_bucket, chat_limit):
+
+        chat_wait = chat_bucket.delay(now) if chat_limit else chat_bucket.pause_left(now)
+        return max(global_bucket.delay(now), chat_wait)
+
+    @staticmethod
+    def _take(global_bucket, chat_bucket, chat_limit):
+
+        global_bucket.take()
+        if chat_limit:
+            chat_bucket.take()
+
+    async def _acquire(self, bot_id, chat_id, priority, chat_limit=True):
+
+        now = time.monotonic()
+        if not self._waiters and now - self._pruned_at > PRUNE_INTERVAL:
+            self._prune(now)
+        global_bucket, chat_bucket = self._global_bucket(bot_id), self._chat_bucket(bot_id, chat_id)
+        if not self._waiters and self._wait_time(now, global_bucket, chat_bucket, chat_limit) == 0:
+            self._take(global_bucket, chat_bucket, chat_limit)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters,
+                       (priority, next(self._sequence), future, global_bucket, chat_bucket, chat_limit))
+        stats = self.stats[priority]
+        stats["queued"] += 1
+        self._depth[priority] += 1
+        stats["max_depth"] = max(stats["max_depth"], self._depth[priority])
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Токены уже выданы этому сообщению - пусть пропадут, лимит от этого не нарушится
+            future.cancel()
+            raise
+
+    def _wake(self):
+
+        if self._scheduler is None or self._scheduler.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler = asyncio.create_task(self._schedule())
+        self._wakeup.set()
+
+    async def _schedule(self):
+        """Выдает токены ожидающим по приоритету; сообщение в чат на паузе не задерживает остальные чаты"""
+        while self._waiters:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_at = None
+            blocked = []
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                priority, _, future, global_bucket, chat_bucket, chat_limit = waiter
+                if future.done():
+                    self._depth[priority] -= 1
+                    continue
+                wait = self._wait_time(now, global_bucket, chat_bucket, chat_limit)
+                if wait == 0:
+                    self._take(global_bucket, chat_bucket, chat_limit)
+                    future.set_result(None)
+                    self._depth[priority] -= 1
+                else:
+                    blocked.append(waiter)
+                    next_at = wait if next_at is None else min(next_at, wait)
+            for waiter in blocked:
+                heapq.heappush(self._waiters, waiter)
+            if next_at is None:
+                break
+            try:
+                # Раньше срока будит новое сообщение: оно может оказаться важнее ожидающих
+                await asyncio.wait_for(self._wakeup.wait(), next_at)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune(self, now):
+        """Забывает чаты, у которых лимит полностью восстановился (только при пустой очереди)"""
+        self._pruned_at = now
+        self._chats = {key: bucket for key, bucket in self._chats.items() if not bucket.idle(now)}
+
+    def depth(self, priority=None):
+        """Сколько сообщений ждут отправки (отмененные учитываются до ближайшего прохода планировщика)"""
+        return self._depth[priority] if priority is not None else sum(self._depth.values())
+
+    def get_stats(self):
+
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            latencies = sorted(self._latencies[priority])
+            classes[name] = {
+                **self.stats[priority],
+                "depth": self.depth(priority),
+                "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else 0.0,
+                "p95_ms": round(latencies[int(len(latencies) * 0.95)], 1) if latencies else 0.0,
+            }
+        return {"depth": self.depth(), "chats": len(self._chats), "classes": classes}
+
+
+send_queue = SendQueue()
@@ -0,0 +1,148 @@
+"""Снимок каталога на диске: быстрый старт бота и работа с последними данными, пока 1С недоступна.
+
+Записи хранятся кортежами значений полей (без имен полей в каждой записи) в формате marshal:
+он есть в стандартной библиотеке, читается за миллисекунды и не исполняет код при загрузке.
+Время, когда 1С последний раз подтвердила данные, - время изменения файла: если каталог
+не изменился, снимок не переписывается, а только получает новое время (touch).
+"""
+import marshal
+import os
+import time
+from dataclasses import fields
+from operator import attrgetter
+
+from loguru import logger
+
+from app.config.config import CATALOG_SNAPSHOT_PATH
+from app.services.catalog_index import CatalogIndex
+from app.services.models import Category, Product, Service
+
+MAGIC = b"CATSNAP1"
+RECORD_FIELDS = {
+    record_type: tuple(field.name for field in fields(record_type))
+    for record_type in (Category, Product, Service)
+}
+
+
+def _rows(records, record_type):
+
+    getter = attrgetter(*RECORD_FIELDS[record_type])
+    return [getter(record) for record in records]
+
+
+def _records(rows, record_type):
+
+    return [record_type(*row) for row in rows]
+
+
+class CatalogSnapshot:
+
+    def __init__(self, path):
+        self.path = path
+        self.saved_at = None
+        self.order_statuses = None
+        self.products_version = None
+        self.stats = {"saves": 0, "save_ms": 0.0, "size_kb": 0.0, "load_ms": 0.0}
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    @property
+    def age(self):
+        """Возраст данных снимка в секундах; None, если снимка нет"""
+        return time.time() - self.saved_at if self.saved_at is not None else None
+
+    def save(self, index, order_statuses=None, products_version=None):
+        """Записывает снимок атомарно: сначала во временный файл, затем переименование"""
+        if not self.enabled:
+            return
+
+        started = time.perf_counter()
+        if order_statuses is not None:
+            self.order_statuses = order_statuses
+        payload = {
+            "saved_at": index.built_at,
+            "fields": {record_type.__name__: names for record_type, names in RECORD_FIELDS.items()},
+            "categories": _rows(index.categories, Category),
+            "products": _rows(index.products, Product),
+            "services": _rows(index.services, Service),
+            "order_statuses": self.order_statuses,
+            "products_version": products_version,
+        }
+        data = MAGIC + marshal.dumps(payload)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, self.path)
+        os.utime(self.path, (index.built_at, index.built_at))
+
+        self.saved_at = index.built_at
+        self.products_version = products_version
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["saves"] += 1
+        self.stats["save_ms"] = round(elapsed, 1)
+        self.stats["size_kb"] = round(len(data) / 1024, 1)
+        logger.info(f"Снимок каталога сохранен в {self.path}: {len(data) / 1024:.0f} КБ за {elapsed:.0f} мс")
+
+    def touch(self, index):
+        """Каталог в 1С не изменился: обновляет только время подтверждения данных, не переписывая файл"""
+        if not self.enabled or self.saved_at is None:
+            return False
+        try:
+            os.utime(self.path, (index.built_at, index.built_at))
+        except OSError:
+            return False
+        self.saved_at = index.built_at
+        return True
+
+    def load(self):
+        """Читает снимок с диска. Returns: CatalogIndex или None, если снимка нет или он не подходит"""
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+
+        started = time.perf_counter()
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+                confirmed_at = os.fstat(file.fileno()).st_mtime
+            if not data.startswith(MAGIC):
+                raise ValueError("неизвестный формат файла")
+            payload = marshal.loads(data[len(MAGIC):])
+
+            expected = {record_type.__name__: names for record_type, names in RECORD_FIELDS.items()}
+            if payload.get("fields") != expected:
+                raise ValueError("снимок сохранен другой версией бота")
+
+            index = CatalogIndex(
+                _records(payload["categories"], Category),
+                _records(payload["products"], Product),
+                _records(payload["services"], Service),
+                built_at=max(payload["saved_at"], confirmed_at),
+            )
+        except (OSError, ValueError, EOFError, TypeError, KeyError) as e:
+            logger.warning(f"Снимок каталога {self.path} не загружен: {e}")
+            return None
+
+        self.saved_at = index.built_at
+        self.order_statuses = payload.get("order_statuses")
+        self.products_version = payload.get("products_version")
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["load_ms"] = round(elapsed, 1)
+        logger.info(f"Загружен снимок каталога {self.path} за {elapsed:.0f} мс, возраст {self.age / 60:.0f} мин: "
+                    f"{index.get_stats()}")
+        return index
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        stats["path"] = self.path
+        stats["age"] = round(self.age) if self.saved_at is not None else None
+        return stats
+
+
+catalog_snapshot = CatalogSnapshot(CATALOG_SNAPSHOT_PATH)
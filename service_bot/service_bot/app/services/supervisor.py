@@ -0,0 +1,182 @@
+"""Супервизор ботов: перезапуск упавшего бота с экспоненциальной паузой, счетчики перезапусков
+и время работы, штатная остановка по сигналу и локальный HTTP-отчет о состоянии (/health).
+"""
+import asyncio
+import time
+
+from aiohttp import web
+from loguru import logger
+
+from app.config.config import (
+    SUPERVISOR_BACKOFF_BASE, SUPERVISOR_BACKOFF_MAX, SUPERVISOR_STABLE_UPTIME,
+)
+
+
+class BotState:
+    """Состояние одного бота под наблюдением супервизора"""
+
+    STARTING = "starting"
+    RUNNING = "running"
+    BACKOFF = "backoff"
+    STOPPED = "stopped"
+
+    def __init__(self, name, title):
+        self.name = name
+        self.title = title
+        self.state = self.STARTING
+        self.pid = None
+        self.restarts = 0
+        self.started_at = None
+        self.restart_at = None
+        self.last_exit = None
+        self.updates = 0
+        self.last_update_at = None
+        self.last_update_ms = None
+
+    @property
+    def uptime(self):
+        if self.state != self.RUNNING or self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def mark_running(self, pid=None):
+
+        self.state = self.RUNNING
+        self.pid = pid
+        self.started_at = time.monotonic()
+        self.restart_at = None
+
+    def mark_update(self, elapsed):
+        """Обработано обновление Telegram; elapsed - время обработки в секундах"""
+        self.updates += 1
+        self.last_update_at = time.time()
+        self.last_update_ms = round(elapsed * 1000, 1)
+
+    def to_dict(self):
+
+        now = time.time()
+        return {
+            "name": self.name,
+            "title": self.title,
+            "state": self.state,
+            "pid": self.pid,
+            "uptime": round(self.uptime),
+            "restarts": self.restarts,
+            "restart_in": round(max(0.0, self.restart_at - time.monotonic()), 1) if self.restart_at else None,
+            "last_exit": self.last_exit,
+            "updates": self.updates,
+            "last_update_ago": round(now - self.last_update_at, 1) if self.last_update_at else None,
+            "last_update_ms": self.last_update_ms,
+        }
+
+
+def update_timer(state):
+    """Внешний middleware диспетчера: время обработки последнего обновления для /health"""
+
+    async def middleware(handler, event, data):
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            state.mark_update(time.perf_counter() - started)
+
+    return middleware
+
+
+class Supervisor:
+    """Держит ботов запущенными, пока не получен сигнал остановки.
+
+    Запуск бота - корутинная функция run_once(state, stopping): она работает, пока работает бот,
+    при установке события stopping сама штатно останавливает его и может вернуть описание
+    завершения (например, код выхода процесса). Любое завершение без сигнала остановки
+    считается падением: бот перезапускается через base * 2^n секунд (не больше max_delay);
+    после stable_uptime секунд работы счетчик падений сбрасывается.
+    """
+
+    def __init__(self, base_delay=SUPERVISOR_BACKOFF_BASE, max_delay=SUPERVISOR_BACKOFF_MAX,
+                 stable_uptime=SUPERVISOR_STABLE_UPTIME):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_uptime = stable_uptime
+        self.bots = {}
+        self.stopping = asyncio.Event()
+        self.stop_signal = None
+        self.started_at = time.monotonic()
+        # Дополнительные разделы отчета /health: имя -> функция без аргументов
+        self.reports = {}
+
+    def add(self, name, title):
+
+        state = BotState(name, title)
+        self.bots[name] = state
+        return state
+
+    def stop(self, sig=None):
+        """Останавливает всех ботов; sig - полученный сигнал, который передается дочерним процессам"""
+        if not self.stopping.is_set():
+            logger.info("Получен сигнал завершения. Останавливаем ботов...")
+            self.stop_signal = sig
+            self.stopping.set()
+
+    def restart_delay(self, failures):
+
+        return min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+
+    async def supervise(self, state, run_once):
+        """Запускает бота и перезапускает его после падения, пока не получен сигнал остановки"""
+        failures = 0
+        while not self.stopping.is_set():
+            state.state = BotState.STARTING
+            try:
+                result = await run_once(state, self.stopping)
+                state.last_exit = result or ("остановлен" if self.stopping.is_set() else "завершился без сигнала остановки")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state.last_exit = repr(e)
+
+            if self.stopping.is_set():
+                break
+
+            failures = 1 if state.uptime >= self.stable_uptime else failures + 1
+            delay = self.restart_delay(failures)
+            state.state = BotState.BACKOFF
+            state.pid = None
+            state.restart_at = time.monotonic() + delay
+            logger.error(f"{state.title} упал ({state.last_exit}), перезапуск через {delay:.1f} с "
+                         f"(падений подряд: {failures})")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                state.restarts += 1
+
+        state.state = BotState.STOPPED
+        state.pid = None
+        logger.info(f"{state.title} остановлен")
+
+    def get_health(self):
+
+        bots = [state.to_dict() for state in self.bots.values()]
+        healthy = all(state.state == BotState.RUNNING for state in self.bots.values())
+        return {
+            "status": "ok" if healthy else "degraded",
+            "uptime": round(time.monotonic() - self.started_at),
+            "bots": bots,
+            **{name: report() for name, report in self.reports.items()},
+        }
+
+    async def start_health_server(self, host, port):
+        """HTTP-отчет о состоянии ботов: GET /health, 200 - все боты работают, 503 - нет.
+        Returns: AppRunner для остановки"""
+
+        async def health(request):
+            report = self.get_health()
+            return web.json_response(report, status=200 if report["status"] == "ok" else 503)
+
+        app = web.Application()
+        app.router.add_get("/health", health)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Состояние ботов: http://{host}:{port}/health")
+        return runner
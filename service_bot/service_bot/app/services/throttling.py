@@ -0,0 +1,116 @@
+"""Защита 1С от частых нажатий inline-кнопок.
+
+Каждое нажатие кнопки карточки товара или стрелки пагинации - это запрос к 1С. Middleware
+пропускает нажатие к обработчику, только если:
+    - та же кнопка этого пользователя сейчас не обрабатывается (иначе нажатие сливается
+      с обрабатываемым);
+    - это не повтор только что обработанной кнопки (двойное нажатие по старой клавиатуре);
+    - у пользователя не исчерпан лимит нажатий (THROTTLE_RATE в секунду, запас THROTTLE_BURST).
+На отсеянные нажатия Telegram сразу получает ответ, чтобы у кнопки не висели "часики".
+"""
+import re
+import time
+from collections import Counter
+
+from aiogram.exceptions import TelegramAPIError
+from loguru import logger
+
+from app.config.config import THROTTLE_BURST, THROTTLE_RATE, THROTTLE_REPEAT_INTERVAL
+
+LIMITED_TEXT = "Слишком много нажатий, подождите секунду"
+# Раз в сколько секунд забывать пользователей, которые давно ничего не нажимали
+PRUNE_INTERVAL = 60
+
+# Действие кнопки без кода записи или номера страницы: product_00-123 -> product
+ACTION_SUFFIX = re.compile(r"_[^_]*\d[^_]*$")
+
+
+def callback_action(data):
+
+    return ACTION_SUFFIX.sub("", data or "")
+
+
+class CallbackThrottle:
+    """Внешний middleware для dp.callback_query; один экземпляр можно подключить к нескольким ботам"""
+
+    def __init__(self, rate=THROTTLE_RATE, burst=THROTTLE_BURST, repeat_interval=THROTTLE_REPEAT_INTERVAL):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.repeat_interval = repeat_interval
+        # (бот, пользователь, кнопка) - нажатия, которые сейчас обрабатываются
+        self._in_flight = set()
+        # (бот, пользователь) -> (последняя обработанная кнопка, когда обработка закончилась)
+        self._last = {}
+        # (бот, пользователь) -> (запас нажатий, время пересчета)
+        self._buckets = {}
+        self._pruned_at = time.monotonic()
+        self.stats = {"passed": 0, "merged": 0, "dropped": 0, "limited": 0}
+        self.filtered_actions = Counter()
+
+    async def __call__(self, handler, event, data):
+
+        bot = data.get("bot")
+        user = (bot.id if bot is not None else None, event.from_user.id)
+        key = (*user, event.data)
+        now = time.monotonic()
+        self._prune(now)
+
+        if key in self._in_flight:
+            return await self._filter(event, "merged")
+        last = self._last.get(user)
+        if last is not None and last[0] == event.data and now - last[1] < self.repeat_interval:
+            return await self._filter(event, "dropped")
+        if not self._take(user, now):
+            return await self._filter(event, "limited", LIMITED_TEXT)
+
+        self.stats["passed"] += 1
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+            self._last[user] = (event.data, time.monotonic())
+
+    def _take(self, user, now):
+        """Забирает одно нажатие из запаса пользователя; запас пополняется на rate в секунду"""
+        if self.rate <= 0:
+            return True
+        tokens, updated = self._buckets.get(user, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[user] = (tokens, now)
+            return False
+        self._buckets[user] = (tokens - 1, now)
+        return True
+
+    async def _filter(self, event, reason, text=None):
+
+        self.stats[reason] += 1
+        self.filtered_actions[callback_action(event.data)] += 1
+        logger.debug(f"Нажатие {event.data} пользователя {event.from_user.id} отсеяно: {reason}")
+        try:
+            await event.answer(text)
+        except TelegramAPIError as e:
+            logger.debug(f"Не удалось ответить на нажатие {event.data}: {e}")
+
+    def _prune(self, now):
+
+        if now - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        self._last = {user: last for user, last in self._last.items() if now - last[1] < self.repeat_interval}
+        if self.rate > 0:
+            refill = self.burst / self.rate
+            self._buckets = {user: bucket for user, bucket in self._buckets.items() if now - bucket[1] < refill}
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        total = sum(stats.values())
+        stats["filtered_rate"] = round((total - stats["passed"]) / total, 3) if total else 0.0
+        stats["in_flight"] = len(self._in_flight)
+        stats["top_actions"] = dict(self.filtered_actions.most_common(5))
+        return stats
+
+
+callback_throttle = CallbackThrottle()
@@ -0,0 +1,302 @@
+import re
+from functools import lru_cache
+from loguru import logger
+
+from app.services.models import Category, Product, Service
+
+
+def unwrap_ref(value):
+    """Ссылки 1С приходят как {"id": "..."} - оставляем только идентификатор"""
+    if isinstance(value, dict) and "id" in value:
+        return value["id"]
+    return value
+
+
+def compile_mapper(name, fields, factory=dict):
+    """Собирает функцию, превращающую запись 1С в запись бота за один вызов.
+
+    Args:
+        name: имя функции (для трассировок)
+        fields: кортежи (поле записи, поле 1С или кортеж полей по приоритету,
+            значение по умолчанию[, функция-преобразователь])
+        factory: класс записи; вызывается с именованными аргументами
+    """
+    namespace = {"factory": factory}
+    parts = []
+    for index, (target, sources, default, *converter) in enumerate(fields):
+        if isinstance(sources, str):
+            sources = (sources,)
+
+        expression = repr(default)
+        for source in reversed(sources):
+            expression = f"get({source!r}, {expression})"
+
+        if converter:
+            namespace[f"convert_{index}"] = converter[0]
+            expression = f"convert_{index}({expression})"
+
+        parts.append(f"{target}={expression}")
+
+    source_code = f"def {name}(item):\n    get = item.get\n    return factory({', '.join(parts)})\n"
+    exec(compile(source_code, f"<mapper {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+PRODUCT_FIELDS = (
+    ("id", ("Идентификатор", "Код"), "", unwrap_ref),
+    ("code", "Код", ""),
+    ("name", "Наименование", "Товар"),
+    ("price", "Цена", "По запросу"),
+    ("description", "Описание", ""),
+    ("stock", "КоличествоНаСкладе", 0),
+    ("category", "Категория", "", unwrap_ref),
+    ("category_name", "КатегорияНаименование", ""),
+    ("in_stock", "ВНаличии", False),
+    ("min_stock", "МинимальныйЗапас", 0),
+    ("supplier", "ПоставщикНаименование", ""),
+)
+
+PRODUCT_DETAIL_FIELDS = (
+    ("id", ("Идентификатор", "Код"), "", unwrap_ref),
+    ("code", "Код", ""),
+    ("name", "Наименование", "Без названия"),
+    ("price", "Цена", 0),
+    ("description", "Описание", "Описание отсутствует"),
+    ("stock", "КоличествоНаСкладе", 0),
+    ("category", "Категория", "", unwrap_ref),
+    ("category_name", "КатегорияНаименование", ""),
+    ("in_stock", "ВНаличии", False),
+    ("min_stock", "МинимальныйЗапас", 0),
+    ("supplier", "ПоставщикНаименование", ""),
+)
+
+CATEGORY_FIELDS = (
+    ("id", ("Идентификатор", "Код"), "", unwrap_ref),
+    ("code", "Код", ""),
+    ("name", "Наименование", "Категория"),
+    ("description", "Описание", ""),
+)
+
+CATEGORY_HEADER_FIELDS = (
+    ("id", "id", ""),
+    ("code", "id", ""),
+    ("name", "name", "Категория"),
+    ("description", "description", ""),
+)
+
+SERVICE_FIELDS = (
+    ("id", ("Идентификатор", "Код"), "", unwrap_ref),
+    ("code", "Код", ""),
+    ("name", "Наименование", "Услуга"),
+    ("price", "Цена", "По запросу"),
+    ("description", "Описание", ""),
+    ("duration", "Длительность", 0),
+    ("category", "Категория", "", unwrap_ref),
+    ("category_name", "КатегорияНаименование", ""),
+)
+
+# Словари, уже приведенные к полям бота (или смешанные), для клавиатур и форматирования
+PRODUCT_ANY_FIELDS = (
+    ("id", ("id", "Идентификатор"), "", unwrap_ref),
+    ("code", ("code", "Код"), ""),
+    ("name", ("name", "Наименование"), "Без названия"),
+    ("price", ("price", "Цена"), 0),
+    ("description", ("description", "Описание"), "Описание отсутствует"),
+    ("stock", ("stock", "КоличествоНаСкладе"), 0),
+    ("category", ("category", "Категория"), "", unwrap_ref),
+    ("category_name", ("category_name", "КатегорияНаименование"), ""),
+    ("in_stock", ("in_stock", "ВНаличии"), False),
+    ("min_stock", ("min_stock", "МинимальныйЗапас"), 0),
+    ("supplier", ("supplier", "ПоставщикНаименование"), ""),
+)
+
+SERVICE_ANY_FIELDS = (
+    ("id", ("id", "Идентификатор"), "", unwrap_ref),
+    ("code", ("code", "Код"), ""),
+    ("name", ("name", "Наименование"), "Без названия"),
+    ("price", ("price", "Цена"), 0),
+    ("description", ("description", "Описание"), "Описание отсутствует"),
+    ("duration", ("execution_time", "duration"), "Нет данных о длительности"),
+    ("category", ("category_id", "category", "Категория"), "", unwrap_ref),
+    ("category_name", ("category_name", "КатегорияНаименование"), ""),
+)
+
+CATEGORY_ANY_FIELDS = (
+    ("id", ("id", "Идентификатор"), "", unwrap_ref),
+    ("code", ("code", "Код"), ""),
+    ("name", ("name", "Наименование"), "Категория"),
+    ("description", ("description", "Описание"), ""),
+)
+
+product_from_1c = compile_mapper("product_from_1c", PRODUCT_FIELDS, Product)
+product_detail_from_1c = compile_mapper("product_detail_from_1c", PRODUCT_DETAIL_FIELDS, Product)
+category_from_1c = compile_mapper("category_from_1c", CATEGORY_FIELDS, Category)
+category_from_header = compile_mapper("category_from_header", CATEGORY_HEADER_FIELDS, Category)
+service_from_1c = compile_mapper("service_from_1c", SERVICE_FIELDS, Service)
+
+_product_from_any = compile_mapper("product_from_any", PRODUCT_ANY_FIELDS, Product)
+_service_from_any = compile_mapper("service_from_any", SERVICE_ANY_FIELDS, Service)
+_category_from_any = compile_mapper("category_from_any", CATEGORY_ANY_FIELDS, Category)
+
+
+def as_product(item):
+    """Запись Product из записи или словаря с полями бота/1С; None для прочих значений"""
+    if isinstance(item, Product):
+        return item
+    if isinstance(item, dict):
+        return _product_from_any(item)
+    return None
+
+
+def as_service(item):
+
+    if isinstance(item, Service):
+        return item
+    if isinstance(item, dict):
+        return _service_from_any(item)
+    return None
+
+
+def as_category(item):
+
+    if isinstance(item, Category):
+        return item
+    if isinstance(item, dict):
+        return _category_from_any(item)
+    return None
+
+
+def map_items(items, builder, factory):
+    """Разбирает список записей 1С за один проход; строка превращается в запись с id = name = code"""
+    return [
+        builder(item) if isinstance(item, dict) else factory(id=item, code=item, name=item)
+        for item in items
+        if isinstance(item, (dict, str))
+    ]
+
+
+def _copy_total(data, result):
+    """Общее число записей ("stats.total") нужно для постраничного вывода, когда 1С отдает одну страницу"""
+    stats = data.get("stats")
+    if isinstance(stats, dict) and isinstance(stats.get("total"), int):
+        result["total"] = stats["total"]
+    # Версия каталога 1С - от нее запрашиваются изменения при следующей синхронизации
+    if isinstance(stats, dict) and isinstance(stats.get("version"), int):
+        result["version"] = stats["version"]
+
+
+def _transform_categories(data, result):
+
+    if isinstance(data, dict) and "categories" in data:
+        _copy_total(data, result)
+        categories = data.get("categories", [])
+        if isinstance(categories, list):
+            result["data"] = map_items(categories, category_from_1c, Category)
+
+
+def _transform_category_detail(data, result):
+
+    if not (isinstance(data, dict) and "category" in data):
+        _transform_categories(data, result)
+        return
+
+    category = data.get("category")
+    products = data.get("products", [])
+    _copy_total(data, result)
+    result["data"] = {
+        "category": category_from_header(category) if isinstance(category, dict) else Category(),
+        "products": map_items(products, product_from_1c, Product) if isinstance(products, list) else []
+    }
+
+
+def _transform_products(data, result):
+
+    if isinstance(data, dict) and "products" in data:
+        _copy_total(data, result)
+        products = data.get("products", [])
+        if isinstance(products, list):
+            result["data"] = map_items(products, product_from_1c, Product)
+
+
+def _transform_changes(data, result):
+    """Изменения товаров с указанной версии: измененные и новые записи, коды удаленных"""
+    if isinstance(data, dict) and "products" in data:
+        _copy_total(data, result)
+        products = data.get("products", [])
+        deleted = data.get("deleted", [])
+        result["data"] = {
+            "products": map_items(products, product_from_1c, Product) if isinstance(products, list) else [],
+            "deleted": [code for code in deleted if isinstance(code, str)] if isinstance(deleted, list) else [],
+        }
+
+
+def _transform_product_detail(data, result):
+
+    if not (isinstance(data, dict) and "product" in data):
+        logger.error(f"В ответе API отсутствует объект product: {data}")
+        return
+
+    product = data.get("product", {})
+    if isinstance(product, dict):
+        result["data"] = product_detail_from_1c(product)
+    else:
+        logger.error(f"Получен некорректный формат продукта: {product}")
+
+
+def _transform_services(data, result):
+
+    if isinstance(data, dict) and "services" in data:
+        _copy_total(data, result)
+        services = data.get("services", [])
+        if isinstance(services, list):
+            result["data"] = map_items(services, service_from_1c, Service)
+
+
+# Порядок важен: более конкретные шаблоны идут раньше общих.
+# Карточку услуги, заказы и ответы авторизации 1С уже отдает в формате,
+# который понимают обработчики, - они проходят без изменений.
+ROUTES = (
+    ("categories", re.compile(r"/api/catalog/categories"), _transform_categories),
+    ("category_detail", re.compile(r"/api/catalog/categories/.+"), _transform_category_detail),
+    ("category_products", re.compile(r"/api/catalog/products/category/.+"), _transform_products),
+    ("products", re.compile(r"/api/catalog/products"), _transform_products),
+    ("changes", re.compile(r"/api/catalog/changes"), _transform_changes),
+    ("product_detail", re.compile(r"/api/catalog/products/.+"), _transform_product_detail),
+    ("services", re.compile(r"/api/catalog/services"), _transform_services),
+    ("service_detail", re.compile(r"/api/catalog/services/.+"), None),
+    ("orders", re.compile(r"/(?:service-)?orders(?:/.*)?"), None),
+    ("auth", re.compile(r"/auth/.+"), None),
+)
+
+
+@lru_cache(maxsize=2048)
+def resolve_route(endpoint):
+    """Находит маршрут для эндпоинта; результат кэшируется, регулярки проверяются один раз"""
+    for name, pattern, handler in ROUTES:
+        if pattern.fullmatch(endpoint):
+            return name, handler
+    return None, None
+
+
+def transform_response(data, endpoint):
+    """Приводит ответ 1С к формату {"status": ..., "data": ...}; записи каталога
+    разбираются сразу в Product/Service/Category"""
+
+    if isinstance(data, dict) and "status" in data:
+        # HTTP-сервис 1С сам заворачивает ответ в {"status": ..., "data": ...}
+        result = data
+        payload = data.get("data")
+    else:
+        result = {"status": 200, "data": data}
+        payload = data
+
+    route_name, handler = resolve_route(endpoint)
+    if handler is not None and payload is not None:
+        handler(payload, result)
+
+    if isinstance(result.get("data"), list):
+        logger.debug(f"Ответ API для {endpoint} обработан маршрутом {route_name}: {len(result['data'])} записей")
+    else:
+        logger.debug(f"Ответ API для {endpoint} обработан маршрутом {route_name}")
+
+    return result
@@ -0,0 +1,146 @@
+"""Прием обновлений Telegram через webhook: один aiohttp-сервер на всех ботов.
+
+Каждый бот получает обновления по своему пути ({WEBHOOK_PATH}/{имя бота}). Запрос проверяется
+по секретному токену (заголовок X-Telegram-Bot-Api-Secret-Token), обновление ставится в
+ограниченную очередь, и Telegram сразу получает ответ 200; обработку ведут WEBHOOK_WORKERS
+обработчиков. Если очередь заполнена, сервер отвечает 503 - Telegram повторит доставку позже.
+"""
+import asyncio
+import hmac
+import secrets
+import time
+
+from aiogram.types import Update
+from aiohttp import web
+from loguru import logger
+
+from app.config.config import (
+    WEBHOOK_MAX_CONNECTIONS, WEBHOOK_PATH, WEBHOOK_QUEUE_SIZE, WEBHOOK_SECRET, WEBHOOK_WORKERS,
+)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+
+    def __init__(self, path=WEBHOOK_PATH, secret=WEBHOOK_SECRET, workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE):
+        self.path = path.rstrip("/")
+        # Без заданного секрета создается случайный: webhook регистрируется заново при каждом запуске
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.bots = {}
+        self._runner = None
+        self._worker_tasks = []
+        self._stopping = None
+        self.stats = {
+            "received": 0,
+            "handled": 0,
+            "errors": 0,
+            "rejected": 0,
+            "queue_full": 0,
+            "handle_ms_total": 0.0,
+        }
+
+    def add_bot(self, name, bot, dp):
+
+        self.bots[name] = (bot, dp)
+
+    def url_for(self, base_url, name):
+
+        return f"{base_url.rstrip('/')}{self.path}/{name}"
+
+    async def register(self, name, base_url, drop_pending_updates=False):
+        """Регистрирует webhook бота в Telegram"""
+        bot, dp = self.bots[name]
+        url = self.url_for(base_url, name)
+        await bot.set_webhook(
+            url=url,
+            secret_token=self.secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=drop_pending_updates,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        logger.info(f"Webhook зарегистрирован: {url}")
+
+    async def handle(self, request):
+
+        entry = self.bots.get(request.match_info["name"])
+        if entry is None:
+            return web.Response(status=404)
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret):
+            self.stats["rejected"] += 1
+            return web.Response(status=401)
+
+        bot, dp = entry
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            self.queue.put_nowait((bot, dp, update))
+        except asyncio.QueueFull:
+            self.stats["queue_full"] += 1
+            return web.Response(status=503)
+        self.stats["received"] += 1
+        return web.Response()
+
+    async def _worker(self):
+
+        while True:
+            bot, dp, update = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                self.stats["handled"] += 1
+                self.stats["handle_ms_total"] += (time.perf_counter() - started) * 1000
+                self.queue.task_done()
+
+    def create_app(self):
+
+        app = web.Application()
+        app.router.add_post(f"{self.path}/{{name}}", self.handle)
+        return app
+
+    async def start(self, host, port):
+        """Запускает сервер и обработчики очереди"""
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Сервер webhook: http://{host}:{port}{self.path}/<бот>, ботов: {len(self.bots)}, "
+                    f"обработчиков: {self.workers}")
+
+    async def stop(self, timeout=10):
+        """Перестает принимать обновления и дорабатывает уже принятые (не дольше timeout секунд).
+        Сервер общий: остановку ждет каждый бот, а выполняется она один раз"""
+        if self._stopping is None:
+            self._stopping = asyncio.create_task(self._stop(timeout))
+        await asyncio.shield(self._stopping)
+
+    async def _stop(self, timeout):
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не обработано обновлений при остановке: {self.queue.qsize()}")
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+        logger.info(f"Сервер webhook остановлен. Статистика: {self.get_stats()}")
+
+    def get_stats(self):
+
+        stats = dict(self.stats)
+        total_ms = stats.pop("handle_ms_total")
+        stats["queue"] = self.queue.qsize()
+        stats["avg_handle_ms"] = round(total_ms / stats["handled"], 1) if stats["handled"] else 0.0
+        return stats
@@ -3,6 +3,8 @@ from datetime import datetime
 from aiogram.types import Message
 from loguru import logger
 
+from app.services.transformers import as_product, as_service
+
 def format_message(message, message_type="info"):
 
     emoji_dict = {
@@ -15,6 +17,30 @@ def format_message(message, message_type="info"):
 
     return f"{emoji} {message}"
 
+# Данные моложе этого возраста (в секундах) показываются без пометки
+STALE_NOTICE_AGE = 60
+
+def format_age(seconds):
+
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} мин."
+    if minutes < 60 * 24:
+        return f"{minutes // 60} ч. {minutes % 60} мин."
+    return f"{minutes // (60 * 24)} дн."
+
+def format_stale_notice(response):
+    """Пометка для ответа, взятого из сохраненного каталога, а не полученного из 1С только что"""
+    age = response.get("stale_age") if isinstance(response, dict) else None
+    if age is None or age < STALE_NOTICE_AGE:
+        return ""
+
+    saved_at = datetime.fromtimestamp(datetime.now().timestamp() - age)
+    return (
+        f"\n\n<i>🕓 Показаны сохраненные данные на {saved_at:%d.%m %H:%M} "
+        f"({format_age(age)} назад), данные обновляются</i>"
+    )
+
 def get_main_menu_text(user_name):
 
     return (
@@ -245,30 +271,25 @@ def format_product_info(product):
     if isinstance(product, dict) and "product" in product:
         product = product["product"]
 
-    name = product.get("name", product.get("Наименование", "Без названия"))
-
-    price_value = product.get("price", product.get("Цена", 0))
-    price = format_price(price_value)
-
-    description = product.get("description", product.get("Описание", "Описание отсутствует"))
+    product = as_product(product)
+    if product is None:
+        return "Информация о товаре недоступна"
 
-    stock = product.get("stock", product.get("КоличествоНаСкладе", 0))
-    category = product.get("category_name", product.get("КатегорияНаименование", ""))
-    supplier = product.get("supplier", product.get("ПоставщикНаименование", ""))
-    in_stock = "В наличии" if product.get("in_stock", product.get("ВНаличии", False)) else "Нет в наличии"
+    price = format_price(product.price)
+    in_stock = "В наличии" if product.in_stock else "Нет в наличии"
 
-    text = f"<b>{name}</b>\n\n"
+    text = f"<b>{product.name}</b>\n\n"
     text += f"<b>Цена:</b> {price}\n"
     text += f"<b>Статус:</b> {in_stock}\n"
-    text += f"<b>Наличие:</b> {stock} шт.\n"
+    text += f"<b>Наличие:</b> {product.stock} шт.\n"
 
-    if category:
-        text += f"<b>Категория:</b> {category}\n"
+    if product.category_name:
+        text += f"<b>Категория:</b> {product.category_name}\n"
 
-    if supplier:
-        text += f"<b>Поставщик:</b> {supplier}\n"
+    if product.supplier:
+        text += f"<b>Поставщик:</b> {product.supplier}\n"
 
-    text += f"\n<b>Описание:</b>\n{description}\n"
+    text += f"\n<b>Описание:</b>\n{product.description}\n"
 
     return text
 
@@ -277,20 +298,22 @@ def format_service_info(service):
     if not service:
         return "Информация об услуге недоступна"
 
-    name = service.get("name", service.get("Наименование", "Без названия"))
-    price = format_price(service.get("price", service.get("Цена", 0)))
-    description = service.get("description", service.get("Описание", "Описание отсутствует"))
+    service = as_service(service)
+    if service is None:
+        return "Информация об услуге недоступна"
+
+    price = format_price(service.price)
 
-    duration = service.get("execution_time", service.get("duration", "Нет данных о длительности"))
+    duration = service.duration
 
     duration_text = "Нет данных о длительности"
     if duration and duration != "Нет данных о длительности":
         duration_text = f"{duration}"
 
-    text = f"<b>{name}</b>\n\n"
+    text = f"<b>{service.name}</b>\n\n"
     text += f"<b>Цена:</b> {price}\n"
     text += f"<b>Длительность:</b> {duration_text} мин.\n\n"
-    text += f"<b>Описание:</b>\n{description}\n"
+    text += f"<b>Описание:</b>\n{service.description}\n"
 
     return text
 
@@ -0,0 +1,35 @@
+import time
+from loguru import logger
+
+class StartupTimeline:
+    """Этапы запуска бота: время от старта процесса до каждого этапа, в лог"""
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.marks = []
+
+    def mark(self, stage):
+
+        elapsed = time.perf_counter() - self.started_at
+        self.marks.append((stage, elapsed))
+        logger.info(f"Запуск: {stage} - {elapsed * 1000:.0f} мс от старта")
+
+    def summary(self):
+
+        return ", ".join(f"{stage} {elapsed * 1000:.0f} мс" for stage, elapsed in self.marks)
+
+    def first_update_middleware(self):
+        """Внешний middleware диспетчера: отмечает обработку первого обновления и итог запуска"""
+        handled = False
+
+        async def middleware(handler, event, data):
+            nonlocal handled
+            try:
+                return await handler(event, data)
+            finally:
+                if not handled:
+                    handled = True
+                    self.mark("первое обновление обработано")
+                    logger.info(f"Хронология запуска: {self.summary()}")
+
+        return middleware
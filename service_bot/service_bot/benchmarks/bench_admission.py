@@ -0,0 +1,103 @@
+"""Очередь запросов к 1С с приоритетами: изменения статусов от сотрудников во время всплеска
+просмотров каталога у клиентов.
+
+Тестовый сервер имитирует HTTP-сервис 1С: SESSIONS сеансов параллельно, каждый запрос -
+LATENCY_MS. Клиенты одновременно открывают SPIKE разных карточек товаров, в это же время
+сотрудники меняют статусы заказов (WRITES запросов с интервалом WRITE_INTERVAL_MS).
+
+Для бота без ограничения и с ограничением в API_MAX_CONCURRENCY запросов:
+    - задержка изменения статуса (медиана и p95) и сколько изменений не прошло;
+    - сколько карточек получено из 1С, из каталога в памяти (1С не дождались) и с ошибкой;
+    - сколько длился всплеск и наибольшая очередь на стороне 1С.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_admission
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from loguru import logger
+
+from app.config.config import API_MAX_CONCURRENCY, API_QUEUE_MAX_WAIT
+from app.services.admission import AdmissionController
+from app.services.api_service import ApiService
+from app.services.mock_server import MockCatalog, start_mock_server
+
+PRODUCTS = 2000
+SPIKE = 600
+WRITES = 20
+WRITE_INTERVAL_MS = 100
+SESSIONS = 4
+LATENCY_MS = 50
+PORT = 8803
+
+
+async def run_mode(limit, catalog):
+
+    runner = await start_mock_server(port=PORT, catalog=catalog, sessions=SESSIONS, latency=LATENCY_MS / 1000)
+    sessions_stats = runner.app["sessions"]
+    service = ApiService()
+    service.base_url = f"http://127.0.0.1:{PORT}/test/hs"
+    service.admission = AdmissionController(limit, API_QUEUE_MAX_WAIT)
+    # Каталог в памяти уже загружен - им бот отвечает, если 1С не успевает
+    assert await service.refresh_catalog_index() is not None
+    sessions_stats["max_queue"] = 0
+
+    async def view(code):
+        response = await service.get_product_by_id(code)
+        if response.get("status") != 200:
+            return "ошибка"
+        return "каталог" if "stale_age" in response else "1С"
+
+    async def write(number):
+        await asyncio.sleep(number * WRITE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        response = await service.update_order_status(f"ORD-{number}", "ready")
+        return (time.perf_counter() - started) * 1000, response.get("status") == 200
+
+    codes = [product["Код"] for product in catalog.products[:SPIKE]]
+    started = time.perf_counter()
+    views, writes = await asyncio.gather(
+        asyncio.gather(*(view(code) for code in codes)),
+        asyncio.gather(*(write(number) for number in range(WRITES))),
+    )
+    elapsed = time.perf_counter() - started
+
+    await service.close()
+    await runner.cleanup()
+    timings = sorted(elapsed_ms for elapsed_ms, _ in writes)
+    failed = sum(not ok for _, ok in writes)
+    sources = {source: views.count(source) for source in ("1С", "каталог", "ошибка")}
+    return (statistics.median(timings), timings[int(len(timings) * 0.95)], failed, sources, elapsed,
+            sessions_stats["max_queue"])
+
+
+async def run():
+
+    catalog = MockCatalog(products=PRODUCTS)
+    print(f"1С: {SESSIONS} сеанса по {LATENCY_MS} мс; всплеск: {SPIKE} карточек товаров, "
+          f"изменений статуса: {WRITES} каждые {WRITE_INTERVAL_MS} мс; ожидание каталога: "
+          f"{API_QUEUE_MAX_WAIT['catalog']} с")
+    print(f"{'лимит':>5} | {'статус p50, мс':>14} | {'p95, мс':>7} | {'не прошло':>9} | {'из 1С':>5} | {'из памяти':>9} | "
+          f"{'ошибок':>6} | {'всплеск, с':>10} | {'очередь 1С':>10}")
+    for limit in (0, API_MAX_CONCURRENCY):
+        p50, p95, failed, sources, elapsed, max_queue = await run_mode(limit, catalog)
+        print(f"{limit or 'нет':>5} | {p50:>14.0f} | {p95:>7.0f} | {failed:>9} | {sources['1С']:>5} | {sources['каталог']:>9} | "
+              f"{sources['ошибка']:>6} | {elapsed:>10.1f} | {max_queue:>10}", flush=True)
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="CRITICAL")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Три бота в одном процессе против трех отдельных процессов: память (RSS) и время запуска.
+
+Каждый режим запускается в дочерних процессах так же, как start_all_bots.py: импорт бота,
+создание Bot и Dispatcher, api_service.startup() и загрузка индекса каталога с тестового
+сервера 1С. Готовым процесс считается, когда индекс каталога загружен; polling Telegram
+не запускается (токены ненастоящие), поэтому время - до готовности обрабатывать обновления.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_bot_runner
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from aiohttp import web
+from loguru import logger
+
+from app.services.mock_server import MockCatalog, create_app
+from start_all_bots import BOTS, format_rss, get_rss
+
+PRODUCTS = 20_000
+PORT = 8798
+READY = "READY"
+FAKE_TOKEN = "123456789:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+
+
+async def child(module_names):
+    """Дочерний процесс: боты из module_names в одном цикле событий с общим api_service"""
+    import importlib
+
+    from aiogram import Bot
+    from aiogram.enums import ParseMode
+    from app.services.api_service import api_service
+    from app.services.catalog_index import EMPTY_INDEX
+    from app.services.catalog_store import catalog_store
+
+    dispatchers = []
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        dispatchers.append((Bot(token=FAKE_TOKEN, parse_mode=ParseMode.HTML), module.create_dispatcher()))
+
+    await api_service.startup()
+    while catalog_store.index is EMPTY_INDEX:
+        await asyncio.sleep(0.01)
+
+    print(READY, flush=True)
+    await asyncio.Event().wait()
+
+
+async def start(module_names):
+
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.bench_bot_runner", "--child", *module_names,
+        stdout=asyncio.subprocess.PIPE,
+    )
+
+
+async def wait_ready(process, started):
+
+    line = await process.stdout.readline()
+    assert line.decode().strip() == READY, line
+    return time.perf_counter() - started
+
+
+async def measure(groups, requests):
+    """groups - модули ботов по процессам; время до готовности последнего процесса и суммарный RSS"""
+    requests.clear()
+    started = time.perf_counter()
+    processes = [await start(group) for group in groups]
+    elapsed = max(await asyncio.gather(*(wait_ready(process, started) for process in processes)))
+    rss = [get_rss(process.pid) for process in processes]
+
+    for process in processes:
+        process.terminate()
+        await process.wait()
+    total_rss = sum(rss) if None not in rss else None
+    return elapsed, total_rss, sum(requests.values())
+
+
+async def run():
+
+    requests = {}
+
+    async def count_request(request, response):
+        requests[request.path] = requests.get(request.path, 0) + 1
+
+    app = create_app(MockCatalog(products=PRODUCTS))
+    app.on_response_prepare.append(count_request)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    # Снимок на диске отключен: оба режима загружают каталог из 1С с нуля
+    os.environ["API_URL"] = f"http://127.0.0.1:{PORT}/test/hs"
+    os.environ["CATALOG_SNAPSHOT_PATH"] = ""
+
+    modules = [module_name for _, module_name, _, _, _ in BOTS]
+    modes = (
+        ("один процесс", [modules]),
+        ("процесс на бота", [[module_name] for module_name in modules]),
+    )
+
+    print(f"Ботов: {len(modules)}, товаров в каталоге: {PRODUCTS}")
+    print(f"{'режим':<16} | {'процессов':>9} | {'запуск, с':>9} | {'RSS всего':>9} | запросов к 1С")
+    for mode, groups in modes:
+        await measure(groups, requests)  # прогрев кэша байткода и файлового кэша ОС
+        elapsed, rss, sent = await measure(groups, requests)
+        print(f"{mode:<16} | {len(groups):>9} | {elapsed:>9.2f} | {format_rss(rss):>9} | {sent}")
+
+    await runner.cleanup()
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    if sys.argv[1:2] == ["--child"]:
+        asyncio.run(child(sys.argv[2:]))
+    else:
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Сжатие ответов 1С: размер на линии и время загрузки полного списка товаров (~10 МБ JSON)
+без сжатия и в каждой из поддерживаемых кодировок - на локальном канале и на медленном
+канале до публикации 1С (тестовый сервер отдает ответ с ограничением скорости).
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_compression
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from loguru import logger
+
+from app.services.api_service import ApiService
+from app.services.decoders import SUPPORTED_ENCODINGS
+from app.services.mock_server import MockCatalog, start_mock_server
+
+PRODUCTS = 16_500
+REPEATS = 3
+LINKS = (("локальный", None), ("WAN 20 Мбит/с", 20 * 125_000))
+PORT = 8796
+
+
+async def measure(encoding, port):
+    """Медиана времени загрузки и размер ответа на линии"""
+    service = ApiService()
+    service.base_url = f"http://127.0.0.1:{port}/test/hs"
+    service.accept_encoding = encoding
+
+    timings = []
+    for _ in range(REPEATS):
+        # Без условных заголовков: каждый раз тело передается целиком
+        service._validators.clear()
+        started = time.perf_counter()
+        response = await service._make_request("GET", "/api/catalog/products")
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response["status"] == 200 and len(response["data"]) == PRODUCTS
+
+    stats = service.get_pool_stats()
+    await service.close()
+    return stats["bytes_received"] / REPEATS, stats["bytes_decoded"] / REPEATS, statistics.median(timings)
+
+
+async def run():
+
+    catalog = MockCatalog(products=PRODUCTS)
+    print(f"Товаров: {PRODUCTS}, кодировки клиента: {', '.join(SUPPORTED_ENCODINGS)}")
+
+    for link_index, (link, bandwidth) in enumerate(LINKS):
+        port = PORT + link_index
+        runner = await start_mock_server(port=port, catalog=catalog, bandwidth=bandwidth)
+        print(f"\nКанал: {link}")
+        print(f"{'кодировка':<10} | {'на линии, КБ':>12} | {'JSON, КБ':>9} | {'сжатие':>6} | {'загрузка, мс':>12}")
+
+        for encoding in ("identity", *SUPPORTED_ENCODINGS):
+            await measure(encoding, port)  # прогрев: сервер кэширует сжатое тело
+            wire, decoded, elapsed = await measure(encoding, port)
+            print(f"{encoding:<10} | {wire / 1024:>12.0f} | {decoded / 1024:>9.0f} | "
+                  f"{decoded / wire:>5.1f}x | {elapsed:>12.0f}")
+
+        await runner.cleanup()
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Синхронизация каталога по изменениям против полной загрузки товаров.
+
+Тестовый сервер 1С с каталогом из 20 000 товаров; между обновлениями индекса
+в 1С меняется разное число товаров. Для каждого обновления выводится объем
+ответа, время, совпадение результата с полной загрузкой и совпадение индексов,
+поправленных по изменениям (записи по коду и категориям, полнотекстовый и нечеткий
+поиск), с индексами, построенными заново. Снимок каталога на диск не сохраняется.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_delta_sync
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+os.environ["CATALOG_SNAPSHOT_PATH"] = ""
+
+from loguru import logger
+
+from app.services.api_service import api_service
+from app.services.catalog_index import CatalogIndex
+from app.services.catalog_store import catalog_store
+from app.services.fuzzy import FuzzyIndex, fuzzy_index
+from app.services.mock_data import make_products
+from app.services.mock_server import MockCatalog, start_mock_server
+from app.services.search import SearchIndex, search_index
+
+PRODUCTS = 20_000
+CHANGES = (0, 1, 10, 100, 1000)
+PORT = 8794
+
+
+def snapshot(products):
+    return {(p.code, p.price, p.stock, p.name) for p in products}
+
+
+async def full_snapshot():
+    """Эталон: весь список товаров, загруженный заново"""
+    response = await api_service._fetch_and_cache("/api/catalog/products", "products", fallback_to_cache=False)
+    return snapshot(response["data"])
+
+
+def indexes_match(rng):
+    """Индексы после обновления по изменениям дают то же, что и построенные заново"""
+    index = catalog_store.index
+    fresh = CatalogIndex(index.categories, index.products, index.services)
+    if (index.products_by_id != fresh.products_by_id or index.products_by_code != fresh.products_by_code
+            or {c: sorted(p.code for p in items) for c, items in index.products_by_category.items()}
+            != {c: sorted(p.code for p in items) for c, items in fresh.products_by_category.items()}):
+        return False
+
+    fresh_search, fresh_fuzzy = SearchIndex(), FuzzyIndex()
+    fresh_search.update(index.products + index.services)
+    fresh_fuzzy.build(index.products)
+    queries = [product.name for product in rng.sample(index.products, 20)]
+    queries += [product.code for product in rng.sample(index.products, 20)]
+    for query in queries:
+        if ({p.code for p in search_index.search(query, limit=1000)}
+                != {p.code for p in fresh_search.search(query, limit=1000)}):
+            return False
+        # Товары с равным расстоянием могут идти в другом порядке - сравниваются расстояния
+        if ([d for _, d in fuzzy_index.search(query, limit=1000)]
+                != [d for _, d in fresh_fuzzy.search(query, limit=1000)]):
+            return False
+    return True
+
+
+def mutate(catalog, rng, count):
+    """count изменений: в основном цены и остатки, немного новых и удаленных товаров"""
+    for number in range(count):
+        if number % 20 == 19:
+            catalog.delete_product(rng.choice(catalog.products)["Код"])
+        elif number % 20 == 18:
+            product = make_products(1, catalog.categories, seed=rng.random())[0]
+            product["Код"] = f"N{catalog.version:08d}"
+            catalog.add_product(product)
+        else:
+            catalog.change_product(rng.choice(catalog.products)["Код"], Цена=rng.randint(1, 500) * 50)
+
+
+async def timed_refresh():
+
+    started = time.perf_counter()
+    await api_service.refresh_catalog_index()
+    return (time.perf_counter() - started) * 1000
+
+
+async def run():
+
+    catalog = MockCatalog(products=PRODUCTS)
+    runner = await start_mock_server(port=PORT, catalog=catalog)
+    api_service.base_url = f"http://127.0.0.1:{PORT}/test/hs"
+    rng = random.Random(11)
+
+    refresh_ms = await timed_refresh()
+    full_size, full_ms = api_service._full_sync_cost
+    print(f"Товаров: {PRODUCTS}")
+    print(f"Полная загрузка: {full_size / 1024:.0f} КБ, запрос {full_ms:.0f} мс, обновление индекса {refresh_ms:.0f} мс")
+    print(f"{'изменений':>9} | {'ответ, Б':>9} | {'запрос+применение, мс':>21} | {'обновление индекса, мс':>22} | "
+          f"совпадает | индексы")
+
+    for count in CHANGES:
+        mutate(catalog, rng, count)
+        stats_before = api_service.get_sync_stats()
+        refresh_ms = await timed_refresh()
+        stats = api_service.get_sync_stats()
+        assert stats["delta"] == stats_before["delta"] + 1, stats
+
+        saved_bytes = stats["bytes_saved"] - stats_before["bytes_saved"]
+        saved_ms = stats["ms_saved"] - stats_before["ms_saved"]
+        matches = snapshot(catalog_store.index.products) == await full_snapshot()
+        print(f"{count:>9} | {full_size - saved_bytes:>9} | {full_ms - saved_ms:>21.1f} | {refresh_ms:>22.1f} | "
+              f"{matches!s:>9} | {indexes_match(rng)}")
+
+    # Журнал изменений на сервере обрезан - синхронизация должна перейти на полную загрузку
+    mutate(catalog, rng, 5)
+    catalog.log_start = catalog.version
+    await timed_refresh()
+    matches = snapshot(catalog_store.index.products) == await full_snapshot()
+    print(f"Разрыв цепочки изменений: полная загрузка, совпадает {matches}")
+    print(f"Итого: {api_service.get_sync_stats()}")
+
+    await api_service.close()
+    await runner.cleanup()
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Память FSM при просмотре каталога: списки товаров в состоянии каждого пользователя
+(как было) против версии снимка, вида списка и страницы с общим хранилищем записей.
+
+10 000 пользователей листают каталог из 5 000 товаров через настоящие обработчики;
+бэкендом служит локальный тестовый сервер 1С.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_fsm_memory
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from loguru import logger
+
+from app.handlers import catalog_handlers
+from app.services.api_service import api_service
+from app.services.mock_data import make_products
+from app.services.mock_server import MockCatalog, start_mock_server
+
+USERS = 10_000
+PRODUCTS = 5_000
+LEGACY_SAMPLE = 50
+PORT = 8790
+
+
+class FakeMessage:
+
+    async def edit_text(self, text, reply_markup=None, **kwargs):
+        pass
+
+
+class FakeUser:
+    first_name = "Пользователь"
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeCallback:
+
+    def __init__(self, data, user_id):
+        self.data = data
+        self.from_user = FakeUser(user_id)
+        self.message = FakeMessage()
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+def state_for(storage, user_id):
+    return FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=user_id, user_id=user_id))
+
+
+async def browse(storage, user_id):
+    """Типичный сценарий: каталог, две страницы вперед, категория"""
+    state = state_for(storage, user_id)
+    await catalog_handlers.process_catalog_products(FakeCallback("catalog_products", user_id), state)
+    await catalog_handlers.process_products_pagination(FakeCallback("products_page_2", user_id), state)
+    await catalog_handlers.process_products_pagination(FakeCallback("products_page_3", user_id), state)
+    await catalog_handlers.process_catalog_categories(FakeCallback("catalog_categories", user_id), state)
+
+
+async def measure_store():
+
+    catalog = MockCatalog(products=PRODUCTS)
+    runner = await start_mock_server(port=PORT, catalog=catalog)
+    api_service.base_url = f"http://127.0.0.1:{PORT}/test/hs"
+
+    storage = MemoryStorage()
+    await browse(storage, 0)  # прогрев кэша и хранилища
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for user_id in range(1, USERS + 1):
+        await browse(storage, user_id)
+    elapsed = time.perf_counter() - started
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    get_data_ms = await time_get_data(storage, USERS)
+
+    await api_service.close()
+    await runner.cleanup()
+    return used, elapsed, get_data_ms
+
+
+async def measure_legacy():
+    """Как было: каждый пользователь получал собственный разобранный список всего каталога"""
+    body = make_products(PRODUCTS)
+    storage = MemoryStorage()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for user_id in range(1, LEGACY_SAMPLE + 1):
+        products = [dict(item) for item in body]
+        await state_for(storage, user_id).update_data(products=products, current_page=3, total_pages=PRODUCTS // 10)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    get_data_ms = await time_get_data(storage, LEGACY_SAMPLE)
+    return used, get_data_ms
+
+
+async def time_get_data(storage, users):
+
+    started = time.perf_counter()
+    for user_id in range(1, users + 1):
+        await state_for(storage, user_id).get_data()
+    return (time.perf_counter() - started) / users * 1000
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    legacy_used, legacy_get_ms = asyncio.run(measure_legacy())
+    store_used, elapsed, store_get_ms = asyncio.run(measure_store())
+
+    legacy_per_user = legacy_used / LEGACY_SAMPLE
+    print(f"Пользователей: {USERS}, товаров в каталоге: {PRODUCTS}")
+    print(f"{'вариант':<28} | {'на пользователя':>15} | {'на ' + str(USERS) + ' польз.':>16} | get_data, мкс")
+    print(f"{'списки в FSM (было)':<28} | {legacy_per_user / 1024:>12.0f} КБ | "
+          f"{legacy_per_user * USERS / 1024 ** 2:>13.0f} МБ | {legacy_get_ms * 1000:>8.1f}")
+    print(f"{'общее хранилище':<28} | {store_used / USERS:>13.0f} Б | "
+          f"{store_used / 1024 ** 2:>13.1f} МБ | {store_get_ms * 1000:>8.1f}")
+    print(f"Для старого варианта замерено {LEGACY_SAMPLE} пользователей, итог пересчитан на {USERS}")
+    print(f"Прогон обработчиков: {elapsed:.1f} с ({elapsed / USERS * 1000:.2f} мс на пользователя)")
+    print(f"Хранилище каталога: {catalog_handlers.catalog_store.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Нечеткий поиск запчастей (/part) по каталогу из PRODUCTS товаров.
+
+Выводятся время сборки индекса, число ключей и триграмм, а для каждой группы запросов -
+медиана, p95 и максимум времени поиска и сколько запросов нашли ожидаемый товар:
+    - точные и сокращенные коды, коды с опечаткой;
+    - короткие запросы из 1-2 символов ("h7");
+    - слова из названия, в том числе с опечатками;
+    - несколько слов в любом порядке ("ngk свеча").
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_fuzzy
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from loguru import logger
+
+from app.services.fuzzy import FuzzyIndex, words
+from app.services.mock_data import make_products
+from app.services.models import Product
+from app.services.transformers import map_items, product_from_1c
+
+PRODUCTS = 100_000
+QUERIES = 200
+REPEATS = 5
+
+
+def typo(text, rng):
+    """Одна опечатка: пропуск, замена или перестановка соседних символов"""
+    position = rng.randrange(len(text) - 1)
+    kind = rng.choice(("skip", "replace", "swap"))
+    if kind == "skip":
+        return text[:position] + text[position + 1:]
+    if kind == "replace":
+        return text[:position] + rng.choice("абвгдеклмнор0123456789") + text[position + 1:]
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+def make_queries(products, rng):
+    """Группа -> [(запрос, проверка найденного товара)]"""
+    sample = rng.sample(products, QUERIES)
+    long_words = lambda product: [word for word in words(product.name) if len(word) > 4]
+    return {
+        "код": [(p.code, lambda found, p=p: found.code == p.code) for p in sample],
+        "код без нулей": [(p.code.lstrip("0"), lambda found, p=p: found.code == p.code) for p in sample],
+        "код с опечаткой": [(typo(p.code, rng), lambda found, p=p: found.code == p.code) for p in sample],
+        "1-2 символа": [("h7", lambda found: "h7" in words(found.name))] * 20,
+        "слово": [(word, lambda found, word=word: word in words(found.name))
+                  for word in (rng.choice(long_words(p)) for p in sample)],
+        "слово с опечаткой": [(typo(word, rng), lambda found, word=word: word in words(found.name))
+                              for word in (rng.choice(long_words(p)) for p in sample)],
+        "слова вразнобой": [(" ".join(reversed(words(p.name))),
+                             lambda found, p=p: set(words(found.name)) == set(words(p.name))) for p in sample],
+    }
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    rng = random.Random(3)
+    products = map_items(make_products(PRODUCTS), product_from_1c, Product)
+
+    index = FuzzyIndex()
+    index.build(products)
+    stats = index.get_stats()
+    print(f"Товаров: {PRODUCTS}, сборка индекса: {stats['build_ms']:.0f} мс, ключей: {stats['keys']}, "
+          f"триграмм: {stats['trigrams']}")
+    print(f"{'запросы':<18} | {'p50, мс':>7} | {'p95, мс':>7} | {'макс, мс':>8} | {'найдено':>7}")
+
+    for group, queries in make_queries(products, rng).items():
+        timings, hits = [], 0
+        for query, expected in queries:
+            for _ in range(REPEATS):
+                started = time.perf_counter()
+                results = index.search(query)
+                timings.append((time.perf_counter() - started) * 1000)
+            hits += any(expected(product) for product, _ in results)
+        timings.sort()
+        print(f"{group:<18} | {statistics.median(timings):>7.2f} | {timings[int(len(timings) * 0.95)]:>7.2f} | "
+              f"{timings[-1]:>8.1f} | {hits / len(queries):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
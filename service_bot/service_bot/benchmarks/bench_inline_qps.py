@@ -0,0 +1,131 @@
+"""Пропускная способность inline-поиска по каталогу из 20 000 позиций.
+
+Каталог загружается с локального тестового сервера 1С тем же путем, что и при
+запуске бота; дальше запросы обслуживаются только локальным индексом:
+    - без кэша ответов (каждый запрос - поиск и сборка результатов);
+    - с кэшем ответов на потоке, где популярные запросы повторяются;
+    - подавление промежуточных запросов при наборе текста.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_inline_qps
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from loguru import logger
+
+from app.services.api_service import api_service
+from app.services.inline_search import InlineSearch
+from app.services.mock_data import BRANDS, PART_NAMES, SERVICE_NAMES
+from app.services.mock_server import MockCatalog, start_mock_server
+from app.services.search import search_index
+
+PRODUCTS = 19_900
+SERVICES = 100
+QUERIES = 20_000
+TYPING_USERS = 200
+KEYSTROKE_DELAY = 0.08
+PORT = 8791
+
+
+def typed_prefixes(phrase):
+    """Все промежуточные запросы, которые Telegram отправляет при наборе фразы"""
+    return [phrase[:length] for length in range(2, len(phrase) + 1) if not phrase[length - 1].isspace()]
+
+
+def make_workload(rng, count):
+    """Поток запросов: фразы выбираются по закону Ципфа, каждая набирается по буквам"""
+    phrases = [f"{part.split()[0].lower()} {brand.lower()}" for part in PART_NAMES for brand in BRANDS]
+    phrases += [name.lower() for name in PART_NAMES + SERVICE_NAMES]
+    rng.shuffle(phrases)
+    weights = [1 / rank for rank in range(1, len(phrases) + 1)]
+
+    queries = []
+    while len(queries) < count:
+        queries.extend(typed_prefixes(rng.choices(phrases, weights)[0]))
+    return queries[:count]
+
+
+def measure(inline, queries):
+
+    started = time.perf_counter()
+    found = 0
+    for query in queries:
+        found += len(inline.results(query))
+    elapsed = time.perf_counter() - started
+    return len(queries) / elapsed, elapsed / len(queries) * 1000, found / len(queries)
+
+
+async def measure_typing(inline, phrases):
+    """Пользователи набирают фразы по букве; отвечаем только на запросы после паузы"""
+    answered = 0
+
+    async def on_query(user_id, query):
+        nonlocal answered
+        if inline.is_cached(query) or await inline.debounce(user_id):
+            inline.results(query)
+            answered += 1
+
+    async def type_phrase(user_id, phrase):
+        tasks = []
+        for query in typed_prefixes(phrase):
+            tasks.append(asyncio.create_task(on_query(user_id, query)))
+            await asyncio.sleep(KEYSTROKE_DELAY)
+        await asyncio.gather(*tasks)
+
+    sent = sum(len(typed_prefixes(phrase)) for phrase in phrases)
+    await asyncio.gather(*(type_phrase(user_id, phrase) for user_id, phrase in enumerate(phrases)))
+    return sent, answered
+
+
+async def run():
+
+    catalog = MockCatalog(products=PRODUCTS, services=SERVICES)
+    runner = await start_mock_server(port=PORT, catalog=catalog)
+    api_service.base_url = f"http://127.0.0.1:{PORT}/test/hs"
+
+    started = time.perf_counter()
+    await api_service.refresh_catalog_index()
+    load_s = time.perf_counter() - started
+
+    rng = random.Random(7)
+    queries = make_workload(rng, QUERIES)
+    distinct = len(set(queries))
+
+    cold = measure(InlineSearch(cache_size=0), queries)
+    cached_inline = InlineSearch()
+    cached = measure(cached_inline, queries)
+
+    typing_inline = InlineSearch()
+    phrases = [rng.choice(queries[-200:]) + " " + rng.choice(BRANDS).lower() for _ in range(TYPING_USERS)]
+    sent, answered = await measure_typing(typing_inline, phrases)
+
+    await api_service.close()
+    await runner.cleanup()
+
+    print(f"Каталог: {len(search_index)} позиций, загрузка и индексация {load_s:.1f} с")
+    print(f"Запросов: {len(queries)}, различных: {distinct}")
+    print(f"{'режим':<22} | {'запросов/с':>10} | {'мс/запрос':>9} | результатов")
+    print(f"{'без кэша ответов':<22} | {cold[0]:>10.0f} | {cold[1]:>9.3f} | {cold[2]:>6.1f}")
+    print(f"{'с кэшем ответов':<22} | {cached[0]:>10.0f} | {cached[1]:>9.3f} | {cached[2]:>6.1f}")
+    print(f"Кэш: {cached_inline.get_stats()}")
+    print(f"Набор текста ({TYPING_USERS} польз., {KEYSTROKE_DELAY * 1000:.0f} мс на букву, "
+          f"пауза {typing_inline.debounce_delay * 1000:.0f} мс): отправлено {sent}, обработано {answered} "
+          f"({answered / sent:.0%})")
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
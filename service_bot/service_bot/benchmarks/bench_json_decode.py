@@ -0,0 +1,49 @@
+"""Время разбора самых больших ответов каталога: старый путь (text + json.loads)
+против однократного чтения bytes и быстрого декодера.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_json_decode
+"""
+import json
+import time
+
+from app.services import decoders
+from app.services.mock_data import envelope, make_products
+
+SIZES = (1000, 5000, 20000)
+REPEATS = 20
+
+
+def measure(func, body):
+
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func(body)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def old_path(body):
+    # aiohttp response.json(): декодирование в str и json.loads
+    return json.loads(body.decode("utf-8"))
+
+
+def new_path(body):
+    return decoders.decode_body(body, "application/json", "utf-8")
+
+
+def main():
+
+    print(f"Декодер по умолчанию: {decoders.get_json_decoder_name()}")
+    print(f"{'товаров':>8} | {'размер, КБ':>10} | {'text+json, мс':>13} | {'bytes+' + decoders.get_json_decoder_name() + ', мс':>15} | ускорение")
+
+    for size in SIZES:
+        body = json.dumps(envelope("products", make_products(size)), ensure_ascii=False).encode("utf-8")
+        old_ms = measure(old_path, body)
+        new_ms = measure(new_path, body)
+        print(f"{size:>8} | {len(body) / 1024:>10.0f} | {old_ms:>13.2f} | {new_ms:>15.2f} | x{old_ms / new_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Всплеск исходящих сообщений: прямые вызовы Bot API против очереди SendQueue.
+
+Имитация Telegram Bot API в этом же процессе соблюдает лимиты на бота (GLOBAL_RATE
+в секунду) и на чат (CHAT_RATE в секунду, запас CHAT_BURST; правки сообщений в личном
+чате - только лимит бота): сверх лимита - ответ 429 с retry_after.
+
+Всплеск. Одновременно:
+    - STAFF сотрудников открывают список заказов - по ORDER_MESSAGES сообщений каждому;
+    - идет рассылка (send_queue.bulk()) на BROADCAST чатов.
+Без очереди aiogram получает TelegramRetryAfter, и сообщение теряется. Выводятся:
+сколько ответов 429 и потерянных сообщений, задержка ответов сотрудникам (медиана, p95),
+за сколько секунд закончилась рассылка. Задержка сотрудников в очереди определяется
+лимитом бота: STAFF * ORDER_MESSAGES сообщений не уйдут быстрее, чем за их число / GLOBAL_RATE.
+
+Навигация по каталогу. CLICKERS пользователей CLICKS раз открывают карточку товара:
+на нажатие - две правки сообщения (как в catalog_handlers), пауза CLICK_INTERVAL_MS.
+Выводится задержка нажатия (медиана, p95) напрямую, через очередь и через очередь,
+в которой правки расходуют лимит чата (как было раньше).
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_send_queue
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+from aiohttp import web
+from loguru import logger
+
+from app.services.send_queue import SendQueue, TokenBucket
+
+STAFF = 40
+ORDER_MESSAGES = 4
+BROADCAST = 300
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+CHAT_BURST = 3
+CLICKERS = 8
+CLICKS = 8
+CLICK_INTERVAL_MS = 700
+API_PORT = 8805
+TOKEN = "123456789:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+
+
+class FakeTelegram:
+    """Bot API с лимитами Telegram; на сообщения отвечает объектом Message"""
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self.chats = {}
+        self.too_many = 0
+        self.message_id = 0
+
+    async def handle(self, request):
+
+        form = await request.post()
+        chat_id = int(form["chat_id"])
+        now = time.monotonic()
+        chat = self.chats.setdefault(chat_id, TokenBucket(CHAT_RATE, CHAT_BURST))
+        chat_limit = not (request.match_info["method"].startswith("edit") and chat_id > 0)
+        if self.global_bucket.delay(now) or (chat_limit and chat.delay(now)):
+            self.too_many += 1
+            return web.json_response({
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status=429)
+
+        self.global_bucket.take()
+        if chat_limit:
+            chat.take()
+        self.message_id += 1
+        return web.json_response({"ok": True, "result": {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": form.get("text", ""),
+        }})
+
+
+async def start_telegram(queue):
+
+    telegram = FakeTelegram()
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", telegram.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", API_PORT).start()
+
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")))
+    if queue is not None:
+        bot.session.middleware(queue)
+    return telegram, runner, bot
+
+
+async def run_mode(queue):
+
+    telegram, runner, bot = await start_telegram(queue)
+    lost, latencies = 0, []
+
+    async def send(chat_id, text):
+        nonlocal lost
+        try:
+            await bot.send_message(chat_id, text)
+        except TelegramRetryAfter:
+            lost += 1
+
+    async def show_orders(chat_id):
+        started = time.perf_counter()
+        for number in range(ORDER_MESSAGES):
+            await send(chat_id, f"Заказ {number}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    async def broadcast():
+        with queue.bulk():
+            await asyncio.gather(*(send(10_000 + number, "Рассылка") for number in range(BROADCAST)))
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    broadcast_task = asyncio.create_task(broadcast())
+    await asyncio.gather(*(show_orders(100 + number) for number in range(STAFF)))
+    broadcast_seconds = await broadcast_task
+
+    await bot.session.close()
+    await runner.cleanup()
+    latencies.sort()
+    return telegram.too_many, lost, statistics.median(latencies), latencies[int(len(latencies) * 0.95)], \
+        broadcast_seconds, queue.get_stats() if queue.enabled else None
+
+
+async def run_navigation(queue):
+
+    telegram, runner, bot = await start_telegram(queue)
+    lost, latencies = 0, []
+
+    async def clicker(chat_id):
+        nonlocal lost
+        for _ in range(CLICKS):
+            started = time.perf_counter()
+            try:
+                await bot.edit_message_text("Загрузка...", chat_id=chat_id, message_id=1)
+                await bot.edit_message_text("Карточка товара", chat_id=chat_id, message_id=1)
+            except TelegramRetryAfter:
+                lost += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(CLICK_INTERVAL_MS / 1000)
+
+    await asyncio.gather(*(clicker(100 + number) for number in range(CLICKERS)))
+    await bot.session.close()
+    await runner.cleanup()
+    latencies.sort()
+    return telegram.too_many, lost, statistics.median(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+async def run():
+
+    print(f"Telegram: {GLOBAL_RATE}/с на бота, {CHAT_RATE}/с на чат (запас {CHAT_BURST}); "
+          f"{STAFF} сотрудников по {ORDER_MESSAGES} сообщения + рассылка на {BROADCAST} чатов")
+    print(f"{'режим':<8} | {'ответов 429':>11} | {'потеряно':>8} | {'сотрудники p50, мс':>18} | {'p95, мс':>7} | "
+          f"{'рассылка, с':>11}")
+    for mode, queue in (("напрямую", SendQueue(global_rate=0)), ("очередь", SendQueue())):
+        too_many, lost, p50, p95, broadcast_seconds, stats = await run_mode(queue)
+        print(f"{mode:<8} | {too_many:>11} | {lost:>8} | {p50:>18.0f} | {p95:>7.0f} | {broadcast_seconds:>11.1f}",
+              flush=True)
+        if stats is not None:
+            print(f"  {stats}")
+
+    # Как было раньше: правки в личных чатах расходовали лимит чата 1/с
+    chat_limited_edits = SendQueue()
+    chat_limited_edits.uses_chat_limit = lambda method: True
+    print(f"\nНавигация: {CLICKERS} пользователей по {CLICKS} нажатий (2 правки) каждые {CLICK_INTERVAL_MS} мс")
+    print(f"{'режим':<22} | {'ответов 429':>11} | {'потеряно':>8} | {'нажатие p50, мс':>15} | {'p95, мс':>7}")
+    for mode, queue in (("напрямую", None), ("очередь", SendQueue()), ("очередь, лимит чата", chat_limited_edits)):
+        too_many, lost, p50, p95 = await run_navigation(queue)
+        print(f"{mode:<22} | {too_many:>11} | {lost:>8} | {p50:>15.0f} | {p95:>7.0f}", flush=True)
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
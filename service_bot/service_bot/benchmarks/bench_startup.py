@@ -0,0 +1,84 @@
+"""Профиль холодного запуска точек входа ботов: время импорта по модулям (python -X importtime).
+
+Каждая точка входа импортируется в новом процессе RUNS раз; выводятся медианы:
+    - время запуска процесса с импортом и время импорта самого модуля бота;
+    - собственное время импорта по пакетам (aiogram, pydantic, aiohttp, loguru, app, прочее);
+    - сколько модулей app импортировано и самые долгие из них (с учетом вложенных импортов).
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_startup [main staff_bot service_bot]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ENTRY_POINTS = ("main", "staff_bot", "service_bot")
+PACKAGES = ("aiogram", "pydantic", "pydantic_core", "aiohttp", "loguru", "app")
+RUNS = 5
+TOP_MODULES = 8
+
+
+def profile(module):
+    """Один запуск: время процесса и {модуль: (собственное, с вложенными)} в микросекундах"""
+    env = dict(os.environ, API_USERNAME=os.environ.get("API_USERNAME", "bench"),
+               API_PASSWORD=os.environ.get("API_PASSWORD", "bench"))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - started
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return wall, modules
+
+
+def package_of(name):
+
+    top = name.split(".", 1)[0]
+    return top if top in PACKAGES else "прочее"
+
+
+def report(module):
+
+    runs = [profile(module) for _ in range(RUNS)]
+    walls = [wall for wall, _ in runs]
+    totals = [modules[module][1] for _, modules in runs]
+
+    by_package = defaultdict(list)
+    app_modules = defaultdict(list)
+    for _, modules in runs:
+        per_package = defaultdict(int)
+        for name, (self_us, cumulative_us) in modules.items():
+            per_package[package_of(name)] += self_us
+            if name.startswith("app.") or name == "app":
+                app_modules[name].append(cumulative_us)
+        for package in (*PACKAGES, "прочее"):
+            by_package[package].append(per_package[package])
+
+    print(f"\n{module}: процесс {statistics.median(walls) * 1000:.0f} мс, "
+          f"импорт {statistics.median(totals) / 1000:.0f} мс, модулей app: {len(app_modules)}")
+    print("  по пакетам, мс: " + ", ".join(
+        f"{package} {statistics.median(values) / 1000:.1f}" for package, values in by_package.items()
+    ))
+    slowest = sorted(app_modules.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, values in slowest[:TOP_MODULES]:
+        print(f"  {name:<40} {statistics.median(values) / 1000:>7.1f} мс")
+
+
+def main():
+
+    for module in sys.argv[1:] or ENTRY_POINTS:
+        report(module)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Частые нажатия кнопок: сколько запросов уходит в 1С без ограничения и с CallbackThrottle.
+
+Обновления подаются в диспетчер напрямую (dp.feed_update), ответы на нажатия принимает
+имитация Telegram Bot API в этом же процессе. Обработчик нажатия имитирует запрос к 1С,
+у которой SESSIONS сеансов по LATENCY_MS.
+
+MASHERS пользователей жмут одну и ту же кнопку (карточка товара или стрелка страницы)
+PRESSES раз с интервалом PRESS_INTERVAL_MS; в это же время CALM пользователей один раз
+открывают свою карточку. Выводятся:
+    - сколько запросов ушло в 1С;
+    - задержка ответа спокойным пользователям (медиана и p95);
+    - счетчики middleware: пропущено, слито с обрабатываемым, отброшено повторов, сверх лимита.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_throttling
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+from aiohttp import web
+from loguru import logger
+
+from app.services.throttling import CallbackThrottle
+
+MASHERS = 50
+PRESSES = 10
+PRESS_INTERVAL_MS = 80
+CALM = 50
+SESSIONS = 4
+LATENCY_MS = 50
+API_PORT = 8804
+TOKEN = "123456789:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+
+
+async def start_telegram():
+    """Имитация Bot API: на любой метод - успешный ответ"""
+
+    async def handle(request):
+        return web.json_response({"ok": True, "result": True})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", API_PORT).start()
+    return runner
+
+
+def make_callback(update_id, user_id, data):
+
+    user = {"id": user_id, "is_bot": False, "first_name": "Клиент"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "Каталог",
+            },
+        },
+    }
+
+
+def make_dispatcher(throttle, calls):
+
+    router = Router()
+    sessions = asyncio.Semaphore(SESSIONS)
+
+    @router.callback_query(F.data.startswith("product_") | F.data.startswith("products_page_"))
+    async def on_press(callback):
+        calls.append(callback.data)
+        async with sessions:
+            await asyncio.sleep(LATENCY_MS / 1000)
+        await callback.answer()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    if throttle is not None:
+        dp.callback_query.outer_middleware(throttle)
+    return dp
+
+
+async def run_mode(throttle):
+
+    calls, calm_latencies = [], []
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")))
+    dp = make_dispatcher(throttle, calls)
+    update_ids = iter(range(1, 1_000_000))
+
+    async def press(user_id, data):
+        update = Update.model_validate(make_callback(next(update_ids), user_id, data), context={"bot": bot})
+        await dp.feed_update(bot, update)
+
+    async def masher(user_id):
+        data = random.choice((f"product_00-{user_id:05d}", "products_page_2"))
+        presses = []
+        for _ in range(PRESSES):
+            presses.append(asyncio.create_task(press(user_id, data)))
+            await asyncio.sleep(PRESS_INTERVAL_MS / 1000)
+        await asyncio.gather(*presses)
+
+    async def calm(user_id):
+        await asyncio.sleep(random.uniform(0, PRESSES * PRESS_INTERVAL_MS / 1000))
+        started = time.perf_counter()
+        await press(user_id, f"product_00-{user_id:05d}")
+        calm_latencies.append((time.perf_counter() - started) * 1000)
+
+    random.seed(1)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(masher(100 + number) for number in range(MASHERS)),
+        *(calm(10_000 + number) for number in range(CALM)),
+    )
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+
+    calm_latencies.sort()
+    return (len(calls), statistics.median(calm_latencies), calm_latencies[int(len(calm_latencies) * 0.95)],
+            elapsed, throttle.get_stats() if throttle is not None else None)
+
+
+async def run():
+
+    runner = await start_telegram()
+    print(f"1С: {SESSIONS} сеанса по {LATENCY_MS} мс; {MASHERS} пользователей жмут кнопку {PRESSES} раз "
+          f"каждые {PRESS_INTERVAL_MS} мс, {CALM} пользователей нажимают один раз; "
+          f"всего нажатий: {MASHERS * PRESSES + CALM}")
+    print(f"{'режим':<10} | {'запросов к 1С':>13} | {'спокойные p50, мс':>17} | {'p95, мс':>7} | {'всего, с':>8}")
+    for mode, throttle in (("без", None), ("throttle", CallbackThrottle())):
+        requests, p50, p95, elapsed, stats = await run_mode(throttle)
+        print(f"{mode:<10} | {requests:>13} | {p50:>17.0f} | {p95:>7.0f} | {elapsed:>8.1f}", flush=True)
+        if stats is not None:
+            print(f"  {stats}")
+    await runner.cleanup()
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
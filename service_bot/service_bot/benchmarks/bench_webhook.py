@@ -0,0 +1,236 @@
+"""Доставка обновлений: long polling против webhook.
+
+Отдельный процесс имитирует Telegram Bot API: для polling отдает накопившиеся обновления
+на getUpdates (до 100 за ответ, с длинным ожиданием), для webhook сам отправляет их POST-запросами
+на WebhookServer, не больше WEBHOOK_MAX_CONNECTIONS одновременно. Задержка сети в одну сторону -
+половина RTT. Обработчик обновления имитирует запрос к 1С (HANDLER_MS).
+
+Для каждого режима:
+    - пачка из BURST обновлений сразу: сколько обновлений в секунду обработано;
+    - равномерный поток RATE обновлений в секунду: задержка от появления обновления
+      в Telegram до начала обработки.
+
+Запуск из каталога бота:
+    python -m benchmarks.bench_webhook
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("API_USERNAME", "bench")
+os.environ.setdefault("API_PASSWORD", "bench")
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import ClientSession, TCPConnector, web
+from loguru import logger
+
+from app.config.config import WEBHOOK_MAX_CONNECTIONS
+from app.services.webhook import SECRET_HEADER, WebhookServer
+
+BURST = 5000
+RATE = 200
+STEADY_SECONDS = 5
+HANDLER_MS = 20
+RTTS = (0.0, 0.06)
+API_PORT = 8801
+WEBHOOK_PORT = 8802
+RETRY_DELAY = 0.1
+READY = "READY"
+TOKEN = "123456789:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+
+
+def make_update(update_id):
+    """Синтетическое сообщение; в тексте - время появления обновления в Telegram"""
+    user = {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "Клиент"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": repr(time.time()),
+        },
+    }
+
+
+class FakeTelegram:
+    """Имитация Telegram в отдельном процессе, чтобы отправка обновлений не отнимала процессор у бота"""
+
+    def __init__(self, rtt):
+        self.delay = rtt / 2
+        self.updates = []
+        self.arrived = asyncio.Condition()
+        self.retries = 0
+        self._push_task = None
+
+    async def publish(self, request):
+        """Управление из бенчмарка: в Telegram появились count новых обновлений"""
+        count = (await request.json())["count"]
+        async with self.arrived:
+            for _ in range(count):
+                self.updates.append(make_update(len(self.updates) + 1))
+            self.arrived.notify_all()
+        return web.json_response({"published": len(self.updates)})
+
+    async def handle(self, request):
+        """Bot API: getMe, getUpdates с длинным ожиданием, на остальные методы - успешный ответ"""
+        await asyncio.sleep(self.delay)
+        method = request.match_info["method"]
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {"id": 123456789, "is_bot": True, "first_name": "Бот"}})
+        if method != "getUpdates":
+            return web.json_response({"ok": True, "result": True})
+
+        form = await request.post()
+        start = max(0, int(form.get("offset", 0)) - 1)
+        timeout = int(form.get("timeout", 0))
+        async with self.arrived:
+            try:
+                await asyncio.wait_for(self.arrived.wait_for(lambda: len(self.updates) > start), timeout)
+            except asyncio.TimeoutError:
+                pass
+        batch = self.updates[start:start + 100]
+        await asyncio.sleep(self.delay)
+        return web.json_response({"ok": True, "result": batch})
+
+    async def start_push(self, request):
+        """Управление из бенчмарка: доставлять обновления на webhook"""
+        params = await request.json()
+        self._push_task = asyncio.create_task(self.push(params["url"], params["secret"]))
+        return web.json_response({"ok": True})
+
+    async def push(self, url, secret):
+        """Отправка обновлений на webhook: не больше WEBHOOK_MAX_CONNECTIONS запросов одновременно"""
+        sent = 0
+
+        async def sender(session):
+            nonlocal sent
+            while True:
+                async with self.arrived:
+                    await self.arrived.wait_for(lambda: len(self.updates) > sent)
+                    update = self.updates[sent]
+                    sent += 1
+                # Очередь сервера заполнена (503) - Telegram повторяет доставку позже
+                while True:
+                    await asyncio.sleep(self.delay)
+                    async with session.post(url, json=update, headers={SECRET_HEADER: secret}) as response:
+                        status = response.status
+                    await asyncio.sleep(self.delay)
+                    if status == 200:
+                        break
+                    self.retries += 1
+                    await asyncio.sleep(RETRY_DELAY)
+
+        async with ClientSession(connector=TCPConnector(limit=WEBHOOK_MAX_CONNECTIONS)) as session:
+            await asyncio.gather(*(sender(session) for _ in range(WEBHOOK_MAX_CONNECTIONS)))
+
+
+async def serve_telegram(rtt):
+    """Дочерний процесс: имитация Telegram Bot API и управление для бенчмарка"""
+    # При остановке polling бот обрывает соединение посреди длинного ожидания - это не ошибка
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)
+    telegram = FakeTelegram(rtt)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", telegram.handle)
+    app.router.add_post("/publish", telegram.publish)
+    app.router.add_post("/push", telegram.start_push)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", API_PORT).start()
+    print(READY, flush=True)
+    await asyncio.Event().wait()
+
+
+def make_dispatcher(handled, latencies):
+
+    router = Router()
+
+    @router.message()
+    async def on_message(message):
+        latencies.append(time.time() - float(message.text))
+        await asyncio.sleep(HANDLER_MS / 1000)
+        handled.append(message.message_id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def run_mode(mode, rtt):
+    """Returns: обновлений в секунду на пачке, медиана и p95 задержки на равномерном потоке, мс"""
+    telegram = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.bench_webhook", "--telegram", str(rtt), stdout=asyncio.subprocess.PIPE,
+    )
+    assert (await telegram.stdout.readline()).decode().strip() == READY
+    control = ClientSession(f"http://127.0.0.1:{API_PORT}")
+
+    handled, latencies = [], []
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")))
+    dp = make_dispatcher(handled, latencies)
+
+    if mode == "polling":
+        polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    else:
+        server = WebhookServer()
+        server.add_bot("main", bot, dp)
+        await server.start("127.0.0.1", WEBHOOK_PORT)
+        url = f"http://127.0.0.1:{WEBHOOK_PORT}{server.path}/main"
+        await control.post("/push", json={"url": url, "secret": server.secret})
+
+    async def wait_handled(count):
+        while len(handled) < count:
+            await asyncio.sleep(0.005)
+
+    started = time.perf_counter()
+    await control.post("/publish", json={"count": BURST})
+    await wait_handled(BURST)
+    throughput = BURST / (time.perf_counter() - started)
+
+    latencies.clear()
+    for _ in range(RATE * STEADY_SECONDS // 10):
+        await control.post("/publish", json={"count": 10})
+        await asyncio.sleep(10 / RATE)
+    await wait_handled(BURST + RATE * STEADY_SECONDS)
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+
+    if mode == "polling":
+        await dp.stop_polling()
+        await polling
+    else:
+        await server.stop()
+    await bot.session.close()
+    await control.close()
+    telegram.terminate()
+    await telegram.wait()
+    return throughput, statistics.median(latencies_ms), latencies_ms[int(len(latencies_ms) * 0.95)]
+
+
+async def run():
+
+    print(f"Пачка: {BURST} обновлений, поток: {RATE}/с в течение {STEADY_SECONDS} с, обработка {HANDLER_MS} мс, "
+          f"webhook: {WEBHOOK_MAX_CONNECTIONS} соединений, обработчиков: {WebhookServer().workers}")
+    print(f"{'RTT, мс':>7} | {'режим':<8} | {'пачка, обн/с':>12} | {'задержка p50, мс':>16} | {'p95, мс':>7}")
+    for rtt in RTTS:
+        for mode in ("polling", "webhook"):
+            throughput, p50, p95 = await run_mode(mode, rtt)
+            print(f"{rtt * 1000:>7.0f} | {mode:<8} | {throughput:>12.0f} | {p50:>16.1f} | {p95:>7.1f}", flush=True)
+
+
+def main():
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    if sys.argv[1:2] == ["--telegram"]:
+        asyncio.run(serve_telegram(float(sys.argv[2])))
+    else:
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+import time
+
+STARTED_AT = time.perf_counter()
+
 import asyncio
 import logging
 import sys
@@ -10,6 +14,12 @@ from loguru import logger
 from app.config.config import BOT_TOKEN, API_URL, BASE_URL
 from app.handlers import main_router
 from app.services.api_service import api_service
+from app.services.send_queue import send_queue
+from app.services.throttling import callback_throttle
+from app.utils.timeline import StartupTimeline
+
+timeline = StartupTimeline(STARTED_AT)
+background_tasks = set()
 
 def setup_logging():
 
@@ -37,51 +47,77 @@ async def setup_bot_commands(bot: Bot):
     commands = [
         BotCommand(command="start", description="Запустить бота / вернуться в главное меню"),
         BotCommand(command="help", description="Получить помощь по использованию бота"),
+        BotCommand(command="search", description="Поиск товаров и услуг"),
     ]
 
     await bot.set_my_commands(commands)
 
-async def test_api():
+def create_dispatcher():
+    """Диспетчер основного бота с роутерами (запуск и api_service - на стороне вызывающего)"""
+    dp = Dispatcher()
+    dp.include_router(main_router)
+    dp.callback_query.outer_middleware(callback_throttle)
+    return dp
 
-    logger.info("Тестирование соединения с API...")
-    logger.info(f"Используемый API URL: {API_URL}")
-    logger.info(f"Базовый URL для запросов: {BASE_URL}")
+def run_in_background(coro, description):
+    """Задача запуска, которая не должна задерживать polling; ошибка только пишется в лог"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+
+    def done(task):
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка при запуске ({description}): {task.exception()}")
+
+    task.add_done_callback(done)
 
-    result = await api_service.test_connection()
+async def on_startup(bot: Bot):
+    await api_service.startup()
+    # Polling начинается сразу, а команды бота и прогрев 1С выполняются параллельно в фоне
+    run_in_background(setup_bot_commands(bot), "команды бота")
+    run_in_background(warm_up_api(), "прогрев API")
+    timeline.mark("polling запущен")
 
-    logger.info(f"Результат теста API: {result.get('status', 'Недоступен')}")
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await api_service.close()
+    logger.info(f"Нажатия кнопок: {callback_throttle.get_stats()}")
+    logger.info(f"Исходящие сообщения: {send_queue.get_stats()}")
 
-    logger.info("Тестирование запроса категорий...")
-    categories_result = await api_service.get_categories()
+async def warm_up_api():
 
-    logger.info(f"Результат запроса категорий: {categories_result.get('status', 'Недоступен')}")
+    logger.info(f"Используемый API URL: {API_URL}")
+    logger.info(f"Базовый URL для запросов: {BASE_URL}")
 
     if api_service.use_mock_data:
         logger.info("Бот настроен на использование тестовых данных для API запросов")
     else:
         logger.info("Бот настроен на использование реального API")
 
+    result = await api_service.warm_up()
+    timeline.mark("прогрев API")
     return result
 
 async def main():
 
     setup_logging()
+    timeline.mark("импорт модулей")
 
     if not BOT_TOKEN:
         logger.error("Токен бота не найден в .env файле")
-        return    
-    try:
-        await test_api()
-    except Exception as e:
-        logger.error(f"Ошибка при тестировании API: {e}")
+        return
 
     bot = Bot(token=BOT_TOKEN, parse_mode=ParseMode.HTML)
-    dp = Dispatcher()
-
-    dp.include_router(main_router)
-
-    await setup_bot_commands(bot)
-
+    bot.session.middleware(send_queue)
+    dp = create_dispatcher()
+    dp.update.outer_middleware(timeline.first_update_middleware())
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    timeline.mark("конфигурация")
+
+    # Webhook мог остаться от запуска start_all_bots.py в режиме webhook - с ним getUpdates не работает
+    await bot.delete_webhook()
     logger.info("Бот запущен")
     await dp.start_polling(bot)
 
@@ -10,6 +10,8 @@ from loguru import logger
 from app.config.config import SERVICE_BOT_TOKEN, API_URL, BASE_URL
 from app.handlers.service_handlers import service_router
 from app.services.api_service import api_service
+from app.services.send_queue import send_queue
+from app.services.throttling import callback_throttle
 
 def setup_logging():
     logger.remove()
@@ -35,18 +37,36 @@ async def setup_bot_commands(bot: Bot):
     commands = [
         BotCommand(command="start", description="Запустить бота / вернуться в главное меню"),
         BotCommand(command="help", description="Получить помощь по использованию бота"),
+        BotCommand(command="part", description="Поиск запчасти по коду или названию"),
     ]
 
     await bot.set_my_commands(commands)
 
+def create_dispatcher():
+    """Диспетчер бота механиков СТО с роутерами (запуск и api_service - на стороне вызывающего)"""
+    dp = Dispatcher()
+    dp.include_router(service_router)
+    dp.callback_query.outer_middleware(callback_throttle)
+    return dp
+
+async def on_startup():
+    await api_service.startup()
+
+async def on_shutdown():
+    await api_service.close()
+    logger.info(f"Нажатия кнопок: {callback_throttle.get_stats()}")
+    logger.info(f"Исходящие сообщения: {send_queue.get_stats()}")
+
 async def main():
     setup_logging()
 
     logger.info("Запуск бота для механиков СТО...")
     
     bot = Bot(token=SERVICE_BOT_TOKEN, parse_mode=ParseMode.HTML)
-    dp = Dispatcher()
-    dp.include_router(service_router)
+    bot.session.middleware(send_queue)
+    dp = create_dispatcher()
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
     
     await setup_bot_commands(bot)
     
@@ -1,10 +1,26 @@
+import argparse
 import asyncio
+import importlib
 import os
+import signal
 import sys
 import logging
+import time
+from contextlib import suppress
+from functools import partial
 from loguru import logger
-import subprocess
-from concurrent.futures import ProcessPoolExecutor
+
+STARTED_AT = time.perf_counter()
+BOTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Сколько ждать штатной остановки дочернего процесса после сигнала
+SHUTDOWN_TIMEOUT = 15
+
+# Скрипт, модуль, переменная с токеном, название, сбрасывать ли накопившиеся обновления
+BOTS = [
+    ("main.py", "main", "BOT_TOKEN", "Основной бот", False),
+    ("staff_bot.py", "staff_bot", "STAFF_BOT_TOKEN", "Бот сотрудников", True),
+    ("service_bot.py", "service_bot", "SERVICE_BOT_TOKEN", "Бот механиков СТО", True),
+]
 
 def setup_logging():
     """Настройка логирования"""
@@ -12,9 +28,9 @@ def setup_logging():
     logger.add(
         sys.stdout,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-        level="INFO"  
+        level="INFO"
     )
-    
+
     os.makedirs("logs", exist_ok=True)
     logger.add(
         "logs/all_bots.log",
@@ -23,51 +39,262 @@ def setup_logging():
         format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
         level="INFO"
     )
-    
+
     logging.basicConfig(level=logging.INFO)
 
-def run_bot(script_name, bot_name):
-    """Запуск бота в отдельном процессе"""
-    logger.info(f"Запуск {bot_name}...")
+def get_rss(pid="self"):
+    """Резидентная память процесса в байтах (по /proc, только Linux); None, если узнать нельзя"""
     try:
-        subprocess.run([sys.executable, script_name], check=True)
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Ошибка запуска {bot_name}: {e}")
-    except KeyboardInterrupt:
-        logger.info(f"{bot_name} остановлен")
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def format_rss(rss):
+    return f"{rss / 1024 ** 2:.0f} МБ" if rss is not None else "н/д"
+
+async def stop_polling(dp, polling):
+    """Останавливает polling; если он еще не начался, отменяет задачу"""
+    try:
+        await dp.stop_polling()
+    except RuntimeError:
+        polling.cancel()
+
+async def wait_first(task, stopping):
+    """Ждет завершения задачи или сигнала остановки"""
+    stop_wait = asyncio.create_task(stopping.wait())
+    try:
+        await asyncio.wait({task, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stop_wait.cancel()
+
+def run_in_background(tasks, coro, description):
+    """Задача запуска, которая не должна задерживать polling; ошибка только пишется в лог"""
+    task = asyncio.create_task(coro)
+    tasks.add(task)
+
+    def done(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка при запуске ({description}): {task.exception()}")
+
+    task.add_done_callback(done)
+
+async def poll_bot(state, stopping, module, bot, dp, drop_pending):
+    """Один запуск бота в общем цикле событий: polling до сигнала остановки
+    (команды бота настраиваются в фоне, см. run_in_process)"""
+    # start_polling сам webhook не снимает: если он остался от запуска в режиме webhook, getUpdates вернет конфликт
+    await bot.delete_webhook(drop_pending_updates=drop_pending)
+    if stopping.is_set():
+        return
+
+    # Сигналы обрабатывает супервизор: обработчик у цикла событий один на все диспетчеры
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    await wait_first(polling, stopping)
+    if not polling.done():
+        await stop_polling(dp, polling)
+    await asyncio.wait({polling})
+    if not polling.cancelled():
+        polling.result()
+
+async def webhook_bot(state, stopping, module, bot, dp, drop_pending, webhook, base_url):
+    """Один запуск бота в режиме webhook: регистрация webhook, дальше обновления приходят на сервер"""
+    await webhook.register(state.name, base_url, drop_pending_updates=drop_pending)
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        await stopping.wait()
+    finally:
+        if stopping.is_set():
+            # Сначала сервер перестает принимать обновления и дорабатывает принятые,
+            # и только потом диспетчер останавливается, а webhook снимается
+            await webhook.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        # Иначе при следующем запуске в режиме polling getUpdates вернет конфликт с webhook
+        try:
+            await bot.delete_webhook()
+        except Exception as e:
+            logger.warning(f"Не удалось снять webhook бота {state.title}: {e}")
+
+async def run_in_process(bots, supervisor):
+    """Все боты в одном цикле событий: общие api_service, пул соединений с 1С и кэш каталога"""
+    from aiogram import Bot
+    from aiogram.enums import ParseMode
+    from app.config import config
+    from app.services.api_service import api_service
+    from app.services.supervisor import update_timer
+    from app.services.send_queue import send_queue
+    from app.services.throttling import callback_throttle
+    from app.services.webhook import WebhookServer
+    from app.utils.timeline import StartupTimeline
+
+    timeline = StartupTimeline(STARTED_AT)
+    # Один middleware на все диспетчеры: отмечается первое обновление любого из ботов
+    first_update = timeline.first_update_middleware()
+    background_tasks = set()
+    started = []
+    for _, module_name, token_name, title, drop_pending in bots:
+        token = getattr(config, token_name)
+        if not token:
+            logger.warning(f"{title} не запущен: не задан {token_name}")
+            continue
+        module = importlib.import_module(module_name)
+        state = supervisor.add(module_name, title)
+        dp = module.create_dispatcher()
+        dp.update.outer_middleware(update_timer(state))
+        dp.update.outer_middleware(first_update)
+        bot = Bot(token=token, parse_mode=ParseMode.HTML)
+        # Одна очередь исходящих сообщений на всех ботов
+        bot.session.middleware(send_queue)
+        started.append((state, module, bot, dp, drop_pending))
+
+    supervisor.reports["send_queue"] = send_queue.get_stats
+
+    if not started:
+        logger.error("Не задан ни один токен бота")
+        return
+    timeline.mark("конфигурация")
+
+    first_start = True
 
-async def main():
+    def on_bot_started(state):
+
+        async def handler():
+            nonlocal first_start
+            state.mark_running(os.getpid())
+            logger.info(f"{state.title} запущен")
+            running = sum(item[0].state == item[0].RUNNING for item in started)
+            if first_start and running == len(started):
+                first_start = False
+                timeline.mark("боты запущены")
+                logger.info(f"Боты ({len(started)}) запущены в одном процессе за {time.perf_counter() - STARTED_AT:.2f} с, "
+                            f"RSS {format_rss(get_rss())}")
+
+        return handler
+
+    for state, _, _, dp, _ in started:
+        dp.startup.register(on_bot_started(state))
+
+    if config.WEBHOOK_BASE_URL:
+        webhook = WebhookServer()
+        for state, _, bot, dp, _ in started:
+            webhook.add_bot(state.name, bot, dp)
+        run_bot = partial(webhook_bot, webhook=webhook, base_url=config.WEBHOOK_BASE_URL)
+    else:
+        webhook = None
+        run_bot = poll_bot
+
+    async def warm_up_api():
+        result = await api_service.warm_up()
+        timeline.mark("прогрев API")
+        return result
+
+    await api_service.startup()
+    # Боты начинают принимать обновления сразу, а команды ботов и прогрев 1С (один на всех) идут в фоне
+    run_in_background(background_tasks, warm_up_api(), "прогрев API")
+    for state, module, bot, _, _ in started:
+        run_in_background(background_tasks, module.setup_bot_commands(bot), f"команды: {state.title}")
+    try:
+        if webhook is not None:
+            await webhook.start(config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+        await asyncio.gather(*(
+            supervisor.supervise(state, partial(run_bot, module=module, bot=bot, dp=dp, drop_pending=drop_pending))
+            for state, module, bot, dp, drop_pending in started
+        ))
+    finally:
+        for task in list(background_tasks):
+            task.cancel()
+        if webhook is not None:
+            await webhook.stop()
+        for _, _, bot, _, _ in started:
+            await bot.session.close()
+        await api_service.close()
+        logger.info(f"Нажатия кнопок: {callback_throttle.get_stats()}")
+        logger.info(f"Исходящие сообщения: {send_queue.get_stats()}")
+
+async def run_bot_process(state, stopping, script, supervisor):
+    """Один запуск бота в отдельном процессе; при остановке процессу передается полученный сигнал"""
+    process = await asyncio.create_subprocess_exec(sys.executable, os.path.join(BOTS_DIR, script))
+    state.mark_running(process.pid)
+    logger.info(f"{state.title} запущен, pid {process.pid}")
+    exit_wait = asyncio.create_task(process.wait())
+    try:
+        await wait_first(exit_wait, stopping)
+        if process.returncode is None:
+            try:
+                process.send_signal(supervisor.stop_signal or signal.SIGTERM)
+            except ValueError:
+                # Windows: из сигналов поддерживается только завершение процесса
+                process.terminate()
+            try:
+                await asyncio.wait_for(asyncio.shield(exit_wait), SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"{state.title} не остановился за {SHUTDOWN_TIMEOUT:.0f} с, процесс завершается принудительно")
+                process.kill()
+        return f"код выхода {await exit_wait}"
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+async def run_processes(bots, supervisor):
+    """Каждый бот - отдельный процесс интерпретатора со своими кэшем и пулом соединений"""
+    from app.config.config import WEBHOOK_BASE_URL
+
+    if WEBHOOK_BASE_URL:
+        logger.warning("Режим webhook работает только при запуске ботов в одном процессе, боты запускаются с polling")
+    await asyncio.gather(*(
+        supervisor.supervise(supervisor.add(module_name, title),
+                             partial(run_bot_process, script=script, supervisor=supervisor))
+        for script, module_name, _, title, _ in bots
+    ))
+
+async def main(mode):
     """Основная функция запуска всех ботов"""
     setup_logging()
-    
-    logger.info("Запуск всех ботов автосервиса...")
-    
-    bots = [
-        ("main.py", "Основной бот"),
-        ("staff_bot.py", "Бот сотрудников"),
-        ("service_bot.py", "Бот механиков СТО")
-    ]
-    
+
+    from app.config.config import HEALTH_HOST, HEALTH_PORT
+    from app.services.supervisor import Supervisor
+
+    logger.info(f"Запуск всех ботов автосервиса (режим: {mode})...")
+
+    supervisor = Supervisor()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # На Windows обработчики сигналов в цикле событий не поддерживаются - остается KeyboardInterrupt
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, supervisor.stop, sig)
+
+    health_runner = None
+    if HEALTH_PORT:
+        try:
+            health_runner = await supervisor.start_health_server(HEALTH_HOST, HEALTH_PORT)
+        except OSError as e:
+            logger.error(f"Не удалось запустить отчет о состоянии на {HEALTH_HOST}:{HEALTH_PORT}: {e}")
+
     try:
-        with ProcessPoolExecutor(max_workers=len(bots)) as executor:
-            loop = asyncio.get_event_loop()
-            tasks = [
-                loop.run_in_executor(executor, run_bot, script, name)
-                for script, name in bots
-            ]
-            
-            await asyncio.gather(*tasks)
-            
-    except KeyboardInterrupt:
-        logger.info("Получен сигнал завершения. Останавливаем ботов...")
-    
+        if mode == "processes":
+            await run_processes(BOTS, supervisor)
+        else:
+            await run_in_process(BOTS, supervisor)
+    finally:
+        if health_runner is not None:
+            await health_runner.cleanup()
+
     logger.info("Все боты остановлены")
 
 if __name__ == "__main__":
-    if sys.platform == "win32":
+    parser = argparse.ArgumentParser(description="Запуск всех ботов автосервиса")
+    parser.add_argument(
+        "--processes", action="store_const", const="processes", default="single", dest="mode",
+        help="запускать каждого бота в отдельном процессе (по умолчанию - все в одном процессе)"
+    )
+    args = parser.parse_args()
+
+    # Дочерним процессам на Windows нужен цикл событий по умолчанию (Proactor)
+    if sys.platform == "win32" and args.mode == "single":
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.mode))
     except KeyboardInterrupt:
         logger.info("Программа завершена пользователем")
@@ -0,0 +1,10 @@
+"""Общие настройки тестов: запуск из каталога бота командой python -m pytest -q"""
+import os
+import sys
+
+os.environ.setdefault("API_USERNAME", "test")
+os.environ.setdefault("API_PASSWORD", "test")
+# Тесты не читают и не пишут снимок каталога на диске
+os.environ["CATALOG_SNAPSHOT_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,150 @@
+"""Очередь к 1С: порядок выдачи слотов по приоритету, отказ по max_wait и отмена ожидающих"""
+import asyncio
+
+import pytest
+
+from app.services.admission import CATALOG, ORDERS, WRITES, AdmissionController, AdmissionRejected
+
+
+async def hold(controller, priority, order, release):
+    """Занимает слот, отмечает порядок получения и держит слот до release"""
+    async with controller.slot(priority):
+        order.append(priority)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+
+    async def run():
+        controller = AdmissionController(limit=1, max_wait={})
+        order, release = [], asyncio.Event()
+        holder_release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, CATALOG, [], holder_release))
+        await settle()
+
+        tasks = []
+        for priority in (CATALOG, ORDERS, WRITES, ORDERS, CATALOG, WRITES):
+            tasks.append(asyncio.create_task(hold(controller, priority, order, release)))
+            await settle()
+        assert controller.get_stats()["classes"]["orders"]["waiting"] == 2
+
+        holder_release.set()
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order, controller
+
+    order, controller = asyncio.run(run())
+    assert order == [WRITES, WRITES, ORDERS, ORDERS, CATALOG, CATALOG]
+    stats = controller.get_stats()
+    assert stats["active"] == 0
+    assert stats["classes"]["catalog"]["admitted"] == 3
+    assert stats["classes"]["writes"]["queued"] == 2
+
+
+def test_waiter_over_max_wait_is_rejected():
+
+    async def run():
+        controller = AdmissionController(limit=1, max_wait={"catalog": 0.05})
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, WRITES, [], release))
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot(CATALOG):
+                pass
+        assert rejected.value.priority == CATALOG
+        assert rejected.value.waited >= 0.05
+
+        # Класс без max_wait ждет, пока слот не освободится
+        orders = asyncio.create_task(hold(controller, ORDERS, [], asyncio.Event()))
+        await asyncio.sleep(0.1)
+        assert not orders.done()
+        release.set()
+        await holder
+        await settle()
+        assert controller.active == 1
+        orders.cancel()
+        await asyncio.gather(orders, return_exceptions=True)
+        return controller
+
+    controller = asyncio.run(run())
+    stats = controller.get_stats()
+    assert stats["active"] == 0
+    assert stats["classes"]["catalog"]["rejected"] == 1
+    assert stats["classes"]["orders"]["admitted"] == 1
+
+
+def test_cancelled_waiter_leaves_queue():
+
+    async def run():
+        controller = AdmissionController(limit=1, max_wait={})
+        order, release = [], asyncio.Event()
+        holder_release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, CATALOG, [], holder_release))
+        await settle()
+
+        cancelled = asyncio.create_task(hold(controller, WRITES, order, release))
+        waiting = asyncio.create_task(hold(controller, CATALOG, order, release))
+        await settle()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert controller.get_stats()["classes"]["writes"]["waiting"] == 0
+
+        holder_release.set()
+        release.set()
+        await asyncio.gather(holder, waiting)
+        return order, controller
+
+    order, controller = asyncio.run(run())
+    assert order == [CATALOG]
+    assert controller.active == 0
+
+
+def test_slot_granted_to_cancelled_waiter_is_passed_on():
+
+    async def run():
+        controller = AdmissionController(limit=1, max_wait={})
+        order, release = [], asyncio.Event()
+        holder_release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, CATALOG, [], holder_release))
+        await settle()
+
+        cancelled = asyncio.create_task(hold(controller, WRITES, order, release))
+        waiting = asyncio.create_task(hold(controller, ORDERS, order, release))
+        await settle()
+
+        # Слот передан первому ожидающему, но тот отменен раньше, чем успел его занять
+        holder_release.set()
+        await holder
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        release.set()
+        await waiting
+        return order, controller
+
+    order, controller = asyncio.run(run())
+    assert order == [ORDERS]
+    assert controller.active == 0
+
+
+def test_zero_limit_admits_everything():
+
+    async def run():
+        controller = AdmissionController(limit=0, max_wait={"catalog": 0.01})
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(hold(controller, CATALOG, order, release)) for _ in range(10)]
+        await settle()
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, controller
+
+    order, controller = asyncio.run(run())
+    assert order == [CATALOG] * 10
+    assert controller.active == 0
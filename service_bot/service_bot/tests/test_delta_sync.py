@@ -0,0 +1,243 @@
+"""Синхронизация товаров по изменениям: индексы, поправленные по изменениям, должны совпадать
+с индексами, построенными заново по тому же списку товаров, а при разрыве цепочки изменений
+или неполном ответе 1С - выполняется полная загрузка"""
+import asyncio
+import random
+import socket
+
+import pytest
+
+from app.services import api_service as api_module
+from app.services.api_service import ApiService
+from app.services.catalog_index import CatalogIndex
+from app.services.catalog_store import CatalogStore
+from app.services.fuzzy import FuzzyIndex
+from app.services.mock_data import make_products
+from app.services.mock_server import MockCatalog, start_mock_server
+from app.services.models import Product
+from app.services.search import SearchIndex
+
+PRODUCTS = 300
+CHANGES_ENDPOINT = "/api/catalog/changes"
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(monkeypatch):
+    """Каждый тест работает со своими хранилищем и индексами каталога"""
+    monkeypatch.setattr(api_module, "catalog_store", CatalogStore())
+    monkeypatch.setattr(api_module, "search_index", SearchIndex())
+    monkeypatch.setattr(api_module, "fuzzy_index", FuzzyIndex())
+
+
+def free_port():
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_scenario(scenario, edit_changes=None):
+    """Запускает тестовый сервер 1С и scenario(service, catalog) после первой, полной загрузки.
+    edit_changes(response) подменяет ответ 1С на запрос изменений"""
+    async def run():
+        catalog = MockCatalog(products=PRODUCTS)
+        port = free_port()
+        runner = await start_mock_server(port=port, catalog=catalog)
+        service = ApiService()
+        service.base_url = f"http://127.0.0.1:{port}/test/hs"
+
+        if edit_changes is not None:
+            make_request = service._make_request
+
+            async def patched(method, endpoint, **kwargs):
+                response = await make_request(method, endpoint, **kwargs)
+                return edit_changes(response) if endpoint == CHANGES_ENDPOINT else response
+
+            service._make_request = patched
+
+        try:
+            assert await service.refresh_catalog_index() is not None
+            assert service.get_sync_stats()["full"] == 1
+            await scenario(service, catalog)
+        finally:
+            await service.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def product_codes(products):
+    return sorted(product.code for product in products)
+
+
+def assert_indexes_match(catalog, queries=()):
+    """Индексы после синхронизации совпадают с построенными заново, а товары - с каталогом 1С"""
+    index = api_module.catalog_store.index
+    assert product_codes(index.products) == sorted(product["Код"] for product in catalog.products)
+    assert {product.code: product.price for product in index.products} == {
+        product["Код"]: product["Цена"] for product in catalog.products}
+
+    fresh = CatalogIndex(index.categories, index.products, index.services)
+    assert index.products_by_id == fresh.products_by_id
+    assert index.products_by_code == fresh.products_by_code
+    assert ({category: product_codes(items) for category, items in index.products_by_category.items()}
+            == {category: product_codes(items) for category, items in fresh.products_by_category.items()})
+
+    fresh_search, fresh_fuzzy = SearchIndex(), FuzzyIndex()
+    fresh_search.update(index.products + index.services)
+    fresh_fuzzy.build(index.products)
+    assert api_module.fuzzy_index.is_built_for(index.products)
+
+    rng = random.Random(5)
+    queries = list(queries) + [product.name for product in rng.sample(index.products, 15)]
+    queries += [product.code for product in rng.sample(index.products, 15)]
+    for query in queries:
+        assert (product_codes(api_module.search_index.search(query, limit=1000))
+                == product_codes(fresh_search.search(query, limit=1000))), query
+        # Товары с равным расстоянием могут идти в другом порядке - сравниваются расстояния
+        assert ([distance for _, distance in api_module.fuzzy_index.search(query, limit=1000)]
+                == [distance for _, distance in fresh_fuzzy.search(query, limit=1000)]), query
+
+
+def new_product(catalog, code):
+
+    product = make_products(1, catalog.categories, seed=code)[0]
+    product["Код"] = code
+    return product
+
+
+def test_changed_products_are_patched():
+
+    async def scenario(service, catalog):
+        codes = [product["Код"] for product in catalog.products[:5]]
+        for number, code in enumerate(codes):
+            catalog.change_product(code, Цена=100_000 + number, Наименование=f"Переименованный товар {number}")
+        await service.refresh_catalog_index()
+
+        stats = service.get_sync_stats()
+        assert (stats["full"], stats["delta"], stats["changed"]) == (1, 1, 5)
+        assert api_module.catalog_store.index.get(Product, codes[0]).price == 100_000
+        assert_indexes_match(catalog, [f"Переименованный товар {number}" for number in range(5)] + codes)
+
+    run_scenario(scenario)
+
+
+def test_added_products_are_indexed():
+
+    async def scenario(service, catalog):
+        codes = ["N0000001", "N0000002"]
+        for code in codes:
+            catalog.add_product(new_product(catalog, code))
+        await service.refresh_catalog_index()
+
+        stats = service.get_sync_stats()
+        assert (stats["full"], stats["delta"]) == (1, 1)
+        assert [api_module.catalog_store.index.get(Product, code).code for code in codes] == codes
+        assert_indexes_match(catalog, codes)
+
+    run_scenario(scenario)
+
+
+def test_deleted_products_leave_indexes():
+
+    async def scenario(service, catalog):
+        removed = catalog.products[7]
+        catalog.delete_product(removed["Код"])
+        await service.refresh_catalog_index()
+
+        stats = service.get_sync_stats()
+        assert (stats["full"], stats["delta"], stats["deleted"]) == (1, 1, 1)
+        assert api_module.catalog_store.index.get(Product, removed["Код"]) is None
+        assert removed["Код"] not in product_codes(api_module.search_index.search(removed["Код"], limit=1000))
+        assert_indexes_match(catalog, [removed["Наименование"], removed["Код"]])
+
+    run_scenario(scenario)
+
+
+def test_code_both_changed_and_deleted_is_removed():
+    # Тестовый сервер отдает код только в одном из списков; второй добавляется в ответ вручную
+    both = []
+
+    def edit_changes(response):
+        response["data"]["deleted"] = list(response["data"]["deleted"]) + both
+        return response
+
+    async def scenario(service, catalog):
+        code = catalog.products[3]["Код"]
+        catalog.change_product(code, Цена=77_700)
+        both.append(code)
+        await service.refresh_catalog_index()
+        # Удаление побеждает: ожидаемый каталог - без этого товара
+        catalog.products.remove(catalog.products_by_code[code])
+
+        assert service.get_sync_stats()["delta"] == 1
+        assert api_module.catalog_store.index.get(Product, code) is None
+        assert_indexes_match(catalog, [code])
+
+    run_scenario(scenario, edit_changes)
+
+
+def test_truncated_change_log_falls_back_to_full_load():
+
+    async def scenario(service, catalog):
+        catalog.change_product(catalog.products[0]["Код"], Цена=12_300)
+        catalog.delete_product(catalog.products[1]["Код"])
+        # Журнал изменений на сервере обрезан: 1С отвечает 410
+        catalog.log_start = catalog.version
+        await service.refresh_catalog_index()
+
+        stats = service.get_sync_stats()
+        assert (stats["full"], stats["delta"], stats["fallbacks"]) == (2, 0, 1)
+        assert stats["delta_supported"]
+        assert_indexes_match(catalog)
+
+        # После полной загрузки синхронизация снова идет по изменениям
+        catalog.change_product(catalog.products[2]["Код"], Цена=45_600)
+        await service.refresh_catalog_index()
+        assert service.get_sync_stats()["delta"] == 1
+        assert_indexes_match(catalog)
+
+    run_scenario(scenario)
+
+
+def test_missing_changes_endpoint_switches_to_full_loads():
+
+    def edit_changes(response):
+        return {"status": 404, "data": {"error": "Не найдено"}}
+
+    async def scenario(service, catalog):
+        catalog.add_product(new_product(catalog, "N0000003"))
+        catalog.delete_product(catalog.products[4]["Код"])
+        await service.refresh_catalog_index()
+
+        stats = service.get_sync_stats()
+        assert (stats["full"], stats["delta"], stats["fallbacks"]) == (2, 0, 1)
+        assert not stats["delta_supported"]
+        assert_indexes_match(catalog, ["N0000003"])
+
+        # Изменения больше не запрашиваются
+        await service.refresh_catalog_index()
+        assert service.get_sync_stats()["fallbacks"] == 1
+        assert service.get_sync_stats()["full"] == 3
+
+    run_scenario(scenario, edit_changes)
+
+
+@pytest.mark.parametrize("missing", ["products", "deleted"])
+def test_response_without_lists_falls_back_to_full_load(missing):
+
+    def edit_changes(response):
+        del response["data"][missing]
+        return response
+
+    async def scenario(service, catalog):
+        catalog.change_product(catalog.products[5]["Код"], Цена=98_700)
+        catalog.delete_product(catalog.products[6]["Код"])
+        await service.refresh_catalog_index()
+
+        stats = service.get_sync_stats()
+        assert (stats["full"], stats["delta"], stats["fallbacks"]) == (2, 0, 1)
+        assert stats["delta_supported"]
+        assert_indexes_match(catalog)
+
+    run_scenario(scenario, edit_changes)
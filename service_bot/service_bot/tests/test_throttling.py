@@ -0,0 +1,138 @@
+"""Фильтр частых нажатий inline-кнопок: слияние с обрабатываемым нажатием, отбрасывание
+повтора, лимит нажатий пользователя и пополнение его запаса"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import throttling
+from app.services.throttling import LIMITED_TEXT, CallbackThrottle
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeCallback:
+    """Нажатие кнопки: запоминает ответы, которые middleware отправил в Telegram"""
+
+    def __init__(self, data, user_id=1):
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id)
+        self.answers = []
+
+    async def answer(self, text=None):
+        self.answers.append(text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+
+    clock = FakeClock()
+    monkeypatch.setattr(throttling, "time", clock)
+    return clock
+
+
+async def handled(event, data):
+    return "handled"
+
+
+def press(throttle, data, user_id=1, handler=handled):
+
+    event = FakeCallback(data, user_id)
+    result = asyncio.run(throttle(handler, event, {"bot": SimpleNamespace(id=7)}))
+    return result, event
+
+
+def test_press_while_same_button_is_handled_is_merged(clock):
+
+    throttle = CallbackThrottle(rate=100, burst=10, repeat_interval=0)
+    events = [FakeCallback("product_00-123"), FakeCallback("product_00-123"), FakeCallback("product_00-456")]
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow_handler(event, data):
+            await release.wait()
+            return "handled"
+
+        first = asyncio.create_task(throttle(slow_handler, events[0], {}))
+        await asyncio.sleep(0)
+        merged = await throttle(slow_handler, events[1], {})
+        other = asyncio.create_task(throttle(slow_handler, events[2], {}))
+        await asyncio.sleep(0)
+        release.set()
+        return await first, merged, await other
+
+    assert asyncio.run(run()) == ("handled", None, "handled")
+    # Нажатию сразу ответили, чтобы у кнопки не висели "часики"
+    assert events[1].answers == [None]
+    assert events[0].answers == events[2].answers == []
+    stats = throttle.get_stats()
+    assert (stats["passed"], stats["merged"], stats["in_flight"]) == (2, 1, 0)
+    assert stats["top_actions"] == {"product": 1}
+
+
+def test_repeat_of_just_handled_button_is_dropped(clock):
+
+    throttle = CallbackThrottle(rate=100, burst=10, repeat_interval=1)
+    assert press(throttle, "page_2")[0] == "handled"
+
+    clock.now += 0.5
+    result, event = press(throttle, "page_2")
+    assert result is None and event.answers == [None]
+    # Другая кнопка и другой пользователь не отбрасываются
+    assert press(throttle, "page_3")[0] == "handled"
+    assert press(throttle, "page_3", user_id=2)[0] == "handled"
+
+    clock.now += 1
+    assert press(throttle, "page_3")[0] == "handled"
+    assert throttle.get_stats()["dropped"] == 1
+
+
+def test_presses_over_burst_are_limited(clock):
+
+    throttle = CallbackThrottle(rate=2, burst=3, repeat_interval=0)
+    results = [press(throttle, f"product_{number}")[0] for number in range(3)]
+    assert results == ["handled"] * 3
+
+    result, event = press(throttle, "product_3")
+    assert result is None
+    assert event.answers == [LIMITED_TEXT]
+    # Запас у каждого пользователя свой
+    assert press(throttle, "product_3", user_id=2)[0] == "handled"
+
+    stats = throttle.get_stats()
+    assert (stats["passed"], stats["limited"]) == (4, 1)
+    assert stats["filtered_rate"] == 0.2
+
+
+def test_bucket_refills_at_rate_up_to_burst(clock):
+
+    throttle = CallbackThrottle(rate=2, burst=3, repeat_interval=0)
+    for number in range(3):
+        press(throttle, f"product_{number}")
+    assert press(throttle, "product_3")[0] is None
+
+    # За 0,5 с при 2 нажатиях в секунду набирается одно нажатие
+    clock.now += 0.5
+    assert press(throttle, "product_4")[0] == "handled"
+    assert press(throttle, "product_5")[0] is None
+
+    # Долгая пауза пополняет запас только до burst
+    clock.now += 30
+    results = [press(throttle, f"product_{number}")[0] for number in range(6, 10)]
+    assert results == ["handled"] * 3 + [None]
+    assert throttle.get_stats()["limited"] == 3
+
+
+def test_zero_rate_disables_limit(clock):
+
+    throttle = CallbackThrottle(rate=0, burst=1, repeat_interval=0)
+    assert [press(throttle, f"product_{number}")[0] for number in range(20)] == ["handled"] * 20
+    assert throttle.get_stats()["limited"] == 0